@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+""" Admission control: bounds the connections a server takes on
+
+Beyond ``max_connections`` being served and ``max_queue`` waiting for a
+worker, new connections are refused at once with BUSY instead of queueing
+without bound, so latency stays bounded under overload.
+"""
+
+
+import threading
+from typing import Any, Callable
+from metrics import METRICS
+
+BUSY: bytes = b"ERROR BUSY\n"
+
+
+class AdmissionControl:
+    """ Counts admitted connections against a fixed capacity
+
+    Attributes:
+        max_connections (int): The most connections served at once
+        max_queue (int): The most admitted connections waiting for a worker
+        admitted (int): Connections admitted and not yet finished
+        active (int): Admitted connections being served
+    """
+    def __init__(self, max_connections: int, max_queue: int = 0) -> None:
+        """ Initializes the controller with nothing admitted """
+        self.max_connections = max_connections
+        self.max_queue = max_queue
+        self.admitted = 0
+        self.active = 0
+        self._slots = threading.Semaphore(max_connections + max_queue)
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        """ Returns the admitted connections still waiting for a worker """
+        return self.admitted - self.active
+
+    def try_admit(self) -> bool:
+        """Admits a connection if there is room, never blocking.
+
+        Returns:
+            bool: True if admitted, False if the server is saturated; the
+                  refusal is counted in ``busy_rejections``.
+        """
+        if not self._slots.acquire(blocking=False):
+            METRICS.inc("busy_rejections")
+            return False
+        with self._lock:
+            self.admitted += 1
+        return True
+
+    def started(self) -> None:
+        """ Marks an admitted connection as picked up by a worker """
+        with self._lock:
+            self.active += 1
+
+    def finished(self) -> None:
+        """ Releases the room held by a served connection """
+        with self._lock:
+            self.active -= 1
+            self.admitted -= 1
+        self._slots.release()
+
+    def serve(self, handler: Callable[..., Any], *args: Any) -> Any:
+        """Runs ``handler(*args)`` for an admitted connection, releasing
+        its room when it returns.
+
+        Args:
+            handler (Callable[..., Any]): Serves the connection.
+            *args (Any): Passed to the handler.
+        Returns:
+            Any: What the handler returns.
+        """
+        self.started()
+        try:
+            return handler(*args)
+        finally:
+            self.finished()
+
+    def gauges(self) -> dict[str, int]:
+        """ Returns the current load, as a metrics collector """
+        return {"connections_active": self.active,
+                "connections_queued": self.queued}
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+""" Bloom filter front-end rejecting definite misses before the index
+
+The filter can be persisted next to the indexed file and memory-mapped,
+so worker processes share one copy of the bit array. Layout
+(little-endian):
+    0   8s   magic
+    8   I    format version
+    12  I    number of hash functions
+    16  Q    number of bits
+    24  Q    source file size
+    32  q    source file mtime in nanoseconds
+    40  I    flags, FLAG_STRIPPED if lines were stripped of whitespace
+    44  4x   padding
+    48  d    false-positive rate the filter was sized for
+    56  ...  bit array, bit i is (byte i // 8 >> i % 8) & 1
+"""
+
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Callable, Sequence
+from logger.logger import logger
+
+MAGIC = b"FSTBLM\x00\x01"
+VERSION = 3
+HEADER = struct.Struct("<8sIIQQqI4xd")
+FLAG_STRIPPED = 1
+BLOOM_SUFFIX = ".bloom"
+
+
+class BloomFilter:
+    """ Probabilistic set of lines with no false negatives
+
+    Positions come from double hashing one 128-bit blake2b digest, which
+    is stable across processes (unlike ``hash``), so a filter built by
+    one process is valid in every other.
+
+    Attributes:
+        bits (bytearray | memoryview): The bit array
+        num_bits (int): The number of bits in the array
+        num_hashes (int): The number of positions set per item
+        fp_rate (float): The false-positive rate the filter was sized for
+    """
+    def __init__(self, bits, num_bits: int, num_hashes: int,
+                 fp_rate: float) -> None:
+        """ Initializes the filter over an existing bit array """
+        self.bits = bits
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.fp_rate = fp_rate
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float) -> "BloomFilter":
+        """Creates an empty filter sized for ``capacity`` items at the
+        given false-positive rate.
+
+        Args:
+            capacity (int): The expected number of items.
+            fp_rate (float): The target false-positive rate, e.g. 0.01.
+        Returns:
+            BloomFilter: The empty filter.
+        """
+        capacity = max(capacity, 1)
+        num_bits = max(8, math.ceil(
+            -capacity * math.log(fp_rate) / math.log(2) ** 2
+        ))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(bytearray((num_bits + 7) // 8), num_bits, num_hashes,
+                   fp_rate)
+
+    def _positions(self, item: bytes) -> range:
+        """ Returns the k bit positions of ``item`` (before the modulo) """
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return range(h1, h1 + self.num_hashes * h2, h2)
+
+    def add(self, item: bytes) -> None:
+        """ Adds ``item`` to the filter """
+        bits, num_bits = self.bits, self.num_bits
+        for h in self._positions(item):
+            pos = h % num_bits
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: bytes) -> bool:
+        """ Returns False if ``item`` is definitely absent """
+        bits, num_bits = self.bits, self.num_bits
+        for h in self._positions(item):
+            pos = h % num_bits
+            if not bits[pos >> 3] >> (pos & 7) & 1:
+                return False
+        return True
+
+
+class BloomFilteredIndex:
+    """ Wraps an index so definite misses never reach it
+
+    Attributes:
+        index (Any): The wrapped index, with ``search``
+        bloom (BloomFilter): The filter over the same lines
+    """
+    def __init__(self, index: Any, bloom: BloomFilter) -> None:
+        """ Initializes the wrapper """
+        self.index = index
+        self.bloom = bloom
+
+    def search(self, query: bytes) -> bool:
+        """ Searches the index only if the filter may contain the query """
+        return query in self.bloom and self.index.search(query)
+
+    def search_many(self, queries: Sequence[bytes]) -> list[bool]:
+        """ Looks up in one pass only the queries the filter may contain """
+        bloom = self.bloom
+        candidates = [i for i, query in enumerate(queries) if query in bloom]
+        found = [False] * len(queries)
+
+        if hasattr(self.index, "search_many"):
+            hits = self.index.search_many([queries[i] for i in candidates])
+        else:
+            hits = [self.index.search(queries[i]) for i in candidates]
+
+        for i, hit in zip(candidates, hits):
+            found[i] = hit
+        return found
+
+    def memory_usage(self) -> int:
+        """ Returns the wrapped index's usage plus the in-memory bits """
+        bits = self.bloom.bits
+        own = len(bits) if isinstance(bits, bytearray) else 0
+        return self.index.memory_usage() + own
+
+    def __len__(self) -> int:
+        """ Returns the number of lines in the wrapped index """
+        return len(self.index)
+
+    def __getattr__(self, name: str) -> Any:
+        """ Delegates everything else to the wrapped index """
+        return getattr(self.index, name)
+
+
+def bloom_path_for(file_path: str) -> str:
+    """ Returns the path of the sidecar filter for ``file_path`` """
+    return file_path + BLOOM_SUFFIX
+
+
+def build_bloom_filter(file_path: str, fp_rate: float,
+                       strip: bool = False) -> BloomFilter:
+    """Builds a filter over every line of a file, with lines split the
+    same way as the line index (newline, without a trailing ``\\r``).
+
+    Args:
+        file_path (str): The file to index.
+        fp_rate (float): The target false-positive rate.
+        strip (bool, optional): Whether to strip surrounding whitespace
+                                from every line instead, as the engines
+                                with ``strip_lines`` do. Defaults to False.
+    Returns:
+        BloomFilter: The in-memory filter.
+    """
+    with open(file_path, 'rb') as file:
+        lines = file.read().split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+
+    bloom = BloomFilter.for_capacity(len(lines), fp_rate)
+    for line in lines:
+        if strip:
+            bloom.add(line.strip())
+        else:
+            bloom.add(line[:-1] if line.endswith(b"\r") else line)
+    return bloom
+
+
+def write_bloom_filter(bloom: BloomFilter, file_path: str,
+                       stat: os.stat_result, strip: bool = False) -> None:
+    """Writes a filter to the sidecar of ``file_path``, atomically.
+
+    Args:
+        bloom (BloomFilter): The filter to write.
+        file_path (str): The indexed file.
+        stat (os.stat_result): The indexed file's stat from before the
+                               filter was built.
+        strip (bool, optional): Whether the filter was built from
+                                stripped lines. Defaults to False.
+    """
+    bloom_path = bloom_path_for(file_path)
+    header = HEADER.pack(MAGIC, VERSION, bloom.num_hashes, bloom.num_bits,
+                         stat.st_size, stat.st_mtime_ns,
+                         FLAG_STRIPPED if strip else 0, bloom.fp_rate)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(bloom_path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(header)
+            tmp.write(bloom.bits)
+        os.replace(tmp_path, bloom_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def open_bloom_filter(file_path: str, fp_rate: float,
+                      strip: bool = False) -> BloomFilter | None:
+    """Maps the sidecar filter of ``file_path`` if it is still valid.
+
+    Args:
+        file_path (str): The indexed file.
+        fp_rate (float): The false-positive rate the filter must have been
+                         sized for.
+        strip (bool, optional): Whether the filter must have been built
+                                from stripped lines. Defaults to False.
+    Returns:
+        BloomFilter | None: The mapped filter, or None if the sidecar is
+                            missing, corrupt, stale, sized for another
+                            rate or built from lines normalized the other
+                            way.
+    """
+    try:
+        with open(bloom_path_for(file_path), 'rb') as bloom_file:
+            bloom_map = mmap.mmap(bloom_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        stat = os.stat(file_path)
+    except (OSError, ValueError):
+        return None
+
+    if len(bloom_map) >= HEADER.size:
+        (magic, version, num_hashes, num_bits, size, mtime_ns, flags,
+         rate) = HEADER.unpack_from(bloom_map)
+        if magic == MAGIC and version == VERSION \
+                and size == stat.st_size and mtime_ns == stat.st_mtime_ns \
+                and flags == (FLAG_STRIPPED if strip else 0) \
+                and rate == fp_rate \
+                and len(bloom_map) == HEADER.size + (num_bits + 7) // 8:
+            bits = memoryview(bloom_map)[HEADER.size:]
+            return BloomFilter(bits, num_bits, num_hashes, rate)
+
+    bloom_map.close()
+    return None
+
+
+def load_bloom_filter(file_path: str, fp_rate: float,
+                      strip: bool = False) -> BloomFilter:
+    """Returns the filter for ``file_path``, mapping the sidecar when it is
+    valid and rebuilding it otherwise. If the sidecar cannot be written the
+    filter is kept in memory.
+
+    Args:
+        file_path (str): The indexed file.
+        fp_rate (float): The target false-positive rate; a sidecar sized
+                         for another rate is rebuilt.
+        strip (bool, optional): Whether lines are stripped of surrounding
+                                whitespace. Defaults to False.
+    Returns:
+        BloomFilter: The filter.
+    """
+    bloom = open_bloom_filter(file_path, fp_rate, strip)
+    if bloom is not None:
+        return bloom
+
+    stat = os.stat(file_path)
+    bloom = build_bloom_filter(file_path, fp_rate, strip)
+    try:
+        write_bloom_filter(bloom, file_path, stat, strip)
+    except OSError as e:
+        logger.warning(f"Could not write Bloom filter, kept in memory: {e}")
+        return bloom
+
+    return open_bloom_filter(file_path, fp_rate, strip) or bloom
+
+
+def with_bloom_filter(
+    builder: Callable[[str], Any], fp_rate: float, strip: bool = False
+) -> Callable[[str], BloomFilteredIndex]:
+    """Wraps an index builder so every index it builds is fronted by a
+    Bloom filter built (or mapped) from the same file.
+
+    Args:
+        builder (Callable[[str], Any]): Builds an index from a file path.
+        fp_rate (float): The target false-positive rate.
+        strip (bool, optional): Whether the index strips surrounding
+                                whitespace from lines. Defaults to False.
+    Returns:
+        Callable[[str], BloomFilteredIndex]: The wrapped builder.
+    """
+    def build(file_path: str) -> BloomFilteredIndex:
+        return BloomFilteredIndex(
+            builder(file_path),
+            load_bloom_filter(file_path, fp_rate, strip)
+        )
+    return build
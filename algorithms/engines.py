@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+""" Common interface and registry of the search engines
+
+Every engine is built once over a file and then answers lookups, so the
+server can pick one by name from ``ALGORITHM=`` in config.txt:
+
+    engine = load_engine("radix", "./config/200k.txt")
+    engine.search(b"6;0;1;16;0;7;3;0;")
+
+New engines register themselves with ``@register_engine("name")``. An
+engine living outside this module can also be named as
+``package.module:ClassName``; its module is imported on demand.
+"""
+
+
+import importlib
+import sys
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterator, Sequence
+from algorithms.index_file import load_line_index
+from algorithms.line_index import LineIndex
+from algorithms.mmap_search import mmap_search
+from algorithms.naive import naive_search
+from algorithms.radix_search import build_radix_tree
+from algorithms.scan_search import scan_search
+from algorithms.trie_search import Trie
+
+DEFAULT_ENGINE = "line_index"
+
+
+class SearchEngine(ABC):
+    """ A search structure built over one file
+
+    Attributes:
+        file_path (str): The file the engine searches
+        persisted (bool): Whether ``build`` keeps its result on disk, so
+                          building once up front speeds up later builds
+        strip_lines (bool): Whether lines are matched with surrounding
+                            whitespace stripped, rather than as the bytes
+                            between newlines without a trailing ``\r``
+        scanning (bool): Whether every lookup reads through the file, so
+                         it is too slow to run on an event loop
+    """
+    persisted = False
+    strip_lines = False
+    scanning = False
+
+    def __init__(self, file_path: str) -> None:
+        """ Initializes the engine, nothing is read until ``build`` """
+        self.file_path = file_path
+
+    @abstractmethod
+    def build(self) -> None:
+        """ Reads the file and builds whatever the lookups need """
+
+    @abstractmethod
+    def search(self, query: bytes) -> bool:
+        """Searches for an exact line match of the query.
+
+        Args:
+            query (bytes): The line to search for.
+        Returns:
+            bool: True if the line exists, False otherwise.
+        """
+
+    def search_many(self, queries: Sequence[bytes]) -> list[bool]:
+        """Looks up a batch of queries; engines with a faster batch path
+        override this.
+
+        Args:
+            queries (Sequence[bytes]): The lines to search for.
+        Returns:
+            list[bool]: Whether each line exists, in the input order.
+        """
+        return [self.search(query) for query in queries]
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """Counts the lines starting with ``prefix``; only engines keeping
+        the lines ordered can answer this.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+        Returns:
+            int: The number of lines, duplicates included.
+        Raises:
+            NotImplementedError: If the engine cannot answer prefix queries.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support prefix queries"
+        )
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int | None = None) -> Iterator[bytes]:
+        """Yields the lines starting with ``prefix`` in sorted order.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+            limit (int | None, optional): The most lines to yield.
+                                          Defaults to all of them.
+        Yields:
+            bytes: Each matching line, duplicates repeated.
+        Raises:
+            NotImplementedError: If the engine cannot answer prefix queries.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support prefix queries"
+        )
+
+    def memory_usage(self) -> int:
+        """ Returns the approximate bytes held by the built structure """
+        return 0
+
+    def close(self) -> None:
+        """ Releases files or mappings held by the engine """
+
+
+ENGINES: dict[str, type[SearchEngine]] = {}
+
+
+def register_engine(
+    name: str,
+) -> Callable[[type[SearchEngine]], type[SearchEngine]]:
+    """Class decorator registering an engine under ``name``.
+
+    Args:
+        name (str): The name used by ``ALGORITHM=`` in config.txt.
+    Returns:
+        Callable: The decorator, which returns the class unchanged.
+    """
+    def register(engine: type[SearchEngine]) -> type[SearchEngine]:
+        ENGINES[name] = engine
+        return engine
+    return register
+
+
+def get_engine(name: str) -> type[SearchEngine]:
+    """Returns the engine class registered as ``name``, or imported from a
+    ``package.module:ClassName`` reference.
+
+    Args:
+        name (str): The engine name or reference.
+    Returns:
+        type[SearchEngine]: The engine class.
+    Raises:
+        KeyError: If no such engine exists.
+    """
+    if name in ENGINES:
+        return ENGINES[name]
+
+    module_name, _, class_name = name.partition(":")
+    if class_name:
+        try:
+            engine = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError) as e:
+            raise KeyError(f"Cannot load search engine '{name}': {e}") from e
+        if isinstance(engine, type) and issubclass(engine, SearchEngine):
+            return engine
+
+    raise KeyError(
+        f"Unknown search engine '{name}', expected one of {sorted(ENGINES)}"
+    )
+
+
+def load_engine(name: str, file_path: str) -> SearchEngine:
+    """Creates and builds the engine ``name`` over ``file_path``.
+
+    Args:
+        name (str): The engine name or reference.
+        file_path (str): The file to search.
+    Returns:
+        SearchEngine: The built engine.
+    """
+    engine = get_engine(name)(file_path)
+    engine.build()
+    return engine
+
+
+def object_tree_size(root: Any) -> int:
+    """ Approximates the memory of a node tree linked by ``children``
+    dicts, counting each node, its instance dict and its children dict """
+    size, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        size += sys.getsizeof(node)
+        if hasattr(node, "__dict__"):
+            size += sys.getsizeof(node.__dict__)
+        if node.children:
+            size += sys.getsizeof(node.children)
+            stack.extend(node.children.values())
+    return size
+
+
+@register_engine("naive")
+class NaiveEngine(SearchEngine):
+    """ Reads the file line by line on every lookup; nothing is built """
+    strip_lines = True
+    scanning = True
+
+    def build(self) -> None:
+        """ Nothing to build """
+
+    def search(self, query: bytes) -> bool:
+        """ Scans the file for a line equal to the (stripped) query """
+        return naive_search(self.file_path, query)
+
+
+@register_engine("mmap")
+class MmapEngine(SearchEngine):
+    """ Maps and scans the file on every lookup; nothing is built
+
+    Note: matches the query anywhere in the file, not only whole lines.
+    """
+    scanning = True
+
+    def build(self) -> None:
+        """ Nothing to build """
+
+    def search(self, query: bytes) -> bool:
+        """ Scans the mapped file for the query bytes """
+        return mmap_search(self.file_path, query)
+
+
+@register_engine("scan")
+class ScanEngine(SearchEngine):
+    """ Scans the mapped file for the exact line on every lookup; nothing
+    is built, so lookups always see the current file (large files are
+    scanned in parallel chunks) """
+    scanning = True
+
+    def build(self) -> None:
+        """ Nothing to build """
+
+    def search(self, query: bytes) -> bool:
+        """ Looks for a line equal to the query """
+        return scan_search(self.file_path, query)
+
+
+@register_engine("hash")
+class HashEngine(SearchEngine):
+    """ Set of every stripped line, as in hash_based_search
+
+    Attributes:
+        lines (set[bytes]): The stripped lines of the file
+    """
+    strip_lines = True
+
+    def build(self) -> None:
+        """ Reads every line into the set """
+        with open(self.file_path, 'rb') as file:
+            self.lines = set(line.strip() for line in file)
+
+    def search(self, query: bytes) -> bool:
+        """ Looks the raw query up in the set """
+        return query in self.lines
+
+    def memory_usage(self) -> int:
+        """ Returns the size of the set and its strings """
+        return sys.getsizeof(self.lines) + sum(
+            sys.getsizeof(line) for line in self.lines
+        )
+
+
+@register_engine("trie")
+class TrieEngine(SearchEngine):
+    """ Per-byte Trie of every stripped line
+
+    Attributes:
+        trie (Trie): The built trie
+    """
+    strip_lines = True
+
+    def build(self) -> None:
+        """ Inserts every line into the trie """
+        self.trie = Trie()
+        with open(self.file_path, 'rb') as file:
+            for line in file:
+                self.trie.insert(line.strip())
+
+    def search(self, query: bytes) -> bool:
+        """ Walks the trie with the raw query bytes """
+        return self.trie.search(query)
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """ Reads the count kept on the prefix's node """
+        return self.trie.prefix_count(prefix)
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int | None = None) -> Iterator[bytes]:
+        """ Walks the prefix's subtree in byte order """
+        for word in self.trie.prefix_words(prefix, limit):
+            # Only bytes lines are inserted, so only bytes come back
+            assert isinstance(word, bytes)
+            yield word
+
+    def memory_usage(self) -> int:
+        """ Returns the approximate size of the trie nodes """
+        return object_tree_size(self.trie.root)
+
+
+@register_engine("radix")
+class RadixEngine(SearchEngine):
+    """ Path-compressed radix tree of every stripped line
+
+    Attributes:
+        tree (RadixTree): The built tree
+    """
+    strip_lines = True
+
+    def build(self) -> None:
+        """ Bulk-builds the tree from the sorted lines """
+        self.tree = build_radix_tree(self.file_path)
+
+    def search(self, query: bytes) -> bool:
+        """ Walks the tree with the raw query bytes """
+        return self.tree.search(query)
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """ Reads the subtree count precomputed at build time """
+        return self.tree.prefix_count(prefix)
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int | None = None) -> Iterator[bytes]:
+        """ Walks the prefix's subtree in byte order """
+        return self.tree.prefix_lines(prefix, limit)
+
+    def memory_usage(self) -> int:
+        """ Returns the approximate size of the nodes and source buffer """
+        return object_tree_size(self.tree.root) + len(self.tree.buffer)
+
+
+@register_engine("line_index")
+class LineIndexEngine(SearchEngine):
+    """ Sorted line-offset index, persisted in a sidecar file
+
+    Attributes:
+        index (LineIndex): The mapped index
+    """
+    persisted = True
+
+    def build(self) -> None:
+        """ Maps the sidecar index, rebuilding it if stale """
+        if self.persisted:
+            self.index = load_line_index(self.file_path)
+        else:
+            self.index = LineIndex.from_file(self.file_path)
+
+    def search(self, query: bytes) -> bool:
+        """ Binary-searches the sorted entries """
+        return self.index.search(query)
+
+    def search_many(self, queries: Sequence[bytes]) -> list[bool]:
+        """ Merge-walks the sorted batch against the sorted entries """
+        return self.index.search_many(queries)
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """ Bisects both ends of the prefix's run of entries """
+        return self.index.prefix_count(prefix)
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int | None = None) -> Iterator[bytes]:
+        """ Reads the prefix's run of entries in order """
+        return self.index.prefix_lines(prefix, limit)
+
+    def memory_usage(self) -> int:
+        """ Returns the size of the entry array """
+        return self.index.memory_usage()
+
+    def close(self) -> None:
+        """ Unmaps the file and the sidecar """
+        self.index.close()
+
+
+@register_engine("line_index_memory")
+class InMemoryLineIndexEngine(LineIndexEngine):
+    """ Sorted line-offset index built in memory, never persisted """
+    persisted = False
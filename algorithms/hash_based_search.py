@@ -13,9 +13,9 @@ def hash_based_search(file_path: str, query: bytes) -> bool:
         bool: True if the search string is found in the file, False otherwise.
     """
     isFound = False
-    key = query.decode('utf-8')
+    key = query
 
-    with open(file_path, 'r') as file:
+    with open(file_path, 'rb') as file:
         lines = set(line.strip() for line in file)
 
     isFound = True if key in lines else False
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+""" Persisted sidecar file for the sorted line-offset index
+
+The sidecar holds a copy of the source file next to the entries, and the
+index maps that copy instead of the source: the sidecar is only ever
+replaced by a rename, so a mapping of it stays valid however the source
+is changed. Layout (little-endian):
+    0   8s   magic
+    8   I    format version
+    12  I    reserved
+    16  Q    source file size
+    24  q    source file mtime in nanoseconds
+    32  Q    number of entries
+    40  16s  blake2b digest of the source file
+    56  Q    offset of the source copy, a multiple of DATA_ALIGNMENT
+    64  Q*n  packed entries, as built by sorted_line_entries
+    ...      zero padding up to the source copy
+    ...      the source file's bytes
+"""
+
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import NamedTuple
+from algorithms.line_index import LineIndex, sorted_line_entries
+from logger.logger import logger
+
+MAGIC = b"FSTIDX\x00\x01"
+VERSION = 2
+HEADER = struct.Struct("<8sIIQqQ16sQ")
+INDEX_SUFFIX = ".idx"
+# A multiple of mmap.ALLOCATIONGRANULARITY on every platform, so the
+# source copy can be mapped on its own
+DATA_ALIGNMENT = 64 * 1024
+
+
+class IndexHeader(NamedTuple):
+    """ Header of a sidecar index file
+
+    Attributes:
+        source_size (int): Size of the indexed file in bytes
+        source_mtime_ns (int): Modification time of the indexed file
+        entry_count (int): Number of entries following the header
+        digest (bytes): blake2b digest of the indexed file
+        data_offset (int): Where the copy of the indexed file starts
+    """
+    source_size: int
+    source_mtime_ns: int
+    entry_count: int
+    digest: bytes
+    data_offset: int
+
+
+def index_path_for(file_path: str) -> str:
+    """ Returns the path of the sidecar index for ``file_path`` """
+    return file_path + INDEX_SUFFIX
+
+
+def file_digest(buffer) -> bytes:
+    """ Returns the 16-byte blake2b digest of a buffer """
+    return hashlib.blake2b(buffer, digest_size=16).digest()
+
+
+def read_header(index_map: mmap.mmap) -> IndexHeader | None:
+    """Parses the header of a mapped sidecar file.
+
+    Args:
+        index_map (mmap.mmap): The mapped sidecar file.
+    Returns:
+        IndexHeader | None: The header, or None if the file is not a
+                            complete index of this format.
+    """
+    if len(index_map) < HEADER.size:
+        return None
+
+    magic, version, _, size, mtime_ns, count, digest, data_offset = \
+        HEADER.unpack_from(index_map)
+    if magic != MAGIC or version != VERSION:
+        return None
+    if data_offset != data_offset_for(count) \
+            or len(index_map) != data_offset + size:
+        return None
+    return IndexHeader(size, mtime_ns, count, digest, data_offset)
+
+
+def data_offset_for(entry_count: int) -> int:
+    """ Returns where the source copy starts after ``entry_count`` entries """
+    end = HEADER.size + entry_count * 8
+    return -(-end // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+
+def write_index_file(file_path: str, index_path: str | None = None) -> None:
+    """Builds the sorted entries for a file and writes them, with a copy of
+    the file, to its sidecar. The sidecar is written to a temporary file
+    and renamed into place, so readers never see a partial index and
+    existing mappings stay valid.
+
+    Args:
+        file_path (str): The file to index.
+        index_path (str | None, optional): Where to write the sidecar.
+                                           Defaults to ``file_path + .idx``.
+    """
+    index_path = index_path or index_path_for(file_path)
+
+    with open(file_path, 'rb') as file:
+        stat = os.fstat(file.fileno())
+        data = file.read()
+
+    entries = sorted_line_entries(data)
+    if sys.byteorder != "little":
+        entries.byteswap()
+    data_offset = data_offset_for(len(entries))
+
+    # The size is that of the bytes read, in case the file grew meanwhile
+    header = HEADER.pack(MAGIC, VERSION, 0, len(data), stat.st_mtime_ns,
+                         len(entries), file_digest(data), data_offset)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(index_path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(header)
+            tmp.write(entries.tobytes())
+            tmp.write(bytes(data_offset - HEADER.size - len(entries) * 8))
+            tmp.write(data)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def is_index_current(header: IndexHeader, file_path: str) -> bool:
+    """Checks whether a sidecar header still describes ``file_path``.
+    Size and mtime are compared first; when only the mtime moved (e.g. the
+    file was touched or rewritten unchanged) the content hash decides.
+
+    Args:
+        header (IndexHeader): The sidecar header.
+        file_path (str): The indexed file.
+    Returns:
+        bool: True if the sidecar can be used as is.
+    """
+    stat = os.stat(file_path)
+
+    if stat.st_size != header.source_size:
+        return False
+    if stat.st_mtime_ns == header.source_mtime_ns:
+        return True
+
+    with open(file_path, 'rb') as file:
+        return file_digest(file.read()) == header.digest
+
+
+def open_line_index(file_path: str, index_path: str | None = None):
+    """Opens a LineIndex whose entries and line data are mapped straight
+    from a valid sidecar file.
+
+    Args:
+        file_path (str): The indexed file.
+        index_path (str | None, optional): The sidecar path.
+                                           Defaults to ``file_path + .idx``.
+    Returns:
+        LineIndex | None: The index, or None if the sidecar is missing,
+                          corrupt or stale.
+    """
+    index_path = index_path or index_path_for(file_path)
+
+    try:
+        with open(index_path, 'rb') as index_file:
+            index_map = mmap.mmap(index_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+            header = read_header(index_map)
+            if header is None or not is_index_current(header, file_path):
+                index_map.close()
+                return None
+            if not header.entry_count:
+                index_map.close()
+                return LineIndex(b"", array('Q'))
+            # Mapped from the same open file, so both mappings come from
+            # one sidecar even if it is replaced meanwhile
+            buffer = mmap.mmap(index_file.fileno(), header.source_size,
+                               access=mmap.ACCESS_READ,
+                               offset=header.data_offset)
+    except (OSError, ValueError):
+        return None
+
+    entries_end = HEADER.size + header.entry_count * 8
+    entries: memoryview | array
+    if sys.byteorder == "little":
+        entries = memoryview(index_map)[HEADER.size:entries_end].cast('Q')
+    else:
+        swapped = array('Q', index_map[HEADER.size:entries_end])
+        swapped.byteswap()
+        index_map.close()
+        entries = swapped
+
+    return LineIndex(buffer, entries)
+
+
+def load_line_index(file_path: str) -> LineIndex:
+    """Returns a LineIndex for ``file_path``, using the sidecar index when
+    it is valid and rebuilding it when it is missing or stale.
+
+    If the sidecar cannot be written (e.g. a read-only directory) the index
+    is built in memory instead.
+
+    Args:
+        file_path (str): The file to index.
+    Returns:
+        LineIndex: The index over a copy of the file.
+    """
+    index = open_line_index(file_path)
+    if index is not None:
+        logger.info(f"Using index file {index_path_for(file_path)}")
+        return index
+
+    logger.info(f"Index file for {file_path} missing or stale, rebuilding")
+    try:
+        write_index_file(file_path)
+    except OSError as e:
+        logger.warning(f"Could not write index file, indexing in memory: {e}")
+        return LineIndex.from_file(file_path)
+
+    index = open_line_index(file_path)
+    # The file changed again while the sidecar was being written
+    return index if index is not None else LineIndex.from_file(file_path)
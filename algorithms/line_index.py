@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+""" Compact sorted line-offset index over a private copy of a file """
+
+
+import mmap
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Iterator, Sequence
+
+# Each entry packs a line's start offset (high 40 bits, files up to 1 TiB)
+# and its length (low 24 bits, lines up to 16 MiB) into one unsigned 64-bit
+LENGTH_BITS = 24
+LENGTH_MASK = (1 << LENGTH_BITS) - 1
+
+
+def sorted_line_entries(buffer: bytes | mmap.mmap, start: int = 0,
+                        end: int | None = None,
+                        strip: bool = False) -> array:
+    """Builds the packed (offset, length) entries of every line in a
+    buffer, or in ``buffer[start:end]``, sorted by line content.
+
+    Args:
+        buffer (bytes | mmap.mmap): The file contents.
+        start (int, optional): Where the first line starts. Defaults to 0.
+        end (int | None, optional): Where the range ends. Defaults to the
+                                    end of the buffer.
+        strip (bool, optional): Whether each entry covers the line
+                                stripped of surrounding whitespace, rather
+                                than without a trailing ``\\r``.
+                                Defaults to False.
+    Returns:
+        array: An ``array('Q')`` of packed entries, sorted by line bytes,
+               with offsets into the whole buffer.
+    Raises:
+        ValueError: If a line is longer than the packed length allows.
+    """
+    # Splitting in C is far faster than walking newlines from Python; the
+    # temporary line list is dropped as soon as the entries are packed
+    lines = buffer[start:end].split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+
+    starts = list(accumulate((len(line) + 1 for line in lines),
+                             initial=start))
+    if strip:
+        keys = [line.strip() for line in lines]
+        # Entries point past the leading whitespace of each line
+        starts = [offset + len(line) - len(line.lstrip())
+                  for offset, line in zip(starts, lines)]
+    else:
+        keys = [line[:-1] if line.endswith(b"\r") else line
+                for line in lines]
+    order = sorted(range(len(lines)), key=keys.__getitem__)
+
+    entries = array('Q')
+    for i in order:
+        length = len(keys[i])
+        if length > LENGTH_MASK:
+            raise ValueError(f"Line at offset {starts[i]} is too long")
+        entries.append(starts[i] << LENGTH_BITS | length)
+
+    return entries
+
+
+class LineIndex:
+    """ Exact-line index storing only sorted line offsets
+
+    Lines are never decoded: a lookup is a binary search over the packed
+    offsets, sorted by line content, comparing the raw bytes of each
+    probed line. Memory use is 8 bytes per line on top of the line data.
+
+    The line data is a copy the index owns: the file read into memory, or
+    the copy kept in the sidecar index file and mapped from there (shared
+    and page-cached). The source file itself is never mapped, because
+    reading a mapping of a file truncated in place kills the process
+    with SIGBUS.
+
+    A line is the bytes between two newlines, without a trailing ``\\r``.
+
+    Attributes:
+        buffer (mmap.mmap | bytes): A copy of the file contents
+        entries (Sequence[int]): Packed (offset, length) entries sorted by
+                                 line content
+    """
+    def __init__(self, buffer, entries: Sequence[int]) -> None:
+        """ Initializes the index over already sorted entries """
+        self.buffer = buffer
+        self.entries = entries
+
+    @classmethod
+    def from_file(cls, file_path: str) -> "LineIndex":
+        """Reads a file and builds the sorted entries over it.
+
+        Args:
+            file_path (str): The path to the file to be indexed.
+        Returns:
+            LineIndex: The index over the file's contents.
+        """
+        with open(file_path, 'rb') as file:
+            buffer = file.read()
+
+        return cls(buffer, sorted_line_entries(buffer))
+
+    def line_at(self, entry: int) -> bytes:
+        """Returns the line referenced by a packed entry.
+
+        Args:
+            entry (int): A packed (offset, length) entry.
+        Returns:
+            bytes: The line, without its newline or trailing carriage return.
+        """
+        start = entry >> LENGTH_BITS
+        return self.buffer[start:start + (entry & LENGTH_MASK)]
+
+    def search(self, query: bytes) -> bool:
+        """Searches for an exact line match of the query.
+
+        Args:
+            query (bytes): The line to search for.
+        Returns:
+            bool: True if the line exists, False otherwise.
+        """
+        entries = self.entries
+        pos = bisect_left(entries, query, key=self.line_at)
+        return pos < len(entries) and self.line_at(entries[pos]) == query
+
+    def search_many(self, queries: Sequence[bytes]) -> list[bool]:
+        """Looks up a batch of queries in one pass over the index.
+
+        The batch is sorted and merge-walked against the sorted entries:
+        each bisect starts where the previous query landed, so the search
+        window only ever shrinks.
+
+        Args:
+            queries (Sequence[bytes]): The lines to search for.
+        Returns:
+            list[bool]: Whether each query exists, in the input order.
+        """
+        entries = self.entries
+        line_at = self.line_at
+        found = [False] * len(queries)
+        pos = 0
+
+        for i in sorted(range(len(queries)), key=queries.__getitem__):
+            pos = bisect_left(entries, queries[i], pos, key=line_at)
+            if pos == len(entries):
+                break
+            found[i] = line_at(entries[pos]) == queries[i]
+
+        return found
+
+    def prefix_range(self, prefix: bytes) -> tuple[int, int]:
+        """Returns the slice of the sorted entries whose lines start with
+        ``prefix``; such lines are always contiguous.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+        Returns:
+            tuple[int, int]: The (start, end) positions in ``entries``.
+        """
+        entries = self.entries
+        line_at = self.line_at
+        size = len(prefix)
+        lo = bisect_left(entries, prefix, key=line_at)
+        hi = bisect_right(entries, prefix, lo,
+                          key=lambda entry: line_at(entry)[:size])
+        return lo, hi
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """Counts the lines starting with ``prefix`` with two bisects.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+        Returns:
+            int: The number of lines, duplicates included.
+        """
+        lo, hi = self.prefix_range(prefix)
+        return hi - lo
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int | None = None) -> Iterator[bytes]:
+        """Yields the lines starting with ``prefix`` in byte order, reading
+        each from the mapping only when it is consumed.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+            limit (int | None, optional): The most lines to yield.
+                                          Defaults to all of them.
+        Yields:
+            bytes: Each matching line, duplicates repeated.
+        """
+        lo, hi = self.prefix_range(prefix)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        entries = self.entries
+        for pos in range(lo, hi):
+            yield self.line_at(entries[pos])
+
+    def memory_usage(self) -> int:
+        """Returns the size in bytes of the entry array."""
+        return len(self.entries) * 8
+
+    def close(self) -> None:
+        """ Releases the mappings; the index is unusable afterwards """
+        if isinstance(self.entries, memoryview):
+            # Entries mapped from a sidecar index file
+            index_map = self.entries.obj
+            self.entries.release()
+            if isinstance(index_map, mmap.mmap):
+                index_map.close()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __len__(self) -> int:
+        """ Returns the number of indexed lines """
+        return len(self.entries)
+
+
+def line_index_search(file_path: str, query: bytes) -> bool:
+    """
+    Searches for a query line in a file using a sorted line-offset index.
+    Args:
+        file_path (str): The path to the file to be searched.
+        query (bytes): The line to search for.
+    Returns:
+        bool: True if the line is found in the file, False otherwise.
+    """
+    index = LineIndex.from_file(file_path)
+    try:
+        return index.search(query)
+    finally:
+        index.close()
@@ -15,11 +15,7 @@ def mmap_search(file_path: str, query: bytes) -> bool:
     """
     # Open the file in read-only mode
     with open(file_path, 'rb', buffering=0) as file:
-        # create a memory-mapped file object
-        m = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
-
-        # search for the query string in the memory-mapped file
-        if m.find(query) != -1:
-            print(f'Found the string: {query!r}')
-            return True
-        return False
+        # create a memory-mapped file object, unmapped on leaving the block
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            # search for the query string in the memory-mapped file
+            return m.find(query) != -1
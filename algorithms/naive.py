@@ -31,9 +31,9 @@ def naive_search(file_path: str, search_sting: bytes) -> bool:
         bool: True if the search string is found in the file, False otherwise.
     """
 
-    search_key: str = search_sting.decode('utf-8')
-
-    for line in read_file_generator(file_path):
-        if line == search_key:
-            return True
+    # Lines are compared as raw bytes, so nothing is decoded
+    with open(file_path, 'rb') as file:
+        for line in file:
+            if line.strip() == search_sting:
+                return True
     return False
@@ -2,55 +2,323 @@
 """ Implements a radix search algorithm """
 
 
+from typing import Iterable, Iterator, List, Tuple
+
+# A line as a (start, end) byte range into the tree's buffer
+span_type = Tuple[int, int]
+
+
 class RadixNode:
     """ Node class for the radix tree
 
+    The edge leading into a node is labelled with ``buffer[start:end]``
+    of the tree's source buffer, so labels are never copied.
+
     Attributes:
-        children (dict): A dictionary of children nodes
+        start (int): Start of the edge label in the buffer
+        end (int): End of the edge label in the buffer
+        children (dict | None): Children keyed by the first byte of their
+                                edge label, None for leaves
         is_end_of_word (bool): Marks the end of a full line
+        count (int): The lines ending in this node's subtree, duplicates
+                     included
     """
-    def __init__(self) -> None:
-        """ Initializes the node with an empty dictionary of children """
-        self.children: dict = {}
+    __slots__ = ("start", "end", "children", "is_end_of_word", "count")
+
+    def __init__(self, start: int = 0, end: int = 0) -> None:
+        """ Initializes a childless node whose label is buffer[start:end] """
+        self.start = start
+        self.end = end
+        self.children: dict | None = None
         self.is_end_of_word = False  # Marks the end of a full line
+        self.count = 0
+
+
+def common_prefix_length(a: bytes, b: bytes) -> int:
+    """Returns the length of the longest common prefix of two byte strings.
+
+    Uses a binary search over prefix slices, so the comparisons run in C.
+    """
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
 
 class RadixTree:
-    """ Radix tree class for searching lines
+    """ Path-compressed radix (Patricia) tree for searching lines
+
+    Every node is slotted and every edge label is a byte range into
+    ``buffer``; a chain of single-child nodes is stored as one edge.
 
     Attributes:
+        buffer (bytes): The source buffer all edge labels point into
         root (RadixNode): The root node of the radix tree
     """
-    def __init__(self) -> None:
+    def __init__(self, buffer: bytes = b"") -> None:
         """ Initializes the radix tree with an empty root node """
+        self.buffer = buffer
         self.root = RadixNode()
 
-    def insert(self, line) -> None:
-        """ Inserts a line into the radix tree """
+    def _split(self, parent: RadixNode, child: RadixNode,
+               length: int) -> RadixNode:
+        """ Splits ``child``'s edge after ``length`` bytes, returning the
+        new intermediate node that takes its place under ``parent`` """
+        buffer = self.buffer
+        middle = RadixNode(child.start, child.start + length)
+        middle.count = child.count
+        child.start += length
+        middle.children = {buffer[child.start]: child}
+        parent.children[buffer[middle.start]] = middle
+        return middle
+
+    def insert(self, start: int, end: int) -> None:
+        """ Inserts the line ``buffer[start:end]`` into the radix tree """
+        buffer = self.buffer
         node = self.root
+        pos = start
+        path = [node]
+
+        while pos < end:
+            if node.children is None:
+                node.children = {}
+            child = node.children.get(buffer[pos])
+
+            # No edge shares a first byte: the rest of the line is one leaf
+            if child is None:
+                leaf = RadixNode(pos, end)
+                leaf.is_end_of_word = True
+                node.children[buffer[pos]] = leaf
+                path.append(leaf)
+                break
+
+            # Follow the edge as far as it matches, splitting it if the
+            # line diverges (or ends) part way along
+            length = child.end - child.start
+            matched = common_prefix_length(
+                buffer[child.start:child.end],
+                buffer[pos:min(pos + length, end)]
+            )
+            if matched < length:
+                child = self._split(node, child, matched)
 
-        # Traverse the tree and insert each character
-        for char in line:
-            # Create a new node if the character is not in the children
-            if char not in node.children:
-                node.children[char] = RadixNode()  # Create a new node
-            node = node.children[char]  # Move to the next node
-        node.is_end_of_word = True  # Mark the end of the line
+            node = child
+            path.append(node)
+            pos += matched
+        else:
+            node.is_end_of_word = True  # Mark the end of the line
 
-    def search(self, query) -> bool:
+        for visited in path:
+            visited.count += 1
+
+    @classmethod
+    def from_sorted_lines(cls, buffer: bytes,
+                          spans: Iterable[span_type]) -> "RadixTree":
+        """Bulk-builds a tree from lines given in ascending byte order.
+
+        Each line only ever extends the path of the previous one, so the
+        tree is built with a stack of that path and no lookups. Node counts
+        first record the lines ending at each node and are summed into
+        subtree totals in one pass at the end.
+
+        Args:
+            buffer (bytes): The source buffer.
+            spans (Iterable[span_type]): The (start, end) ranges of the
+                                         lines, sorted by their content.
+        Returns:
+            RadixTree: The built tree.
+        """
+        tree = cls(buffer)
+        # Path of the previous line as (node, depth at the end of its edge)
+        stack: List[Tuple[RadixNode, int]] = [(tree.root, 0)]
+        previous = b""
+
+        for start, end in spans:
+            line = buffer[start:end]
+            shared = common_prefix_length(previous, line)
+            if stack[-1][1] == len(line) == shared:
+                stack[-1][0].is_end_of_word = True  # Duplicate (or empty)
+                stack[-1][0].count += 1
+                continue
+
+            popped = None
+            while stack[-1][1] > shared:
+                popped = stack.pop()[0]
+
+            parent, depth = stack[-1]
+            # The line leaves the previous path part way along an edge
+            if popped is not None and depth < shared:
+                parent = tree._split(parent, popped, shared - depth)
+                parent.count = 0  # No line ends here yet
+                stack.append((parent, shared))
+
+            if shared == len(line):
+                parent.is_end_of_word = True
+                parent.count += 1
+            else:
+                leaf = RadixNode(start + shared, end)
+                leaf.is_end_of_word = True
+                leaf.count = 1
+                if parent.children is None:
+                    parent.children = {}
+                parent.children[buffer[start + shared]] = leaf
+                stack.append((leaf, len(line)))
+
+            previous = line
+
+        tree._sum_counts()
+        return tree
+
+    def _sum_counts(self) -> None:
+        """ Turns per-node line-end counts into subtree totals """
+        order = [self.root]
+        for node in order:  # Pre-order: parents before their children
+            if node.children:
+                order.extend(node.children.values())
+        for node in reversed(order):
+            if node.children:
+                node.count += sum(
+                    child.count for child in node.children.values()
+                )
+
+    def search(self, query: bytes) -> bool:
         """ Searches for an exact match of the query.
 
         args:
-            query (str): The query to search for
+            query (bytes): The query to search for
         """
+        buffer = self.buffer
         node = self.root
+        pos = 0
+
+        # Traverse the tree one edge label at a time
+        while pos < len(query):
+            if node.children is None:
+                return False
+            child = node.children.get(query[pos])
+            if child is None:
+                return False
 
-        # Traverse the tree and search for each character
-        for char in query:
-            if char not in node.children:
+            end = pos + child.end - child.start
+            if buffer[child.start:child.end] != query[pos:end]:
                 return False
             # Move to the next node
-            node = node.children[char]
-        return True if node.is_end_of_word else False
+            node = child
+            pos = end
+        return node.is_end_of_word
+
+    def _find_prefix(self, prefix: bytes) -> Tuple[RadixNode, bytes] | None:
+        """ Returns the highest node whose subtree holds exactly the lines
+        starting with ``prefix``, with the bytes on the path to it """
+        buffer = self.buffer
+        node = self.root
+        path = b""
+
+        while len(path) < len(prefix):
+            child = node.children.get(prefix[len(path)]) \
+                if node.children else None
+            if child is None:
+                return None
+            label = buffer[child.start:child.end]
+            # The prefix may end part way along the edge
+            if not label.startswith(prefix[len(path):len(path) + len(label)]):
+                return None
+            node = child
+            path += label
+        return node, path
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """Counts the lines starting with ``prefix`` from the precomputed
+        subtree counts.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+        Returns:
+            int: The number of lines, duplicates included.
+        """
+        found = self._find_prefix(prefix)
+        return found[0].count if found else 0
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int | None = None) -> Iterator[bytes]:
+        """Yields the lines starting with ``prefix`` in byte order, walking
+        the subtree lazily.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+            limit (int | None, optional): The most lines to yield.
+                                          Defaults to all of them.
+        Yields:
+            bytes: Each matching line, duplicates repeated.
+        """
+        found = self._find_prefix(prefix)
+        if found is None:
+            return
+        remaining = found[0].count if limit is None else limit
+        buffer = self.buffer
+        stack = [found]
+
+        while stack and remaining > 0:
+            node, path = stack.pop()
+            children = node.children or {}
+            # Lines ending here sort before every longer line below
+            own = node.count - sum(c.count for c in children.values())
+            for _ in range(min(own, remaining)):
+                yield path
+            remaining -= own
+            for key in sorted(children, reverse=True):
+                child = children[key]
+                stack.append((child, path + buffer[child.start:child.end]))
+
+
+def line_spans(buffer: bytes) -> List[span_type]:
+    """
+    Returns the (start, end) range of every line in a buffer, with leading
+    and trailing whitespace excluded as ``bytes.strip`` would.
+    Args:
+        buffer (bytes): The file contents.
+    Returns:
+        List[span_type]: The line ranges, in file order.
+    """
+    spans: List[span_type] = []
+    pos = 0
+
+    lines = buffer.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+
+    for line in lines:
+        stripped = line.strip()
+        start = pos + len(line) - len(line.lstrip())
+        spans.append((start, start + len(stripped)))
+        pos += len(line) + 1
+
+    return spans
+
+
+def build_radix_tree(filename: str) -> RadixTree:
+    """
+    Builds a radix tree containing every line of a file.
+
+    The tree is meant to be built once and then shared read-only, so
+    repeated lookups do not pay for re-reading the file.
+
+    Args:
+        filename (str): The path to the file to be indexed.
+    Returns:
+        RadixTree: A radix tree holding every (stripped) line of the file.
+    """
+    with open(filename, "rb") as file:
+        buffer = file.read()
+
+    spans = line_spans(buffer)
+    spans.sort(key=lambda span: buffer[span[0]:span[1]])
+
+    return RadixTree.from_sorted_lines(buffer, spans)
 
 
 def radix_search(filename: str, query: bytes) -> bool:
@@ -65,12 +333,7 @@ def radix_search(filename: str, query: bytes) -> bool:
         bool: True if the query string is found in the file, False otherwise.
     """
 
-    radix_tree = RadixTree()
-
-    # Read file and insert lines into the radix tree
-    with open(filename, "r") as file:
-        for line in file:
-            radix_tree.insert(line.strip())  # Strip to avoid newline mismatches
+    radix_tree = build_radix_tree(filename)
 
     # Search for the query
-    return radix_tree.search(query.decode('utf-8'))
+    return radix_tree.search(query)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+""" Index-free exact-line search over a memory-mapped file
+
+Looks for ``\\nquery\\n`` in the mapped bytes, with the first line and an
+unterminated last line checked separately, so a query only matches a
+whole line: unlike ``mmap_search``, ``abc`` is not found in ``xabcx``.
+Nothing is decoded or built, so every lookup sees the file as it is now.
+
+Files of PARALLEL_THRESHOLD bytes or more are split into newline-aligned
+chunks scanned by a process pool (``mmap.find`` holds the GIL, so threads
+would not help); the lookup returns on the first chunk that hits and
+cancels the chunks not yet started.
+"""
+
+
+import atexit
+import concurrent.futures
+import mmap
+import multiprocessing
+import os
+
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+CHUNKS_PER_WORKER = 4
+
+# How far into the file to look for the first newline, to tell whether
+# lines end with "\n" or "\r\n"
+TERMINATOR_PROBE = 64 * 1024
+
+_pool: concurrent.futures.ProcessPoolExecutor | None = None
+
+
+def line_terminator(buffer) -> bytes:
+    """ Returns b"\\r\\n" if the first line ends with it, else b"\\n" """
+    end = buffer.find(b"\n", 0, TERMINATOR_PROBE)
+    return b"\r\n" if end > 0 and buffer[end - 1] == 0x0D else b"\n"
+
+
+def find_line(buffer, query: bytes, start: int = 0,
+              end: int | None = None, terminator: bytes = b"\n") -> bool:
+    """Returns whether a line of ``buffer[start:end]`` equals ``query``.
+
+    ``start`` must be 0 or just after a newline and ``end`` the buffer
+    length or just after a newline, so every line is either wholly inside
+    the range or wholly outside it.
+
+    Args:
+        buffer: The bytes-like file contents (e.g. an mmap).
+        query (bytes): The line to look for, without its terminator.
+        start (int, optional): Start of the range. Defaults to 0.
+        end (int | None, optional): End of the range. Defaults to the
+                                    buffer length.
+        terminator (bytes, optional): The line terminator.
+                                      Defaults to b"\\n".
+    Returns:
+        bool: True if some line in the range equals the query.
+    """
+    size = len(buffer)
+    end = size if end is None else end
+    if b"\n" in query:
+        return False
+
+    # The first line of the range has no newline before it in the range
+    line = query + terminator
+    if buffer[start:start + len(line)] == line:
+        return True
+
+    if buffer.find(b"\n" + line, start, end) != -1:
+        return True
+
+    # An unterminated last line has no terminator after it
+    if end == size and buffer[size - 1:size] != b"\n":
+        last = buffer.rfind(b"\n", start, end) + 1
+        if last == 0:
+            last = start
+        return buffer[last:end] == query
+
+    return False
+
+
+def chunk_bounds(buffer, chunks: int) -> list[tuple[int, int]]:
+    """Splits ``buffer`` into up to ``chunks`` ranges that start and end on
+    line boundaries.
+
+    Args:
+        buffer: The bytes-like file contents.
+        chunks (int): The number of ranges wanted.
+    Returns:
+        list[tuple[int, int]]: The (start, end) ranges, in order, covering
+                               the whole buffer.
+    """
+    size = len(buffer)
+    bounds = [0]
+    for i in range(1, chunks):
+        newline = buffer.find(b"\n", max(size * i // chunks, bounds[-1]))
+        if newline == -1:
+            break
+        if newline + 1 < size:
+            bounds.append(newline + 1)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _scan_chunk(file_path: str, query: bytes, start: int, end: int,
+                terminator: bytes) -> bool:
+    """ Pool task: maps the file and searches one range """
+    with open(file_path, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return find_line(buffer, query, start, end, terminator)
+
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """ Returns the process pool, started on first use """
+    global _pool
+    if _pool is None:
+        # forkserver: forking a multi-threaded server directly is unsafe
+        _pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def scan_search(file_path: str, query: bytes,
+                parallel_threshold: int = PARALLEL_THRESHOLD,
+                workers: int | None = None) -> bool:
+    """Searches a file for a line equal to ``query``, without an index.
+
+    Args:
+        file_path (str): The file to search.
+        query (bytes): The line to look for.
+        parallel_threshold (int, optional): Files at least this large are
+                                 scanned in parallel chunks.
+                                 Defaults to PARALLEL_THRESHOLD.
+        workers (int | None, optional): The parallelism to split for.
+                                 Defaults to the number of CPUs.
+    Returns:
+        bool: True if the line exists, False otherwise.
+    """
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            terminator = line_terminator(buffer)
+            workers = workers or os.cpu_count() or 1
+            if len(buffer) < parallel_threshold or workers == 1:
+                return find_line(buffer, query, terminator=terminator)
+            bounds = chunk_bounds(buffer, workers * CHUNKS_PER_WORKER)
+
+    pool = _get_pool()
+    futures = [
+        pool.submit(_scan_chunk, file_path, query, start, end, terminator)
+        for start, end in bounds
+    ]
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            if future.result():
+                return True
+        return False
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+""" Index of a growing file as a base index plus one segment per appended
+tail
+
+When a file only grows, the lines past the indexed offset are indexed on
+their own (a LineIndex over just that byte range, read from the file) and
+searched next to the existing index, so freshness costs the size of the
+tail rather than of the file. Segments are immutable: appending returns a
+new SegmentedIndex sharing the old segments, which keeps index
+generations swappable.
+"""
+
+
+import heapq
+import itertools
+from typing import Any, Iterator, Sequence
+from algorithms.line_index import LineIndex, sorted_line_entries
+
+
+def index_tail(file_path: str, start: int,
+               strip: bool = False) -> tuple[LineIndex | None, int]:
+    """Indexes the complete lines of a file from offset ``start``.
+
+    A trailing line without its newline is left for the next call, since
+    the writer may not have finished it. The tail is read rather than
+    mapped, so the file being truncated later cannot fault a lookup.
+
+    Args:
+        file_path (str): The growing file.
+        start (int): The offset indexed so far; must follow a newline.
+        strip (bool, optional): Whether lines are stripped of surrounding
+                                whitespace, to match an engine with
+                                ``strip_lines``. Defaults to False.
+    Returns:
+        tuple[LineIndex | None, int]: The index of the new lines (None if
+                                      there are none) and the offset
+                                      indexed up to.
+    Raises:
+        ValueError: If ``start`` is past the end of the file or not at
+                    the start of a line.
+    """
+    # The byte before ``start`` is read too, to check it ends a line
+    base = 1 if start else 0
+    with open(file_path, 'rb') as file:
+        file.seek(start - base)
+        buffer = file.read()
+
+    if start and buffer[:1] != b"\n":
+        raise ValueError(f"Offset {start} is not at a line start")
+
+    end = buffer.rfind(b"\n", base) + 1
+    if end <= base:
+        return None, start
+    entries = sorted_line_entries(buffer, base, end, strip)
+    return LineIndex(buffer, entries), start - base + end
+
+
+class SegmentedIndex:
+    """ Searches several indexes over disjoint parts of one file
+
+    Attributes:
+        segments (list[Any]): The base index first, then one LineIndex per
+                              appended tail
+    """
+    def __init__(self, segments: Sequence[Any]) -> None:
+        """ Initializes the index over its segments """
+        self.segments = list(segments)
+
+    def appended(self, segment: Any) -> "SegmentedIndex":
+        """ Returns a new index with one more segment """
+        return SegmentedIndex(self.segments + [segment])
+
+    def search(self, query: bytes) -> bool:
+        """Searches every segment, newest last.
+
+        Args:
+            query (bytes): The line to search for.
+        Returns:
+            bool: True if the line exists in some segment.
+        """
+        return any(segment.search(query) for segment in self.segments)
+
+    def search_many(self, queries: Sequence[bytes]) -> list[bool]:
+        """Looks up a batch in one pass over each segment.
+
+        Args:
+            queries (Sequence[bytes]): The lines to search for.
+        Returns:
+            list[bool]: Whether each line exists, in the input order.
+        """
+        found = [False] * len(queries)
+        for segment in self.segments:
+            if hasattr(segment, "search_many"):
+                hits = segment.search_many(queries)
+            else:
+                hits = [segment.search(query) for query in queries]
+            found = [a or b for a, b in zip(found, hits)]
+        return found
+
+    def _prefix_segments(self) -> list[Any]:
+        """ Returns the segments, if all of them support prefix queries """
+        for segment in self.segments:
+            if not hasattr(segment, "prefix_count"):
+                raise NotImplementedError(
+                    f"{type(segment).__name__} does not support prefix "
+                    f"queries"
+                )
+        return self.segments
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """ Sums the prefix counts of the segments """
+        return sum(segment.prefix_count(prefix)
+                   for segment in self._prefix_segments())
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int | None = None) -> Iterator[bytes]:
+        """ Merges the sorted prefix listings of the segments """
+        merged = heapq.merge(*(segment.prefix_lines(prefix, limit)
+                               for segment in self._prefix_segments()))
+        return itertools.islice(merged, limit)
+
+    def memory_usage(self) -> int:
+        """ Returns the summed usage of the segments """
+        return sum(segment.memory_usage() for segment in self.segments
+                   if hasattr(segment, "memory_usage"))
+
+    def __len__(self) -> int:
+        """ Returns the number of lines over all segments """
+        return sum(len(segment) for segment in self.segments)
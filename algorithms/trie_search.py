@@ -2,21 +2,30 @@
 """ implement trie-based search algorithm """
 
 
+from typing import Iterator
+
+
 class TrieNode:
     """A node in the Trie data structure.
     
     Attributes:
         children (dict): A dictionary containing the children of the node.
         is_end_of_word (bool): A flag to indicate the end of a word.
+        count (int): The words inserted through this node, duplicates
+                     included.
     """
     def __init__(self) -> None:
         """Initializes a TrieNode object."""
         self.children: dict = {}
-        self.is_end_of_word: bool = True
+        self.is_end_of_word: bool = False
+        self.count: int = 0
 
 
 class Trie:
     """A Trie data structure.
+
+    Words may be str, keyed by character, or bytes, keyed by byte value;
+    a trie should hold only one kind.
     
     Attributes:
         root (TrieNode): The root node of the Trie.
@@ -25,14 +34,15 @@ class Trie:
         """Initializes a Trie object."""
         self.root = TrieNode()
 
-    def insert(self, word: str) -> None:
+    def insert(self, word: str | bytes) -> None:
         """Inserts a word into the Trie.
         
         Args:
-            word (str): The word to be inserted.
+            word (str | bytes): The word to be inserted.
         """
         # Start at the root node
         node = self.root
+        node.count += 1
         
         # Traverse the Trie to insert the word
         for char in word:
@@ -42,14 +52,15 @@ class Trie:
                 node.children[char] = TrieNode()
             # Move to the next node
             node = node.children[char]
+            node.count += 1
         # Mark the end of the word
         node.is_end_of_word = True
 
-    def search(self, word: str) -> bool:
+    def search(self, word: str | bytes) -> bool:
         """Searches for a word in the Trie.
         
         Args:
-            word (str): The word to search for.
+            word (str | bytes): The word to search for.
         
         Returns:
             bool: True if the word is found in the Trie, False otherwise.
@@ -67,6 +78,58 @@ class Trie:
         # Return True if the end of the word is reached
         return node.is_end_of_word
 
+    def _find_prefix(self, prefix: str | bytes) -> TrieNode | None:
+        """Returns the node reached by walking ``prefix``, if any."""
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def prefix_count(self, prefix: str | bytes) -> int:
+        """Counts the words starting with a prefix.
+
+        Args:
+            prefix (str | bytes): The prefix to look for.
+
+        Returns:
+            int: The number of words, duplicates included.
+        """
+        node = self._find_prefix(prefix)
+        return node.count if node else 0
+
+    def prefix_words(self, prefix: str | bytes,
+                     limit: int | None = None) -> Iterator[str | bytes]:
+        """Yields the words starting with a prefix in sorted order.
+
+        Args:
+            prefix (str | bytes): The prefix to look for.
+            limit (int | None, optional): The most words to yield.
+                Defaults to all of them.
+
+        Yields:
+            str | bytes: Each matching word, duplicates repeated.
+        """
+        node = self._find_prefix(prefix)
+        if node is None:
+            return
+        remaining = node.count if limit is None else limit
+        stack = [(node, prefix)]
+        # Iterating bytes gives ints, which must be wrapped to be appended
+        as_word = (lambda char: bytes((char,))) \
+            if isinstance(prefix, bytes) else (lambda char: char)
+
+        while stack and remaining > 0:
+            node, word = stack.pop()
+            # Words ending here sort before the longer words below
+            own = node.count - sum(c.count for c in node.children.values())
+            for _ in range(min(own, remaining)):
+                yield word
+            remaining -= own
+            for char in sorted(node.children, reverse=True):
+                stack.append((node.children[char], word + as_word(char)))
+
 
 def trie_search(file_path: str, query: bytes) -> bool:
     """
@@ -80,11 +143,11 @@ def trie_search(file_path: str, query: bytes) -> bool:
     # Create a Trie object
     trie: Trie = Trie()
 
-    # Open the file in read mode
-    with open(file_path, "r") as file:
+    # Open the file in binary mode; lines are inserted as raw bytes
+    with open(file_path, "rb") as file:
         # Insert each line from the file into the Trie
         for line in file:
             trie.insert(line.strip())
     
     # Search for the query string in the Trie
-    return trie.search(query.decode('utf-8'))
+    return trie.search(query)
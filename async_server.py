@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+""" asyncio server engine """
+
+
+import asyncio
+import socket
+import ssl
+import time
+from functools import partial
+from typing import Union
+from admission import BUSY, AdmissionControl
+from algorithms.engines import DEFAULT_ENGINE, get_engine
+from index_manager import ManagedIndex
+from logger.logger import logger, sample
+from metrics import METRICS
+from protocol import (
+    LINE_DELIMITED,
+    LINE_TOO_LONG,
+    SINGLE_QUERY,
+    FrameTooLongError,
+    LineFramer,
+    QuerySession,
+    process_query,
+)
+from utils import is_enabled
+
+config_type = dict[str, Union[str, int]]
+
+
+async def serve_line_queries(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    index_manager: ManagedIndex,
+    payload_size: int = 1024,
+    reread: bool = False,
+    max_batch: int = 100_000,
+    max_list: int = 1000,
+    read_timeout: float | None = None,
+    idle_timeout: float | None = None,
+    offload: bool = False,
+) -> None:
+    """
+    Answers newline-delimited queries on one connection until the client
+    closes it or a timeout expires. Queries may be pipelined or grouped
+    with the BATCH command;
+    the responses to every query completed by one read are written in
+    order, coalesced into chunks and drained one by one so a long
+    PREFIX_LIST is streamed.
+
+    Args:
+        reader (asyncio.StreamReader): The client's read stream.
+        writer (asyncio.StreamWriter): The client's write stream.
+        index_manager (ManagedIndex): Owns the shared index.
+        payload_size (int, optional): The read size and the longest query
+                                      accepted. Defaults to 1024.
+        reread (bool, optional): Whether REREAD_ON_QUERY is enabled.
+                                 Defaults to False.
+        max_batch (int, optional): The largest BATCH accepted.
+                                   Defaults to 100000.
+        max_list (int, optional): The most lines one PREFIX_LIST returns.
+                                  Defaults to 1000.
+        read_timeout (float | None, optional): Seconds allowed for the
+                                  rest of a started query, and for each
+                                  send. Defaults to None (no limit).
+        idle_timeout (float | None, optional): Seconds allowed between
+                                  queries. Defaults to None (no limit).
+        offload (bool, optional): Whether lookups run in the loop's
+                                  default executor instead of on the loop.
+                                  Defaults to False.
+
+    Returns:
+        None
+    """
+    loop = asyncio.get_running_loop()
+    framer = LineFramer(payload_size)
+    session = QuerySession(index_manager, reread, max_batch, max_list)
+
+    while True:
+        partial_line = framer.partial
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(
+                read_timeout if partial_line else idle_timeout
+            ):
+                data: bytes = await reader.read(payload_size)
+        except TimeoutError:
+            METRICS.inc("read_timeouts" if partial_line else "idle_timeouts")
+            logger.debug(f"Closing connection, "
+                         f"{'read' if partial_line else 'idle'} timeout "
+                         f"expired")
+            return
+        METRICS.observe("recv", time.perf_counter() - start)
+        if not data:
+            return
+
+        try:
+            queries = framer.feed(data)
+        except FrameTooLongError as e:
+            logger.error(f"Error: {e}")
+            responses = session.handle(e.queries)
+            writer.write(responses + LINE_TOO_LONG)
+            await writer.drain()
+            return
+
+        chunks = session.handle_stream(queries)
+        while True:
+            if offload:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+            else:
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            start = time.perf_counter()
+            writer.write(chunk)
+            async with asyncio.timeout(read_timeout):
+                await writer.drain()
+            METRICS.observe("send", time.perf_counter() - start)
+
+
+async def handle_connection(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    index_manager: ManagedIndex,
+    payload_size: int = 1024,
+    reread: bool = False,
+    protocol_mode: str = SINGLE_QUERY,
+    max_batch: int = 100_000,
+    max_list: int = 1000,
+    admission: AdmissionControl | None = None,
+    read_timeout: float | None = None,
+    idle_timeout: float | None = None,
+    offload: bool = False,
+) -> None:
+    """
+    Handles one client connection on the event loop. The index lookup is
+    answered inline unless ``offload`` is set, as for engines scanning the
+    file on every lookup; index rebuilds never run on the loop. The loop does
+    the accept and TLS handshake before calling this, so those phases are
+    not timed in this engine.
+
+    Args:
+        reader (asyncio.StreamReader): The client's read stream.
+        writer (asyncio.StreamWriter): The client's write stream.
+        index_manager (ManagedIndex): Owns the shared index.
+        payload_size (int, optional): The size of the payload to receive.
+                                      Defaults to 1024.
+        reread (bool, optional): Whether REREAD_ON_QUERY is enabled.
+                                 Defaults to False.
+        protocol_mode (str, optional): "single" for one query per
+                                 connection, "line" for many
+                                 newline-delimited queries. Defaults to
+                                 "single".
+        max_batch (int, optional): The largest BATCH accepted in line
+                                 mode. Defaults to 100000.
+        max_list (int, optional): The most lines one PREFIX_LIST returns
+                                 in line mode. Defaults to 1000.
+        admission (AdmissionControl | None, optional): Caps the
+                                 connections served at once; beyond it
+                                 they get BUSY. Defaults to None.
+        read_timeout (float | None, optional): Seconds allowed for a
+                                 query to arrive once started, and for
+                                 each send. Defaults to None (no limit).
+        idle_timeout (float | None, optional): Seconds allowed between
+                                 queries in line mode. Defaults to None.
+        offload (bool, optional): Whether lookups run in the loop's
+                                 default executor. Defaults to False.
+
+    Returns:
+        None
+    """
+    if admission is not None and not admission.try_admit():
+        # The loop has done the handshake, so TLS clients get BUSY too
+        writer.write(BUSY)
+        writer.close()
+        return
+
+    # Unix clients have no address, so they are logged by the socket path
+    address = writer.get_extra_info("peername") or \
+        writer.get_extra_info("sockname")
+    sampled = sample()
+    if sampled:
+        logger.info(f"Connection established with: {address}")
+    start_time = time.time()
+    METRICS.inc("connections")
+    if admission is not None:
+        admission.started()
+
+    try:
+        # Keep the connection open for many newline-delimited queries
+        if protocol_mode == LINE_DELIMITED:
+            await serve_line_queries(
+                reader, writer, index_manager, payload_size, reread, max_batch,
+                max_list, read_timeout, idle_timeout, offload,
+            )
+            return
+
+        # Receive the data from the client, which must come promptly; one
+        # byte more than allowed tells an oversized query from one that
+        # fills the payload exactly
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(read_timeout):
+                data: bytes = await reader.read(payload_size + 1)
+        except TimeoutError:
+            METRICS.inc("read_timeouts")
+            logger.debug(f"No query from {address} in {read_timeout}s")
+            return
+        METRICS.observe("recv", time.perf_counter() - start)
+
+        if not data:
+            logger.debug("No data received!")
+            return
+
+        if len(data) > payload_size:
+            logger.error(f"Error: query from {address} exceeds "
+                         f"{payload_size} bytes")
+            response = LINE_TOO_LONG
+        else:
+            if sampled:
+                logger.info(
+                    f"Data received: {data.decode('utf-8', 'replace')}"
+                )
+            if offload:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    None, process_query, index_manager, data, reread
+                )
+            else:
+                response = process_query(index_manager, data, reread)
+
+        start = time.perf_counter()
+        writer.write(response)
+        async with asyncio.timeout(read_timeout):
+            await writer.drain()
+        METRICS.observe("send", time.perf_counter() - start)
+    except (BrokenPipeError, ConnectionResetError):
+        METRICS.inc("errors")
+        logger.error(f"Error: Broken pipe when sending data to {address}")
+    except TimeoutError:
+        METRICS.inc("errors")
+        logger.error(f"Error: connection with {address} timed out")
+    except Exception as e:
+        METRICS.inc("errors")
+        logger.error(f"Error at handle connection: {e}")
+    finally:
+        if admission is not None:
+            admission.finished()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+        execution_time = time.time() - start_time
+        if sampled:
+            logger.info(f"Connection with {address} closed, "
+                        f"Execution Time: {execution_time:.4f} seconds")
+
+
+async def serve(
+    configurations: config_type,
+    index_manager: ManagedIndex,
+    ssl_context: ssl.SSLContext | None = None,
+    reuse_port: bool = False,
+    unix_listener: socket.socket | None = None,
+) -> None:
+    """
+    Listens on HOST/PORT, and on a Unix domain socket when one is given,
+    and serves connections until cancelled.
+
+    Args:
+        configurations (config_type): The parsed server configurations.
+        index_manager (ManagedIndex): Owns the shared index.
+        ssl_context (ssl.SSLContext | None, optional): TLS context for
+            the listener, the handshake runs on the event loop and is
+            bounded by "HANDSHAKE_TIMEOUT" seconds. Defaults to None.
+        reuse_port (bool, optional): Listen with SO_REUSEPORT so several
+            worker processes can share the port. Defaults to False.
+        unix_listener (socket.socket | None, optional): A listening Unix
+            domain socket served in plaintext on the same loop.
+            Defaults to None.
+
+    Returns:
+        None
+    """
+    # One task per connection and no queue: only MAX_CONNECTIONS applies
+    admission = AdmissionControl(
+        int(configurations.get("MAX_CONNECTIONS", 1024))
+    )
+    METRICS.add_collector(admission.gauges)
+
+    handler = partial(
+        handle_connection,
+        index_manager=index_manager,
+        payload_size=int(configurations.get("PAYLOAD_SIZE", 1024)),
+        reread=is_enabled(configurations.get("REREAD_ON_QUERY")),
+        protocol_mode=str(configurations.get("PROTOCOL", SINGLE_QUERY)),
+        max_batch=int(configurations.get("MAX_BATCH", 100_000)),
+        max_list=int(configurations.get("MAX_PREFIX_LIST", 1000)),
+        admission=admission,
+        read_timeout=float(configurations.get("READ_TIMEOUT", 0)) or None,
+        idle_timeout=float(configurations.get("IDLE_TIMEOUT", 0)) or None,
+        # A scan of a large file would stall every other connection
+        offload=get_engine(
+            str(configurations.get("ALGORITHM", DEFAULT_ENGINE))
+        ).scanning,
+    )
+
+    server = await asyncio.start_server(
+        handler,
+        configurations.get("HOST"),
+        configurations.get("PORT"),
+        ssl=ssl_context,
+        ssl_handshake_timeout=(
+            float(configurations.get("HANDSHAKE_TIMEOUT", 5))
+            if ssl_context is not None else None
+        ),
+        backlog=int(configurations.get("BACKLOG", 1024)),
+        reuse_port=reuse_port,
+    )
+
+    unix_server = None
+    if unix_listener is not None:
+        # Serves alongside the TCP listener until serve_forever stops
+        unix_server = await asyncio.start_unix_server(
+            handler, sock=unix_listener
+        )
+
+    logger.info("Listening for connections (asyncio)...")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if unix_server is not None:
+            unix_server.close()
+            await unix_server.wait_closed()
+
+
+def start_async_server(
+    configurations: config_type,
+    index_manager: ManagedIndex,
+    ssl_context: ssl.SSLContext | None = None,
+    reuse_port: bool = False,
+    unix_listener: socket.socket | None = None,
+) -> None:
+    """
+    Runs the asyncio server, on uvloop when "USE_UVLOOP" is enabled and
+    uvloop is installed.
+
+    Args:
+        configurations (config_type): The parsed server configurations.
+        index_manager (ManagedIndex): Owns the shared index.
+        ssl_context (ssl.SSLContext | None, optional): TLS context for
+            the listener. Defaults to None.
+        reuse_port (bool, optional): Listen with SO_REUSEPORT.
+            Defaults to False.
+        unix_listener (socket.socket | None, optional): A listening Unix
+            domain socket to serve too. Defaults to None.
+
+    Returns:
+        None
+    """
+    loop_factory = None
+
+    if is_enabled(configurations.get("USE_UVLOOP")):
+        try:
+            import uvloop
+            loop_factory = uvloop.new_event_loop
+        except ImportError:
+            logger.warning("uvloop is not installed, using asyncio's loop")
+
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(
+            serve(configurations, index_manager, ssl_context, reuse_port,
+                  unix_listener)
+        )
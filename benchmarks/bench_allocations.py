@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+""" Benchmark: memory allocated per request on the receive-and-match path
+
+Replays requests over a socket pair through the receive path used before
+and after the move to preallocated buffers and bytes-native engines:
+    before   recv() into a new bytes object, decoded for the log line and
+             again for the lookup in a set of decoded lines; line mode
+             joins and splits the pending bytes on every read
+    after    recv_into() this thread's buffer, one bytes object per
+             query, looked up in a set of raw lines
+CPython does not count allocations, so the figure reported is the peak
+traced memory above the starting point while one request is received and
+matched, averaged over the requests. The client's sends happen outside
+that window. Time per request is measured in a separate, untraced pass.
+Run from the repository root:
+    python -m benchmarks.bench_allocations [requests]
+"""
+
+
+import random
+import socket
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+from benchmarks.corpus import make_line
+from protocol import LineFramer, worker_buffer
+
+PAYLOAD_SIZE = 1024
+PIPELINE = 32  # Queries sent per read in line mode
+
+
+class BytesFramer:
+    """ The line framer as it was before: pending bytes joined to every
+    read and split again """
+    def __init__(self) -> None:
+        self.pending = b""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        lines = (self.pending + data).split(b"\n")
+        self.pending = lines.pop()
+        return [line[:-1] if line.endswith(b"\r") else line
+                for line in lines]
+
+
+def single_before(sock: socket.socket, lines: set) -> bool:
+    """ One single-mode request the old way """
+    data = sock.recv(PAYLOAD_SIZE)
+    f"Data received: {data.decode('utf-8')}"
+    return data.decode("utf-8") in lines
+
+
+def single_after(sock: socket.socket, lines: set) -> bool:
+    """ One single-mode request the new way """
+    buffer = worker_buffer(PAYLOAD_SIZE + 1)
+    received = sock.recv_into(buffer, PAYLOAD_SIZE + 1)
+    data = memoryview(buffer)[:received].tobytes()
+    f"Data received: {data.decode('utf-8', 'replace')}"
+    return data in lines
+
+
+def line_before(framer: BytesFramer) -> Callable:
+    """ Returns one line-mode read the old way """
+    def request(sock: socket.socket, lines: set) -> int:
+        queries = framer.feed(sock.recv(PAYLOAD_SIZE))
+        return sum(query.decode("utf-8") in lines for query in queries)
+    return request
+
+
+def line_after(framer: LineFramer) -> Callable:
+    """ Returns one line-mode read the new way """
+    def request(sock: socket.socket, lines: set) -> int:
+        framer.recv_into(sock)
+        return sum(query in lines for query in framer.frames())
+    return request
+
+
+def measure(request: Callable, lines: set, payloads: List[bytes],
+            traced: bool) -> List[float]:
+    """Sends each payload and receives it through ``request``, returning
+    the peak bytes allocated, or the seconds taken, for each."""
+    server_side, client_side = socket.socketpair()
+    samples: List[float] = []
+    try:
+        for payload in payloads:
+            client_side.sendall(payload)
+            if traced:
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                request(server_side, lines)
+                samples.append(tracemalloc.get_traced_memory()[1] - base)
+            else:
+                start = time.perf_counter()
+                request(server_side, lines)
+                samples.append(time.perf_counter() - start)
+    finally:
+        server_side.close()
+        client_side.close()
+    return samples
+
+
+def main(requests: int = 20_000) -> None:
+    """Runs both modes before and after."""
+    rng = random.Random(0)
+    corpus = [make_line(rng) for _ in range(10_000)]
+    str_lines = set(corpus)
+    bytes_lines = set(line.encode() for line in corpus)
+
+    queries = [rng.choice(corpus).encode() for _ in range(requests)]
+    batches = [
+        b"".join(query + b"\n" for query in queries[i:i + PIPELINE])
+        for i in range(0, requests, PIPELINE)
+    ]
+    print(f"requests={requests} payload={PAYLOAD_SIZE} "
+          f"pipeline={PIPELINE}")
+
+    cases = (
+        ("single", "before", lambda: single_before, str_lines, queries),
+        ("single", "after", lambda: single_after, bytes_lines, queries),
+        ("line", "before", lambda: line_before(BytesFramer()), str_lines,
+         batches),
+        ("line", "after",
+         lambda: line_after(LineFramer(PAYLOAD_SIZE,
+                                       worker_buffer(2 * PAYLOAD_SIZE))),
+         bytes_lines, batches),
+    )
+    for mode, label, make, lines, payloads in cases:
+        per_read = len(queries) / len(payloads)
+        timings = measure(make(), lines, payloads, traced=False)
+
+        tracemalloc.start()
+        peaks = measure(make(), lines, payloads, traced=True)
+        tracemalloc.stop()
+
+        print(f"{mode:>6} {label:>6}: "
+              f"{sum(peaks) / len(peaks) / per_read:7.1f} B/query peak, "
+              f"{sum(timings) / len(timings) / per_read * 1e6:6.2f}us/query")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
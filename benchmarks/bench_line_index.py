@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+""" Benchmark: sorted line-offset index vs a set of decoded lines
+
+Reports the memory retained by each structure (via tracemalloc) and the
+per-lookup latency. Run from the repository root:
+    python -m benchmarks.bench_line_index [rows]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+from algorithms.line_index import LineIndex
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.stats import summarise
+
+
+def build_line_set(file_path: str) -> set:
+    """Builds the structure used by hash_based_search."""
+    with open(file_path, 'r') as file:
+        return set(line.strip() for line in file)
+
+
+def measure_build(builder: Callable[[str], Any],
+                  file_path: str) -> Tuple[Any, float, int]:
+    """Builds an index, returning it with build time and retained bytes."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = builder(file_path)
+    build_time = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return index, build_time, retained
+
+
+def main(rows: int = 1_000_000) -> None:
+    """Runs the comparison on a synthetic corpus."""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "corpus.txt")
+        lines = generate_corpus(file_path, rows)
+        queries = make_queries(lines, 100_000)
+        del lines
+        file_size = os.path.getsize(file_path)
+
+        index, build_time, retained = measure_build(
+            LineIndex.from_file, file_path
+        )
+        samples: List[float] = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            samples.append(time.perf_counter() - start)
+        index.close()
+        print(f"rows={rows} file={file_size / 1e6:.1f}MB")
+        summary = summarise(samples)
+        print(f"   line index: build={build_time:.2f}s "
+              f"retained={retained / 1e6:.1f}MB "
+              f"p50={summary['p50_us']:.1f}us p99={summary['p99_us']:.1f}us")
+
+        line_set, build_time, retained = measure_build(
+            build_line_set, file_path
+        )
+        decoded = [query.decode('utf-8') for query in queries]
+        samples = []
+        for key in decoded:
+            start = time.perf_counter()
+            key in line_set
+            samples.append(time.perf_counter() - start)
+        summary = summarise(samples)
+        print(f"     line set: build={build_time:.2f}s "
+              f"retained={retained / 1e6:.1f}MB "
+              f"p50={summary['p50_us']:.1f}us p99={summary['p99_us']:.1f}us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
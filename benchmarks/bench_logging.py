@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+""" Benchmark: logging cost per request on the request thread
+
+Replays the records one single-query request used to emit (accept loop
+"Waiting...", connection established, data received, connection closed)
+through three set-ups, each writing to its own temporary log file:
+    before   console + FileHandler + RotatingFileHandler on one file, all
+             synchronous (the old logger/logger.py)
+    queue    the QueueHandler/QueueListener pipeline, one rotating file
+    sampled  the same pipeline logging 10% of the requests
+The time reported is what the request thread spends; the listener's
+writing happens in parallel and is reported as the drain time. The replay
+runs far faster than real traffic, so the queue is made large enough to
+hold every record instead of dropping the excess. Run from
+the repository root:
+    python -m benchmarks.bench_logging [requests]
+"""
+
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Callable, List
+
+from benchmarks.stats import summarise
+from logger.logger import LOG_FORMAT, create_queue_logger
+
+
+def old_logger(file_path: str, stream) -> logging.Logger:
+    """Builds the previous pipeline: every handler on the caller's thread,
+    with the file handled twice."""
+    formatter = logging.Formatter(LOG_FORMAT)
+    old = logging.getLogger("bench_before")
+    old.setLevel(logging.DEBUG)
+    old.propagate = False
+
+    console_handler = logging.StreamHandler(stream)
+    console_handler.setLevel(logging.INFO)
+    file_handler = logging.FileHandler(file_path)
+    rotating_handler = RotatingFileHandler(file_path, maxBytes=1024*1024,
+                                           backupCount=20)
+    for handler in (console_handler, file_handler, rotating_handler):
+        handler.setFormatter(formatter)
+        old.addHandler(handler)
+    return old
+
+
+def one_request(log: logging.Logger, sampled: bool, i: int) -> None:
+    """ Emits the records of one request, if it is sampled """
+    address = ("127.0.0.1", 40000 + i % 20000)
+    if sampled:
+        log.info("Waiting for a client to connect...")
+        log.info(f"Connection established with: {address}")
+        log.info(f"Data received: {i};0;1;16;0;7;3;0;")
+        log.info(f"Connection with {address} closed, "
+                 f"Execution Time: {0.0001:.4f} seconds")
+
+
+def run(log: logging.Logger, requests: int,
+        sample: Callable[[], bool]) -> List[float]:
+    """ Times the logging of every request on this thread """
+    samples: List[float] = []
+    for i in range(requests):
+        start = time.perf_counter()
+        one_request(log, sample(), i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label: str, samples: List[float], drain: float,
+           dropped: int = 0) -> None:
+    """ Prints one line of results """
+    summary = summarise(samples)
+    print(f"{label:>8}: mean={sum(samples) / len(samples) * 1e6:.1f}us "
+          f"p50={summary['p50_us']:.1f}us p99={summary['p99_us']:.1f}us "
+          f"drain={drain:.2f}s dropped={dropped}")
+
+
+def main(requests: int = 20_000) -> None:
+    """Runs the comparison."""
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp, \
+            open(os.devnull, "w") as devnull:
+        log = old_logger(os.path.join(tmp, "before.log"), devnull)
+        report("before", run(log, requests, lambda: True), 0.0)
+        for handler in log.handlers:
+            handler.close()
+
+        for label, rate in (("queue", 1.0), ("sampled", 0.1)):
+            # Sized so nothing is dropped and every record is paid for
+            log, handler, listener = create_queue_logger(
+                f"bench_{label}", os.path.join(tmp, f"{label}.log"), devnull,
+                queue_size=4 * requests,
+            )
+            samples = run(log, requests, lambda: rng.random() < rate)
+            start = time.perf_counter()
+            listener.stop()
+            report(label, samples, time.perf_counter() - start,
+                   handler.dropped)
+            for sink in listener.handlers:
+                sink.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+""" Benchmark: path-compressed radix tree vs the per-character trie
+
+Build time and lookups are measured untraced; retained memory is taken
+from a second, tracemalloc-instrumented build. Run from the repository
+root:
+    python -m benchmarks.bench_radix [rows]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+from algorithms.radix_search import build_radix_tree
+from algorithms.trie_search import Trie
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.stats import summarise
+
+
+def build_trie(file_path: str) -> Trie:
+    """Builds the Trie the way trie_search does."""
+    trie = Trie()
+    with open(file_path, "rb") as file:
+        for line in file:
+            trie.insert(line.strip())
+    return trie
+
+
+def retained_bytes(builder: Callable[[str], Any], file_path: str) -> int:
+    """Returns the memory still allocated by a freshly built index."""
+    tracemalloc.start()
+    index = builder(file_path)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del index
+    return retained
+
+
+def main(rows: int = 200_000) -> None:
+    """Runs the comparison on a synthetic corpus."""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "corpus.txt")
+        lines = generate_corpus(file_path, rows)
+        queries = make_queries(lines, 100_000)
+        print(f"rows={rows}")
+
+        engines = (
+            ("trie", build_trie, lambda q: q),
+            ("radix", build_radix_tree, lambda q: q),
+        )
+        for name, builder, prepare in engines:
+            start = time.perf_counter()
+            index = builder(file_path)
+            build_time = time.perf_counter() - start
+
+            prepared = [prepare(query) for query in queries]
+            samples: List[float] = []
+            for query in prepared:
+                start = time.perf_counter()
+                index.search(query)
+                samples.append(time.perf_counter() - start)
+            del index
+
+            per_line = retained_bytes(builder, file_path) / rows
+            summary = summarise(samples)
+            print(f"{name:>6}: build={build_time:.2f}s "
+                  f"memory={per_line:.0f}B/line "
+                  f"p50={summary['p50_us']:.1f}us "
+                  f"p99={summary['p99_us']:.1f}us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" Benchmark: rebuilding the radix tree per query vs a shared index
+
+Run from the repository root:
+    python -m benchmarks.bench_shared_index [rows]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+from algorithms.radix_search import build_radix_tree, radix_search
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.stats import summarise
+
+
+def time_queries(search: Callable[[bytes], bool], queries: List[bytes]):
+    """Times ``search`` once per query and returns the durations."""
+    samples: List[float] = []
+
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        samples.append(time.perf_counter() - start)
+
+    return samples
+
+
+def main(rows: int = 200_000) -> None:
+    """Runs the before/after comparison on a synthetic corpus."""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "corpus.txt")
+        lines = generate_corpus(file_path, rows)
+
+        # Before: every query re-reads the file and rebuilds the tree
+        before = time_queries(
+            lambda q: radix_search(file_path, q), make_queries(lines, 5)
+        )
+
+        # After: the tree is built once and shared
+        build_start = time.perf_counter()
+        tree = build_radix_tree(file_path)
+        build_time = time.perf_counter() - build_start
+
+        after = time_queries(
+            tree.search,
+            make_queries(lines, 100_000),
+        )
+
+    print(f"rows={rows} one-off build={build_time:.3f}s")
+    for name, samples in (("per-query rebuild", before), ("shared", after)):
+        summary = summarise(samples)
+        print(
+            f"{name:>18}: p50={summary['p50_us']:.1f}us "
+            f"p99={summary['p99_us']:.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+""" Benchmark: time to a ready index with and without a valid sidecar
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [rows]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+
+from algorithms.index_file import load_line_index
+from benchmarks.corpus import generate_corpus
+
+
+def main(rows: int = 1_000_000) -> None:
+    """Loads the index twice: once rebuilding the sidecar, once reusing
+    it, as a restarted server would."""
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "corpus.txt")
+        generate_corpus(file_path, rows)
+
+        for label in ("cold (build + write)", "warm (mmap sidecar)"):
+            start = time.perf_counter()
+            index = load_line_index(file_path)
+            elapsed = time.perf_counter() - start
+            index.close()
+            print(f"rows={rows} {label:>21}: {elapsed * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+""" Benchmark: full vs resumed TLS handshakes against handle_client
+
+Starts the threaded server's accept loop on an ephemeral port with a
+throwaway certificate and times complete one-query connections, first
+with a fresh TLS session each time, then resuming a saved session.
+Requires the openssl command line tool. Run from the repository root:
+    python -m benchmarks.bench_tls [connections]
+"""
+
+
+import concurrent.futures
+import os
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from typing import List, Tuple
+
+from algorithms.line_index import LineIndex
+from benchmarks.stats import summarise
+from benchmarks.tls_cert import make_self_signed_cert
+from index_manager import IndexManager
+from server import handle_client
+from tls import create_server_ssl_context
+
+
+def serve(server_socket: socket.socket, index_manager: IndexManager,
+          context: ssl.SSLContext) -> None:
+    """Accepts connections and hands them to handle_client."""
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        while True:
+            client_socket, address = server_socket.accept()
+            executor.submit(handle_client, client_socket, address, 1024,
+                            index_manager, context)
+
+
+def query(port: int, context: ssl.SSLContext,
+          session: ssl.SSLSession | None) -> Tuple[ssl.SSLSession, bool]:
+    """Sends one query over a new TLS connection, returning its session
+    and whether the offered session was resumed."""
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        with context.wrap_socket(sock, server_hostname="127.0.0.1",
+                                 session=session) as tls_sock:
+            tls_sock.sendall(b"alpha")
+            tls_sock.recv(1024)
+            return tls_sock.session, tls_sock.session_reused
+
+
+def main(connections: int = 500) -> None:
+    """Times full and resumed handshakes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = make_self_signed_cert(tmp)
+        corpus = os.path.join(tmp, "corpus.txt")
+        with open(corpus, "w") as file:
+            file.write("alpha\nbeta\n")
+
+        index_manager = IndexManager(corpus, LineIndex.from_file)
+        index_manager.build()
+        server_context = create_server_ssl_context(
+            {"CERTFILE": certfile, "KEYFILE": keyfile}
+        )
+
+        server_socket = socket.socket()
+        server_socket.bind(("127.0.0.1", 0))
+        server_socket.listen(1024)
+        port = server_socket.getsockname()[1]
+        threading.Thread(target=serve, daemon=True, args=(
+            server_socket, index_manager, server_context)).start()
+
+        client_context = ssl.create_default_context(cafile=certfile)
+
+        for label, resume in (("full", False), ("resumed", True)):
+            session = query(port, client_context, None)[0] if resume else None
+            samples: List[float] = []
+            reused = 0
+            start_all = time.perf_counter()
+            for _ in range(connections):
+                start = time.perf_counter()
+                new_session, was_reused = query(port, client_context, session)
+                samples.append(time.perf_counter() - start)
+                reused += was_reused
+                if resume:
+                    session = new_session
+            elapsed = time.perf_counter() - start_all
+            summary = summarise(samples)
+            print(f"{label:>8}: {connections / elapsed:.0f} conn/s "
+                  f"p50={summary['p50_us'] / 1e3:.2f}ms "
+                  f"p99={summary['p99_us'] / 1e3:.2f}ms "
+                  f"resumed={reused}/{connections}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+""" Benchmark: TCP with TLS vs plain TCP vs a Unix domain socket
+
+Starts the threaded server's accept loop on each transport, in this
+process, and times from one client:
+    single   a complete one-query connection (connect, handshake, query,
+             close), as with PROTOCOL=single
+    line     one query round trip on a connection kept open, as with
+             PROTOCOL=line
+Requires the openssl command line tool. Run from the repository root:
+    python -m benchmarks.bench_transport [queries]
+"""
+
+
+import concurrent.futures
+import os
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, List
+
+import server
+from admission import AdmissionControl
+from algorithms.line_index import LineIndex
+from benchmarks.stats import summarise
+from benchmarks.tls_cert import make_self_signed_cert
+from index_manager import IndexManager
+from logger.logger import set_sample_rate
+from tls import create_server_ssl_context
+from unix_socket import create_unix_listener
+
+
+def start(listener: socket.socket, index_manager: IndexManager,
+          context: ssl.SSLContext | None) -> None:
+    """Serves a listener with the server's accept loop on a thread."""
+    executor = concurrent.futures.ThreadPoolExecutor(8)
+    threading.Thread(target=server.accept_connections, daemon=True, args=(
+        listener, executor, AdmissionControl(8, 1024), 1024, index_manager,
+        context)).start()
+
+
+def time_single(connect: Callable[[], socket.socket],
+                queries: int) -> List[float]:
+    """Times complete one-query connections."""
+    samples: List[float] = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        with connect() as sock:
+            sock.sendall(b"alpha")
+            sock.recv(1024)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_line(connect: Callable[[], socket.socket],
+              queries: int) -> List[float]:
+    """Times query round trips on one open connection."""
+    samples: List[float] = []
+    with connect() as sock:
+        for _ in range(queries):
+            start = time.perf_counter()
+            sock.sendall(b"alpha\n")
+            sock.recv(1024)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(queries: int = 2000) -> None:
+    """Times every transport in both protocols."""
+    set_sample_rate(0)  # Log nothing per request, errors aside
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = make_self_signed_cert(tmp)
+        corpus = os.path.join(tmp, "corpus.txt")
+        with open(corpus, "w") as file:
+            file.write("alpha\nbeta\n")
+
+        index_manager = IndexManager(corpus, LineIndex.from_file)
+        index_manager.build()
+        server_context = create_server_ssl_context(
+            {"CERTFILE": certfile, "KEYFILE": keyfile}
+        )
+        client_context = ssl.create_default_context(cafile=certfile)
+
+        listeners = {}
+        for name, context in (("tcp+tls", server_context), ("tcp", None)):
+            listener = socket.create_server(("127.0.0.1", 0), backlog=1024)
+            start(listener, index_manager, context)
+            listeners[name] = listener.getsockname()
+        unix_path = os.path.join(tmp, "filesearch.sock")
+        start(create_unix_listener(unix_path), index_manager, None)
+
+        def tls() -> socket.socket:
+            return client_context.wrap_socket(
+                socket.create_connection(listeners["tcp+tls"]),
+                server_hostname="127.0.0.1",
+            )
+
+        def unix() -> socket.socket:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(unix_path)
+            return sock
+
+        transports = (
+            ("tcp+tls", tls),
+            ("tcp", lambda: socket.create_connection(listeners["tcp"])),
+            ("unix", unix),
+        )
+        print(f"queries={queries}")
+        for protocol, timer in (("single", time_single), ("line", time_line)):
+            # handle_client reads the protocol for every connection
+            server.server_configurations["PROTOCOL"] = protocol
+            for name, connect in transports:
+                samples = timer(connect, queries)
+                summary = summarise(samples)
+                print(f"{protocol:>6} {name:>8}: "
+                      f"{len(samples) / sum(samples):7.0f}/s "
+                      f"p50={summary['p50_us']:7.1f}us "
+                      f"p99={summary['p99_us']:7.1f}us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
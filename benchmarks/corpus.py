@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+""" Synthetic corpus generation for the benchmarks """
+
+
+import random
+from typing import List
+
+
+def make_line(rng: random.Random) -> str:
+    """Builds one line shaped like the rows of the production corpus,
+    e.g. ``6;0;1;16;0;7;3;0;``.
+
+    Args:
+        rng (random.Random): The random generator to draw fields from.
+    Returns:
+        str: A single line, without the trailing newline.
+    """
+    return "".join(f"{rng.randint(0, 24)};" for _ in range(8))
+
+
+def generate_corpus(file_path: str, rows: int, seed: int = 0) -> List[str]:
+    """Writes a synthetic corpus of ``rows`` lines to ``file_path``.
+
+    Args:
+        file_path (str): Where to write the corpus.
+        rows (int): The number of lines to write.
+        seed (int, optional): Seed for the random generator. Defaults to 0.
+    Returns:
+        List[str]: The lines that were written, in file order.
+    """
+    rng = random.Random(seed)
+    lines = [make_line(rng) for _ in range(rows)]
+
+    with open(file_path, "w") as file:
+        file.write("\n".join(lines))
+        file.write("\n")
+
+    return lines
+
+
+def make_queries(
+    lines: List[str], count: int, hit_ratio: float = 0.5, seed: int = 1
+) -> List[bytes]:
+    """Builds a query mix with roughly ``hit_ratio`` of existing lines.
+
+    Args:
+        lines (List[str]): The lines present in the corpus.
+        count (int): The number of queries to build.
+        hit_ratio (float, optional): Fraction of queries that should hit.
+                                     Defaults to 0.5.
+        seed (int, optional): Seed for the random generator. Defaults to 1.
+    Returns:
+        List[bytes]: The encoded queries.
+    """
+    rng = random.Random(seed)
+    queries: List[bytes] = []
+
+    for _ in range(count):
+        if rng.random() < hit_ratio:
+            queries.append(rng.choice(lines).encode("utf-8"))
+        else:
+            # The "x" prefix can never appear in a generated line
+            queries.append(("x" + make_line(rng)).encode("utf-8"))
+
+    return queries
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+""" Asyncio load generator for capacity testing a running server
+
+Replays a synthetic query mix over thousands of concurrent plain or TLS
+connections and reports throughput, a latency histogram and errors by
+kind. Hits are drawn from the served corpus, misses are generated lines
+that cannot exist, and popularity within each is Zipf-skewed.
+
+Two ways of applying load:
+    closed  ``--concurrency`` clients each send their next query as soon
+            as the previous one is answered (optionally paced so all of
+            them together send ``--qps``).
+    open    queries arrive as a Poisson process at ``--qps`` regardless of
+            how fast the server answers; at most ``--concurrency`` are in
+            flight, further arrivals are counted as dropped.
+
+Latency is measured from when a query was scheduled, not when it was
+sent, so a stalled server shows up in the percentiles instead of just
+lowering the request rate. Host, port, TLS and protocol default to
+./config/config.txt. Example, from the repository root:
+    python -m benchmarks.loadgen --mode open --qps 2000 --duration 30 \\
+        --concurrency 1000 --hit-ratio 0.3 --zipf 1.1
+"""
+
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import random
+import resource
+import ssl
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.corpus import make_line
+from benchmarks.stats import histogram, percentile
+from protocol import EXISTS, LINE_DELIMITED, NOT_EXISTS, SINGLE_QUERY
+from utils import is_enabled, parse_config_file
+
+# Returns a query to send and whether it is expected to hit
+picker_type = Callable[[], Tuple[bytes, bool]]
+
+
+class QueryMix:
+    """ Draws queries with a given hit ratio and Zipf-skewed popularity
+
+    The ``distinct`` hit and miss queries are ranked in a fixed shuffled
+    order; rank r is drawn with probability proportional to 1 / r**s.
+    s = 0 is uniform, s around 1 is typical of real traffic.
+
+    Attributes:
+        hits (List[bytes]): Lines that exist in the corpus
+        misses (List[bytes]): Lines that cannot exist in the corpus
+        hit_ratio (float): The fraction of queries drawn from ``hits``
+    """
+    def __init__(self, lines: List[str], hit_ratio: float, zipf: float,
+                 distinct: int, seed: int = 0) -> None:
+        """ Initializes the mix from the corpus lines """
+        self.rng = random.Random(seed)
+        unique = sorted(set(lines))
+        self.rng.shuffle(unique)
+        self.hits = [line.encode("utf-8") for line in unique[:distinct]]
+        # The "x" prefix can never appear in a generated line
+        self.misses = [("x" + make_line(self.rng)).encode("utf-8")
+                       for _ in range(min(distinct, max(len(self.hits), 1)))]
+        self.hit_ratio = hit_ratio if self.hits else 0.0
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank ** zipf for rank in range(1, len(self.misses) + 1)
+        ))
+
+    def _rank(self, size: int) -> int:
+        """ Draws a Zipf-distributed index below ``size`` """
+        total = self.cum_weights[size - 1]
+        return bisect.bisect_left(self.cum_weights, self.rng.random() * total,
+                                  0, size - 1)
+
+    def pick(self) -> Tuple[bytes, bool]:
+        """ Returns the next query and whether it should hit """
+        if self.rng.random() < self.hit_ratio:
+            return self.hits[self._rank(len(self.hits))], True
+        return self.misses[self._rank(len(self.misses))], False
+
+
+class Results:
+    """ Latencies and outcome counters collected during a run
+
+    Attributes:
+        latencies (List[float]): Seconds from schedule to response, per
+                                 successful query
+        errors (Dict[str, int]): Failed queries by kind
+        examples (Dict[str, str]): The first error message of each kind
+        dropped (int): Open-loop arrivals with no free slot
+        unexpected (int): Answers contradicting the expected hit or miss
+    """
+    def __init__(self) -> None:
+        """ Initializes empty results """
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.examples: Dict[str, str] = {}
+        self.dropped = 0
+        self.unexpected = 0
+        self.hits = 0
+
+    def error(self, kind: str, message: str = "") -> None:
+        """ Counts one failed query """
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+        self.examples.setdefault(kind, message)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """ Summarises the run as a JSON-serialisable dict """
+        ok = len(self.latencies)
+        failed = sum(self.errors.values())
+        attempted = ok + failed + self.dropped
+        latencies = sorted(self.latencies)
+        return {
+            "elapsed_s": elapsed,
+            "completed": ok,
+            "qps": ok / elapsed if elapsed else 0.0,
+            "errors": dict(self.errors),
+            "error_examples": dict(self.examples),
+            "dropped": self.dropped,
+            "error_rate": (failed + self.dropped) / attempted
+            if attempted else 0.0,
+            "unexpected_answers": self.unexpected,
+            "hit_fraction": self.hits / ok if ok else 0.0,
+            "latency_ms": {
+                f"p{pct:g}": percentile(latencies, pct) * 1e3
+                for pct in (50, 90, 99, 99.9)
+            } | {"max": latencies[-1] * 1e3 if latencies else 0.0},
+            "histogram_us": histogram(latencies),
+        }
+
+
+def error_kind(error: BaseException) -> str:
+    """ Names a failure for the error counters """
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, ssl.SSLError):
+        return "tls"
+    if isinstance(error, ConnectionRefusedError):
+        return "refused"
+    if isinstance(error, ConnectionResetError):
+        return "reset"
+    if isinstance(error, OSError):
+        return f"os:{error.errno}"
+    return type(error).__name__
+
+
+class Client:
+    """ Sends queries to one server, over fresh or pooled connections
+
+    With the single-query protocol each query opens its own connection.
+    With the line protocol up to ``pool_size`` connections are kept open
+    and each carries one outstanding query at a time.
+    """
+    def __init__(self, host: str, port: int,
+                 ssl_context: ssl.SSLContext | None, protocol: str,
+                 pool_size: int, timeout: float) -> None:
+        """ Initializes the client; connections are opened on demand """
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.protocol = protocol
+        self.timeout = timeout
+        self.pool: asyncio.Queue = asyncio.Queue()
+        for _ in range(pool_size):
+            self.pool.put_nowait(None)
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader,
+                                      asyncio.StreamWriter]:
+        """ Opens one connection, with the TLS handshake if enabled """
+        return await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl_context,
+            server_hostname=self.host if self.ssl_context else None,
+        )
+
+    async def _single(self, query: bytes) -> bytes:
+        """ Sends one query on a new connection and reads until close """
+        reader, writer = await self._connect()
+        try:
+            writer.write(query)
+            await writer.drain()
+            return await reader.read()
+        finally:
+            writer.close()
+
+    async def _pooled(self, query: bytes) -> bytes:
+        """ Sends one newline-terminated query on a pooled connection """
+        connection = await self.pool.get()
+        try:
+            if connection is None:
+                connection = await self._connect()
+            reader, writer = connection
+            writer.write(query + b"\n")
+            await writer.drain()
+            response = await reader.readline()
+            if not response:
+                raise ConnectionResetError("Connection closed by server")
+        except BaseException:
+            if connection is not None:
+                connection[1].close()
+            self.pool.put_nowait(None)
+            raise
+        self.pool.put_nowait(connection)
+        return response
+
+    async def query(self, query: bytes) -> bytes:
+        """ Returns the server's answer to ``query`` """
+        send = self._pooled if self.protocol == LINE_DELIMITED \
+            else self._single
+        return await asyncio.wait_for(send(query), self.timeout)
+
+    async def close(self) -> None:
+        """ Closes the pooled connections """
+        while not self.pool.empty():
+            connection = self.pool.get_nowait()
+            if connection is not None:
+                connection[1].close()
+
+
+async def timed_query(client: Client, pick: picker_type, scheduled: float,
+                      results: Results) -> None:
+    """ Sends one query and records its outcome against ``scheduled`` """
+    query, expect_hit = pick()
+    try:
+        response = await client.query(query)
+    except Exception as e:
+        results.error(error_kind(e), repr(e))
+        return
+
+    if response not in (EXISTS, NOT_EXISTS):
+        results.error("bad_response", repr(response[:80]))
+        return
+
+    results.latencies.append(time.perf_counter() - scheduled)
+    hit = response == EXISTS
+    results.hits += hit
+    results.unexpected += hit != expect_hit
+
+
+async def closed_loop(client: Client, pick: picker_type, concurrency: int,
+                      qps: float, duration: float, results: Results) -> None:
+    """Runs ``concurrency`` clients back to back, each paced to
+    ``qps / concurrency`` when ``qps`` is set."""
+    deadline = time.perf_counter() + duration
+    interval = concurrency / qps if qps else 0.0
+
+    async def worker(offset: int) -> None:
+        scheduled = time.perf_counter() + offset * interval / concurrency
+        while scheduled < deadline:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                scheduled = time.perf_counter() if not interval else scheduled
+            await timed_query(client, pick, scheduled, results)
+            scheduled += interval
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+async def open_loop(client: Client, pick: picker_type, concurrency: int,
+                    qps: float, duration: float, results: Results,
+                    seed: int = 0) -> None:
+    """Starts queries as a Poisson process at ``qps``, with at most
+    ``concurrency`` in flight."""
+    rng = random.Random(seed)
+    in_flight: set = set()
+    start = time.perf_counter()
+    scheduled = start
+
+    while scheduled < start + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if len(in_flight) >= concurrency:
+            results.dropped += 1
+        else:
+            task = asyncio.create_task(
+                timed_query(client, pick, scheduled, results)
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        scheduled += rng.expovariate(qps)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+def raise_fd_limit(needed: int) -> None:
+    """ Raises the open-file soft limit towards ``needed`` if it is lower """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY \
+            else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def client_ssl_context(args: argparse.Namespace) -> ssl.SSLContext | None:
+    """ Returns the client TLS context, or None for plain connections """
+    if not args.tls:
+        return None
+    context = ssl.create_default_context(cafile=args.cafile)
+    if args.insecure:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """ Runs the warm-up and the measured phase, returning the report """
+    with open(args.corpus, "r") as file:
+        lines = file.read().splitlines()
+    mix = QueryMix(lines, args.hit_ratio, args.zipf, args.distinct,
+                   args.seed)
+    del lines
+
+    client = Client(args.host, args.port, client_ssl_context(args),
+                    args.protocol, args.concurrency, args.timeout)
+    load = closed_loop if args.mode == "closed" else open_loop
+
+    try:
+        if args.warmup > 0:
+            await load(client, mix.pick, args.concurrency, args.qps,
+                       args.warmup, Results())
+
+        results = Results()
+        start = time.perf_counter()
+        await load(client, mix.pick, args.concurrency, args.qps,
+                   args.duration, results)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.close()
+
+    return {
+        "config": {key: value for key, value in vars(args).items()},
+        **results.report(elapsed),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """ Prints a human-readable summary of a report """
+    print(f"completed={report['completed']} qps={report['qps']:.0f} "
+          f"error_rate={report['error_rate']:.2%} "
+          f"dropped={report['dropped']} errors={report['errors']} "
+          f"hit_fraction={report['hit_fraction']:.2f} "
+          f"unexpected={report['unexpected_answers']}")
+    for kind, message in report["error_examples"].items():
+        print(f"  {kind}: {message}")
+    print("latency ms: " + " ".join(
+        f"{name}={value:.2f}" for name, value in report["latency_ms"].items()
+    ))
+
+    buckets = report["histogram_us"]
+    peak = max((count for _, count in buckets), default=0)
+    for upper, count in buckets:
+        bar = "#" * round(40 * count / peak) if peak else ""
+        print(f"  <= {upper / 1e3:10.3f} ms {count:8d} {bar}")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """ Parses the command line, with defaults from config.txt """
+    configs = parse_config_file("./config/config.txt") or {}
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadgen")
+    parser.add_argument("--host", default=str(configs.get("HOST",
+                                                          "127.0.0.1")))
+    parser.add_argument("--port", type=int,
+                        default=int(configs.get("PORT", 12345)))
+    parser.add_argument("--tls", action=argparse.BooleanOptionalAction,
+                        default=is_enabled(configs.get("SSL_ENABLED",
+                                                       "False")))
+    parser.add_argument("--cafile",
+                        default=str(configs.get("CERTFILE", "./server.crt")),
+                        help="certificate(s) to trust, default CERTFILE")
+    parser.add_argument("--insecure", action="store_true",
+                        help="skip certificate verification")
+    parser.add_argument("--protocol", choices=[SINGLE_QUERY, LINE_DELIMITED],
+                        default=str(configs.get("PROTOCOL", SINGLE_QUERY)))
+    parser.add_argument("--corpus", default=configs.get("linuxpath"),
+                        help="file to draw hits from, default linuxpath")
+    parser.add_argument("--mode", choices=["closed", "open"],
+                        default="closed")
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="clients (closed) or max in flight (open)")
+    parser.add_argument("--qps", type=float, default=0.0,
+                        help="target rate; required for open loop")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="seconds allowed per query")
+    parser.add_argument("--hit-ratio", type=float, default=0.5)
+    parser.add_argument("--zipf", type=float, default=1.0,
+                        help="popularity skew exponent, 0 for uniform")
+    parser.add_argument("--distinct", type=int, default=10_000,
+                        help="distinct hit (and miss) queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report here")
+
+    args = parser.parse_args(argv)
+    if args.mode == "open" and args.qps <= 0:
+        parser.error("--mode open needs --qps")
+    if not args.corpus:
+        parser.error("--corpus is required when linuxpath is not set")
+    return args
+
+
+def main(argv: List[str]) -> int:
+    """ Entry point, returns the exit status """
+    args = parse_args(argv)
+    raise_fd_limit(args.concurrency + 256)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
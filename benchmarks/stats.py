@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+""" Small helpers for summarising benchmark timings """
+
+
+import math
+from typing import Dict, List, Tuple
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Returns the ``pct`` percentile of ``samples`` (nearest rank).
+
+    Args:
+        samples (List[float]): The measured values.
+        pct (float): The percentile to compute, between 0 and 100.
+    Returns:
+        float: The value at that percentile, or 0.0 for no samples.
+    """
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    """Summarises timings (in seconds) as p50/p99/max in microseconds.
+
+    Args:
+        samples (List[float]): The measured durations in seconds.
+    Returns:
+        Dict[str, float]: The summary, keyed by percentile name.
+    """
+    return {
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "max_us": max(samples, default=0.0) * 1e6,
+    }
+
+
+def histogram(samples: List[float],
+              buckets_per_doubling: int = 2) -> List[Tuple[float, int]]:
+    """Buckets durations (in seconds) on a log scale, as HDR histograms do:
+    every doubling of latency is split into ``buckets_per_doubling``
+    buckets, so relative precision is the same at 10us and at 10s.
+
+    Args:
+        samples (List[float]): The measured durations in seconds.
+        buckets_per_doubling (int, optional): Resolution. Defaults to 2.
+    Returns:
+        List[Tuple[float, int]]: (upper bound in microseconds, count) for
+                                 every bucket from the first to the last
+                                 non-empty one.
+    """
+    counts: Dict[int, int] = {}
+    for sample in samples:
+        micros = max(sample * 1e6, 1.0)
+        bucket = math.ceil(math.log2(micros) * buckets_per_doubling)
+        counts[bucket] = counts.get(bucket, 0) + 1
+
+    if not counts:
+        return []
+    return [
+        (2 ** (bucket / buckets_per_doubling), counts.get(bucket, 0))
+        for bucket in range(min(counts), max(counts) + 1)
+    ]
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+""" Reproducible benchmark suite: every engine, several corpus sizes and
+end-to-end server throughput, written as JSON
+
+For each corpus size a synthetic corpus is generated (and kept in the
+work directory for the next run). Every engine is then measured in its own
+subprocess, so its peak RSS is not inflated by the engines before it:
+build time, peak RSS, and per-lookup latency percentiles for hits and
+misses separately. Finally the real server is started as a subprocess on
+127.0.0.1 and driven by closed-loop clients at each concurrency.
+
+Run from the repository root:
+    python -m benchmarks.suite --rows 10000 100000 1000000 \\
+        --output results.json
+    python -m benchmarks.suite compare old.json new.json
+
+Nothing leaves localhost. 10M rows needs several GB of memory for the
+object-based engines (hash, trie), so pick them with ``--engines``.
+"""
+
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from algorithms.engines import ENGINES, get_engine, load_engine
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.stats import summarise
+from protocol import EXISTS, NOT_EXISTS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+DEFAULT_CONCURRENCY = [1, 4, 16, 64]
+
+
+def corpus_path(workdir: str, rows: int) -> str:
+    """Returns the corpus of ``rows`` lines, generating it if missing.
+
+    Args:
+        workdir (str): The directory corpora are kept in.
+        rows (int): The number of lines.
+    Returns:
+        str: The corpus path.
+    """
+    path = os.path.join(workdir, f"corpus-{rows}.txt")
+    if not os.path.exists(path):
+        generate_corpus(path + ".tmp", rows)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def read_lines(file_path: str) -> List[str]:
+    """ Returns the lines of a corpus, without their newlines """
+    with open(file_path, "r") as file:
+        return file.read().splitlines()
+
+
+def peak_rss_mb() -> float:
+    """ Returns this process's peak resident set size in MB (Linux) """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_lookups(engine: Any, queries: List[bytes]) -> List[float]:
+    """ Times each ``engine.search`` call, in seconds """
+    samples: List[float] = []
+    for query in queries:
+        start = time.perf_counter()
+        engine.search(query)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def measure_engine(name: str, file_path: str, queries: int) -> Dict[str, Any]:
+    """Builds one engine and measures it; meant to run in a fresh process.
+
+    Args:
+        name (str): The registered engine name.
+        file_path (str): The corpus.
+        queries (int): The number of hit and of miss lookups to time.
+    Returns:
+        Dict[str, Any]: The measurements.
+    """
+    # The engine is built before the corpus is read for the queries, so
+    # the peak RSS is the interpreter's plus the build's alone
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    engine = load_engine(name, file_path)
+    build_s = time.perf_counter() - start
+    peak = peak_rss_mb()
+
+    lines = read_lines(file_path)
+    hits = make_queries(lines, queries, hit_ratio=1.0)
+    misses = make_queries(lines, queries, hit_ratio=0.0)
+    del lines
+
+    result = {
+        "engine": name,
+        "build_s": build_s,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak,
+        "memory_usage_bytes": engine.memory_usage(),
+        "queries": queries,
+        "hit": summarise(time_lookups(engine, hits)),
+        "miss": summarise(time_lookups(engine, misses)),
+    }
+    engine.close()
+    return result
+
+
+def run_engine_subprocess(name: str, file_path: str,
+                          queries: int) -> Dict[str, Any]:
+    """ Runs ``measure_engine`` in a child interpreter and parses its JSON """
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "engine",
+         name, file_path, str(queries)],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def free_port() -> int:
+    """ Returns a currently unused TCP port on 127.0.0.1 """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, file_path: str, engine: str, mode: str,
+                 timeout: float = 600.0) -> tuple[subprocess.Popen, int]:
+    """Starts server.py in its own directory and waits until it accepts.
+
+    Args:
+        workdir (str): Where the server's config/ and log_files/ go.
+        file_path (str): The corpus to serve.
+        engine (str): The "ALGORITHM" to serve it with.
+        mode (str): The "SERVER_MODE".
+        timeout (float, optional): Seconds to wait for the index build.
+                                   Defaults to 600.
+    Returns:
+        tuple[subprocess.Popen, int]: The server process and its port.
+    """
+    server_dir = os.path.join(workdir, f"server-{mode}-{engine}")
+    os.makedirs(os.path.join(server_dir, "config"), exist_ok=True)
+    os.makedirs(os.path.join(server_dir, "log_files"), exist_ok=True)
+
+    port = free_port()
+    settings = {
+        "linuxpath": os.path.abspath(file_path),
+        "HOST": "127.0.0.1",
+        "PORT": port,
+        "REREAD_ON_QUERY": False,
+        "PAYLOAD_SIZE": 1024,
+        "RELOAD_INTERVAL": 0,
+        "SERVER_MODE": mode,
+        "SSL_ENABLED": False,
+        "PROTOCOL": "single",
+        "ALGORITHM": engine,
+        "CACHE_SIZE": 0,
+        "BLOOM_FP_RATE": 0,
+    }
+    with open(os.path.join(server_dir, "config", "config.txt"), "w") as f:
+        f.write("".join(f"{key}={value}\n" for key, value in settings.items()))
+
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "server.py")],
+        cwd=server_dir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+
+    stop_server(process)
+    raise TimeoutError("Server did not start listening in time")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """ Stops a server started by ``start_server`` """
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def closed_loop(port: int, queries: List[bytes], concurrency: int,
+                      duration: float) -> Dict[str, Any]:
+    """Runs ``concurrency`` clients, each sending one query per connection
+    back to back for ``duration`` seconds.
+
+    Args:
+        port (int): The server port on 127.0.0.1.
+        queries (List[bytes]): The queries to cycle through.
+        concurrency (int): The number of concurrent clients.
+        duration (float): How long to run, in seconds.
+    Returns:
+        Dict[str, Any]: Throughput, error count and latency summary.
+    """
+    samples: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(offset: int) -> None:
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            query = queries[i % len(queries)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1",
+                                                               port)
+                writer.write(query)
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+                await writer.wait_closed()
+            except OSError:
+                errors += 1
+                continue
+            if response in (EXISTS, NOT_EXISTS):
+                samples.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "qps": len(samples) / elapsed,
+        "latency": summarise(samples),
+    }
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    """ Runs every configured measurement and returns the results """
+    os.makedirs(args.workdir, exist_ok=True)
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items()
+                     if key != "command"},
+        },
+        "engines": [],
+        "throughput": [],
+    }
+
+    for rows in args.rows:
+        file_path = corpus_path(args.workdir, rows)
+
+        for name in args.engines:
+            # Engines that scan the whole file per lookup get fewer queries
+            queries = args.scan_queries if get_engine(name).scanning \
+                else args.queries
+            print(f"rows={rows} engine={name} ...", file=sys.stderr)
+            result = run_engine_subprocess(name, file_path, queries)
+            results["engines"].append({"rows": rows, **result})
+
+        queries = make_queries(read_lines(file_path), 10_000,
+                               hit_ratio=args.hit_ratio)
+        random.Random(2).shuffle(queries)
+        for mode in args.server_modes:
+            for engine in args.server_engines:
+                process, port = start_server(args.workdir, file_path,
+                                             engine, mode)
+                try:
+                    for concurrency in args.concurrency:
+                        print(f"rows={rows} server={mode}/{engine} "
+                              f"c={concurrency} ...", file=sys.stderr)
+                        result = asyncio.run(closed_loop(
+                            port, queries, concurrency, args.duration
+                        ))
+                        results["throughput"].append({
+                            "rows": rows, "mode": mode, "engine": engine,
+                            **result,
+                        })
+                finally:
+                    stop_server(process)
+
+    return results
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """Lists the measurements that got worse by more than ``threshold``.
+
+    Args:
+        old (Dict[str, Any]): The baseline results.
+        new (Dict[str, Any]): The results to check.
+        threshold (float): Allowed relative slowdown, e.g. 0.1 for 10%.
+    Returns:
+        List[str]: One line per regression.
+    """
+    regressions: List[str] = []
+
+    def check(label: str, before: float, after: float,
+              higher_is_better: bool = False) -> None:
+        if not before:
+            return
+        change = (after - before) / before
+        if higher_is_better:
+            change = -change
+        if change > threshold:
+            regressions.append(
+                f"{label}: {before:.4g} -> {after:.4g} ({change:+.0%})"
+            )
+
+    baseline: Dict[tuple, Dict[str, Any]] = {
+        (r["rows"], r["engine"]): r for r in old.get("engines", [])
+    }
+    for result in new.get("engines", []):
+        before = baseline.get((result["rows"], result["engine"]))
+        if before is None:
+            continue
+        label = f"rows={result['rows']} engine={result['engine']}"
+        check(f"{label} build_s", before["build_s"], result["build_s"])
+        check(f"{label} peak_rss_mb", before["peak_rss_mb"],
+              result["peak_rss_mb"])
+        for kind in ("hit", "miss"):
+            for stat in ("p50_us", "p99_us"):
+                check(f"{label} {kind} {stat}", before[kind][stat],
+                      result[kind][stat])
+
+    baseline = {(r["rows"], r["mode"], r["engine"], r["concurrency"]): r
+                for r in old.get("throughput", [])}
+    for result in new.get("throughput", []):
+        key = (result["rows"], result["mode"], result["engine"],
+               result["concurrency"])
+        before = baseline.get(key)
+        if before is None:
+            continue
+        label = "rows={} server={}/{} c={}".format(*key)
+        check(f"{label} qps", before["qps"], result["qps"],
+              higher_is_better=True)
+        check(f"{label} p99_us", before["latency"]["p99_us"],
+              result["latency"]["p99_us"])
+
+    return regressions
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """ Parses the command line """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    sub = parser.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="run the suite (the default)")
+    run.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    run.add_argument("--engines", nargs="+", default=sorted(ENGINES),
+                     choices=sorted(ENGINES))
+    run.add_argument("--queries", type=int, default=5000,
+                     help="hit and miss lookups timed per engine")
+    run.add_argument("--scan-queries", type=int, default=50,
+                     help="lookups for engines that scan the file")
+    run.add_argument("--server-modes", nargs="+", default=["threading"],
+                     choices=["threading", "asyncio", "prefork"])
+    run.add_argument("--server-engines", nargs="+", default=["line_index"],
+                     choices=sorted(ENGINES))
+    run.add_argument("--concurrency", type=int, nargs="+",
+                     default=DEFAULT_CONCURRENCY)
+    run.add_argument("--duration", type=float, default=5.0,
+                     help="seconds per throughput measurement")
+    run.add_argument("--hit-ratio", type=float, default=0.5)
+    run.add_argument("--workdir", default=os.path.join(
+        REPO_ROOT, "benchmarks", "data"))
+    run.add_argument("--output", default="benchmark-results.json")
+
+    cmp = sub.add_parser("compare", help="flag regressions between runs")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=0.1)
+
+    engine = sub.add_parser("engine", help=argparse.SUPPRESS)
+    engine.add_argument("name")
+    engine.add_argument("file_path")
+    engine.add_argument("queries", type=int)
+
+    if not argv or argv[0] not in ("run", "compare", "engine", "-h", "--help"):
+        argv = ["run", *argv]
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    """ Entry point, returns the exit status """
+    args = parse_args(argv)
+
+    if args.command == "engine":
+        print(json.dumps(measure_engine(args.name, args.file_path,
+                                        args.queries)))
+        return 0
+
+    if args.command == "compare":
+        with open(args.old) as old, open(args.new) as new:
+            regressions = compare(json.load(old), json.load(new),
+                                  args.threshold)
+        for line in regressions:
+            print(line)
+        return 1 if regressions else 0
+
+    results = run_suite(args)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
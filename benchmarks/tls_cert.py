@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+""" Throwaway self-signed certificate for TLS benchmarks """
+
+
+import os
+import subprocess
+from typing import Tuple
+
+
+def make_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """Creates a self-signed certificate for 127.0.0.1 with openssl.
+
+    Args:
+        directory (str): Where to write the certificate and key.
+    Returns:
+        Tuple[str, str]: The certificate and key paths.
+    """
+    certfile = os.path.join(directory, "server.crt")
+    keyfile = os.path.join(directory, "server.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "ec",
+         "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes",
+         "-keyout", keyfile, "-out", certfile, "-days", "1",
+         "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return certfile, keyfile
@@ -41,7 +41,24 @@ def start_client() -> None:
 
             # Send the message provided as a command-line argument
             if len(sys.argv) < 2:
-                print("Usage: client.py <message>")
+                print("Usage: client.py <message> [<message> ...]")
+                return
+
+            # With the line protocol every argument is sent as its own
+            # query over this one connection
+            if configs.get("PROTOCOL") == "line":
+                queries = sys.argv[1:]
+                s.sendall("".join(f"{q}\n" for q in queries).encode("utf-8"))
+
+                received: bytes = b""
+                while received.count(b"\n") < len(queries):
+                    chunk: bytes = s.recv(payload_size)
+                    if not chunk:
+                        break
+                    received += chunk
+
+                for query, response in zip(queries, received.splitlines()):
+                    print(f"{query}: {response.decode('utf-8')}")
                 return
 
             message: str = sys.argv[1]
@@ -58,5 +75,5 @@ def start_client() -> None:
 
 
 if __name__ == "__main__":
-    while True:
-        start_client()
+    # For sustained load use benchmarks/loadgen.py instead of looping here
+    start_client()
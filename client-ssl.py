@@ -37,8 +37,13 @@ def start_client() -> None:
 
     try:
         context = ssl.create_default_context()
+        # Also trust the server's own (typically self-signed) certificate
+        certfile = configs.get("CERTFILE")
+        if certfile:
+            context.load_verify_locations(cafile=str(certfile))
+
         with socket.create_connection(server_address) as sock:
-            with context.wrap_socket(socket, server_hostname=configs.get("HOST")) as ssock:
+            with context.wrap_socket(sock, server_hostname=configs.get("HOST")) as ssock:
                 # Connect to the server
                 ssock.sendall(bytes(sys.argv[1], 'utf-8'))
                 
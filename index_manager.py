@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+""" Owns the server's search index and reloads it when the file changes """
+
+
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator, NamedTuple, Protocol, cast
+from algorithms.segmented_index import SegmentedIndex, index_tail
+from logger.logger import logger
+from metrics import METRICS
+from query_cache import QueryCache
+
+# Appended tails indexed as separate segments before a full rebuild
+# compacts them back into one index
+MAX_SEGMENTS = 16
+
+
+class FileSignature(NamedTuple):
+    """ Identity of a file's content as seen by os.stat
+
+    Attributes:
+        inode (int): The inode number, changes when the file is replaced
+        size (int): The size of the file in bytes
+        mtime_ns (int): The modification time in nanoseconds
+    """
+    inode: int
+    size: int
+    mtime_ns: int
+
+
+class IndexGeneration(NamedTuple):
+    """ One immutable generation of the index
+
+    Attributes:
+        index (Any): The built index, shared read-only
+        generation (int): Incremented on every successful rebuild
+        signature (FileSignature): The file identity the index was built from
+        indexed_size (int): The bytes of the file covered by the index, -1
+                            when unknown
+    """
+    index: Any
+    generation: int
+    signature: FileSignature
+    indexed_size: int = -1
+
+
+class ManagedIndex(Protocol):
+    """ What the servers need from the owner of the search index, met by
+    IndexManager and sharded_index.ShardedIndexManager """
+    def search(self, query: bytes) -> bool:
+        """ Looks up one line """
+
+    def search_many(self, queries: list[bytes]) -> list[bool]:
+        """ Looks up a batch of lines """
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """ Counts the lines starting with ``prefix`` """
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int) -> tuple[int, Iterator[bytes]]:
+        """ Lists up to ``limit`` lines starting with ``prefix`` """
+
+    def check_for_changes(self) -> bool:
+        """ Starts a background rebuild if the indexed files changed """
+
+    def start_watcher(self, interval: float) -> threading.Thread:
+        """ Checks for changes every ``interval`` seconds """
+
+
+def file_signature(file_path: str) -> FileSignature:
+    """Returns the signature of a file used to detect changes.
+
+    Args:
+        file_path (str): The path to the file.
+    Returns:
+        FileSignature: The inode, size and modification time of the file.
+    """
+    stat = os.stat(file_path)
+    return FileSignature(stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class IndexManager:
+    """ Builds an index over a file and swaps in a fresh one on change
+
+    Readers take ``current`` once per query and use that generation to the
+    end, so a query arriving during a rebuild is answered from the previous
+    generation. Rebuilds happen on a background thread and the new
+    generation is published with a single attribute assignment.
+
+    With ``append_only`` a file that only grew (same inode, larger) has
+    just its new complete lines indexed, as one more segment of the live
+    index. Truncation, replacement or an in-place rewrite still rebuild in
+    full, as does reaching ``max_segments``, which compacts the segments.
+
+    Attributes:
+        file_path (str): The file being indexed
+        builder (Callable[[str], Any]): Builds an index from a file path
+        current (IndexGeneration | None): The generation serving queries
+        cache (QueryCache | None): Results keyed by query and generation
+        append_only (bool): Whether growth is indexed incrementally
+        max_segments (int): The most segments before a full rebuild
+    """
+    def __init__(self, file_path: str, builder: Callable[[str], Any],
+                 cache: QueryCache | None = None, append_only: bool = False,
+                 max_segments: int = MAX_SEGMENTS) -> None:
+        """ Initializes the manager, the index is built by ``build`` """
+        self.file_path = file_path
+        self.builder = builder
+        self.cache = cache
+        self.append_only = append_only
+        self.max_segments = max_segments
+        self.current: IndexGeneration | None = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def build(self) -> IndexGeneration:
+        """Builds the index synchronously and publishes it.
+
+        Returns:
+            IndexGeneration: The newly published generation.
+        """
+        # Stat before reading so a change during the build is caught later
+        signature = file_signature(self.file_path)
+
+        build_start = time.time()
+        index = self.builder(self.file_path)
+        generation = self.current.generation + 1 if self.current else 1
+
+        # Lines appended during the build may be indexed twice later on,
+        # which lookups do not notice
+        self.current = IndexGeneration(index, generation, signature,
+                                       signature.size)
+        METRICS.inc("index_builds")
+        logger.info(
+            f"Index generation {generation} of {self.file_path} built in "
+            f"{time.time() - build_start:.4f} seconds"
+        )
+        if self.cache is not None:
+            logger.info(f"Query cache: {self.cache.stats()}")
+        return self.current
+
+    def check_for_changes(self) -> bool:
+        """Starts a background rebuild if the file changed since the
+        current generation was built. Never blocks on the rebuild.
+
+        Returns:
+            bool: True if a rebuild was started, False otherwise.
+        """
+        try:
+            signature = file_signature(self.file_path)
+        except OSError as e:
+            logger.error(f"Could not stat {self.file_path}: {e}")
+            return False
+
+        if self.current is not None and signature == self.current.signature:
+            return False
+
+        with self._lock:
+            if self._rebuilding:
+                return False
+            self._rebuilding = True
+
+        threading.Thread(target=self._rebuild, daemon=True).start()
+        return True
+
+    def append(self) -> IndexGeneration | None:
+        """Indexes only the lines appended since the current generation, if
+        the file just grew, and publishes the result.
+
+        Returns:
+            IndexGeneration | None: The published generation, or None if
+                                    a full rebuild is needed instead.
+        """
+        current = self.current
+        signature = file_signature(self.file_path)
+        if current is None or current.indexed_size < 0 \
+                or signature.inode != current.signature.inode \
+                or signature.size <= current.signature.size:
+            return None  # Replaced, truncated or rewritten in place
+
+        index = current.index
+        segments = index.segments if isinstance(index, SegmentedIndex) \
+            else [index]
+        if len(segments) >= self.max_segments:
+            return None  # Compact with a full rebuild
+
+        # Tails read lines the same way as the engine of the base index
+        strip = getattr(segments[0], "strip_lines", False)
+        start = time.time()
+        try:
+            tail, end = index_tail(self.file_path, current.indexed_size,
+                                   strip)
+        except ValueError:
+            return None  # The indexed part no longer ends on a line
+
+        if tail is None:
+            # Only a partial line so far: remember the stat, keep the index
+            self.current = current._replace(signature=signature)
+            return self.current
+
+        self.current = IndexGeneration(
+            SegmentedIndex(segments + [tail]), current.generation + 1,
+            signature, end,
+        )
+        METRICS.inc("index_appends")
+        logger.info(
+            f"Index generation {self.current.generation} of "
+            f"{self.file_path}: {len(tail)} appended lines indexed in "
+            f"{time.time() - start:.4f} seconds"
+        )
+        return self.current
+
+    def _rebuild(self) -> None:
+        """ Rebuilds the index, keeping the old generation on failure """
+        try:
+            if not (self.append_only and self.append()):
+                self.build()
+        except Exception as e:
+            METRICS.inc("index_build_failures")
+            logger.error(f"Index rebuild failed, keeping old generation: {e}")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def start_watcher(self, interval: float) -> threading.Thread:
+        """Starts a daemon thread polling the file every ``interval``
+        seconds and rebuilding the index when it changes.
+
+        Args:
+            interval (float): Seconds between two checks.
+        Returns:
+            threading.Thread: The started watcher thread.
+        """
+        def watch() -> None:
+            while True:
+                time.sleep(interval)
+                self.check_for_changes()
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        return watcher
+
+    def search(self, query: bytes) -> bool:
+        """Looks up a query in the current generation.
+
+        Args:
+            query (bytes): The line to search for.
+        Returns:
+            bool: True if the line exists, False otherwise.
+        """
+        current = self.current
+        if current is None:
+            raise RuntimeError("Search index has not been built.")
+
+        if self.cache is None:
+            return current.index.search(query)
+
+        key = (query, current.generation)
+        found = self.cache.get(key)
+        if found is None:
+            found = current.index.search(query)
+            self.cache.put(key, found)
+        return found
+
+    def search_many(self, queries: list[bytes]) -> list[bool]:
+        """Looks up a batch of queries in the current generation, in one
+        pass when the index supports it.
+
+        Args:
+            queries (list[bytes]): The lines to search for.
+        Returns:
+            list[bool]: Whether each line exists, in the input order.
+        """
+        current = self.current
+        if current is None:
+            raise RuntimeError("Search index has not been built.")
+
+        cache = self.cache
+        results: list[bool | None] = [None] * len(queries)
+        if cache is not None:
+            results = [cache.get((query, current.generation))
+                       for query in queries]
+        missing = [i for i, found in enumerate(results) if found is None]
+
+        index = current.index
+        misses = [queries[i] for i in missing]
+        if hasattr(index, "search_many"):
+            found_misses = index.search_many(misses)
+        else:
+            found_misses = [index.search(query) for query in misses]
+
+        for i, found in zip(missing, found_misses):
+            results[i] = found
+            if cache is not None:
+                cache.put((queries[i], current.generation), found)
+        # Every None was a miss and has been filled in
+        return cast(list[bool], results)
+
+    def _prefix_index(self) -> Any:
+        """ Returns the current index, if it can answer prefix queries """
+        current = self.current
+        if current is None:
+            raise RuntimeError("Search index has not been built.")
+        if not hasattr(current.index, "prefix_count"):
+            raise NotImplementedError(
+                f"{type(current.index).__name__} does not support prefix "
+                f"queries"
+            )
+        return current.index
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """Counts the lines starting with ``prefix`` in the current
+        generation. Prefix queries bypass the query cache.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+        Returns:
+            int: The number of lines, duplicates included.
+        Raises:
+            NotImplementedError: If the index cannot answer prefix queries.
+        """
+        return self._prefix_index().prefix_count(prefix)
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int) -> tuple[int, Iterator[bytes]]:
+        """Lists up to ``limit`` lines starting with ``prefix``, both the
+        count and the lines coming from the same generation.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+            limit (int): The most lines to list.
+        Returns:
+            tuple[int, Iterator[bytes]]: How many lines will be listed, and
+                                         a lazy iterator over them in order.
+        Raises:
+            NotImplementedError: If the index cannot answer prefix queries.
+        """
+        index = self._prefix_index()
+        count = min(index.prefix_count(prefix), limit)
+        return count, index.prefix_lines(prefix, count)
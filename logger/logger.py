@@ -1,35 +1,190 @@
+""" Logging pipeline: callers only enqueue records, a background listener
+formats them and writes them once to the console and to one rotating file
+
+Each prefork worker moves its file records to a file of its own with
+``use_log_file``: a rotating file must have a single writer, otherwise
+every process rotates it independently and records are lost.
+
+Per-query records can be sampled with ``set_sample_rate``; callers guard
+them with ``if sample():`` so unsampled queries do not even build the
+message. Errors are never sampled.
+"""
+
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import TextIO
 
-logger = logging.getLogger('Filesearch_tcp')
+LOG_FILE = "./log_files/details.log"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-logger.setLevel(logging.DEBUG)
+# Records waiting for the listener; beyond this they are dropped (and
+# counted) rather than letting a slow disk stall the request path
+QUEUE_SIZE = 10_000
 
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
 
-# File handler
-file_handler = logging.FileHandler('./log_files/details.log')
-file_handler.setLevel(logging.DEBUG)
+class DroppingQueueHandler(QueueHandler):
+    """ Enqueues records without blocking, dropping them if the queue is full
 
-# Rotating file handler
-rotatingFileHandler = RotatingFileHandler(
-    "log_files/details.log",
-    maxBytes=1024*1024,
-    backupCount=20
-)
+    Formatting is left to the listener thread: records never leave the
+    process, so they need not be flattened on the caller's thread.
+
+    Attributes:
+        dropped (int): Records dropped because the queue was full
+    """
+    def __init__(self, log_queue: queue.Queue) -> None:
+        """ Initializes the handler over ``log_queue`` """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """ Passes the record through unformatted """
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """ Puts the record on the queue, or counts it as dropped """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def create_file_handler(file_path: str,
+                        delay: bool = False) -> RotatingFileHandler:
+    """Creates the rotating handler writing every record to ``file_path``.
+
+    Args:
+        file_path (str): The log file.
+        delay (bool, optional): Whether to create the file only when the
+                                first record arrives. Defaults to False.
+    Returns:
+        RotatingFileHandler: The handler, at DEBUG and above.
+    """
+    file_handler = RotatingFileHandler(
+        file_path,
+        maxBytes=1024*1024,
+        backupCount=20,
+        delay=delay,
+    )
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return file_handler
+
+
+def create_queue_logger(
+    name: str, file_path: str, stream: TextIO | None = None,
+    queue_size: int = QUEUE_SIZE,
+) -> tuple[logging.Logger, DroppingQueueHandler, QueueListener]:
+    """Creates a logger whose records go through a queue to a listener
+    thread writing them to ``file_path`` (rotating) and to ``stream``.
+
+    Args:
+        name (str): The logger name.
+        file_path (str): The log file.
+        stream (TextIO | None, optional): Console stream for INFO and
+                                          above. Defaults to stderr.
+        queue_size (int, optional): The most records waiting.
+                                    Defaults to QUEUE_SIZE.
+    Returns:
+        tuple: The logger, its queue handler and the started listener.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    console_handler = logging.StreamHandler(stream)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+
+    file_handler = create_file_handler(file_path)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+    listener = QueueListener(
+        queue_handler.queue, console_handler, file_handler,
+        respect_handler_level=True,
+    )
+
+    new_logger = logging.getLogger(name)
+    new_logger.setLevel(logging.DEBUG)
+    new_logger.propagate = False
+    new_logger.addHandler(queue_handler)
+
+    listener.start()
+    return new_logger, queue_handler, listener
 
-# Define log message format
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+logger, queue_handler, listener = create_queue_logger(
+    'Filesearch_tcp', LOG_FILE
 )
 
-console_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
-rotatingFileHandler.setFormatter(formatter)
+_sample_rate = 1.0
+
+
+def set_sample_rate(rate: float) -> None:
+    """ Sets the fraction (0 to 1) of per-query records that are logged """
+    global _sample_rate
+    _sample_rate = min(max(rate, 0.0), 1.0)
+
+
+def sample() -> bool:
+    """ Returns whether to log the current query's records """
+    return _sample_rate >= 1.0 or random.random() < _sample_rate
+
+
+def stop_logging() -> None:
+    """ Writes out every queued record and stops the listener """
+    if listener._thread is not None:
+        listener.stop()
+
+
+def start_logging() -> None:
+    """ Starts the listener again after ``stop_logging`` """
+    if listener._thread is None:
+        listener.start()
+
+
+def use_log_file(file_path: str,
+                 log_listener: QueueListener | None = None) -> None:
+    """Moves the listener's file records to ``file_path``; the console is
+    kept. The file is created when the first record arrives.
+
+    Args:
+        file_path (str): The new log file.
+        log_listener (QueueListener | None, optional): The listener to
+            change. Defaults to this process's listener.
+    """
+    log_listener = log_listener or listener
+    running = log_listener._thread is not None
+    if running:
+        log_listener.stop()
+    handlers = []
+    for handler in log_listener.handlers:
+        if isinstance(handler, RotatingFileHandler):
+            handler.close()
+            handler = create_file_handler(file_path, delay=True)
+        handlers.append(handler)
+    log_listener.handlers = tuple(handlers)
+    if running:
+        log_listener.start()
+
+
+def worker_log_file(slot: int) -> str:
+    """ Returns the log file of the prefork worker in ``slot``, e.g.
+    ./log_files/details.worker-0.log """
+    root, ext = os.path.splitext(LOG_FILE)
+    return f"{root}.worker-{slot}{ext}"
+
+
+def _restart_after_fork() -> None:
+    """ A forked child has the queue but not the listener thread: give it
+    its own queue and listener """
+    global listener
+    queue_handler.queue = queue.Queue(QUEUE_SIZE)
+    listener = QueueListener(queue_handler.queue, *listener.handlers,
+                             respect_handler_level=True)
+    listener.start()
+
 
-# Add handlers to the logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
-logger.addHandler(rotatingFileHandler)
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(stop_logging)
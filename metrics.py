@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+""" In-process metrics: per-phase latency histograms and counters,
+exposed in the Prometheus text format on a separate local port """
+
+
+import bisect
+import http.server
+import threading
+import urllib.parse
+from typing import Any, Callable, Iterable
+
+# Values below 2**SUB_BUCKET_BITS microseconds get a bucket each; above
+# that every power of two is split into 2**SUB_BUCKET_BITS buckets, so a
+# value is known to within about 3% wherever it falls (HDR-style)
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_MICROS = (1 << 36) - 1  # About 19 hours; larger values are clamped
+NUM_BUCKETS = (MAX_MICROS.bit_length() - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+# Bucket bounds (seconds) exported to Prometheus, from the fine buckets
+EXPORTED_BOUNDS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+EXPORTED_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# Phases of a connection, in order; "batch_search" is one BATCH command and
+# "prefix_search" the index lookup of one PREFIX_* command
+PHASES = ("accept", "handshake", "recv", "search", "batch_search",
+          "prefix_search", "send")
+
+COUNTERS = {
+    "connections": "Client connections accepted",
+    "queries": "Queries answered, batched ones included",
+    "hits": "Queries whose line exists",
+    "misses": "Queries whose line does not exist",
+    "errors": "Connections that ended with an error",
+    "index_builds": "Index generations built, the first one included",
+    "index_build_failures": "Index rebuilds that failed",
+    "index_appends": "Appended tails indexed without a full rebuild",
+    "cache_hits": "Lookups answered from the query cache",
+    "cache_misses": "Lookups that went to the index",
+    "log_records_dropped": "Log records dropped with the log queue full",
+    "busy_rejections": "Connections refused with BUSY at capacity",
+    "read_timeouts": "Connections closed waiting for the rest of a query",
+    "idle_timeouts": "Connections closed idle between queries",
+}
+
+# Point-in-time values, only ever supplied by collectors
+GAUGES = {
+    "connections_active": "Connections being served",
+    "connections_queued": "Accepted connections waiting for a worker",
+}
+
+PREFIX = "filesearch"
+
+
+def bucket_index(micros: int) -> int:
+    """Returns the histogram bucket holding a value in microseconds.
+
+    Args:
+        micros (int): The value, clamped to [0, MAX_MICROS].
+    Returns:
+        int: The bucket index.
+    """
+    micros = min(max(micros, 0), MAX_MICROS)
+    if micros < SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+
+def bucket_upper_bound(index: int) -> int:
+    """ Returns the largest value in microseconds held by a bucket """
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index % SUB_BUCKETS + SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """ Fixed-size log-linear histogram of durations
+
+    Recording is one index computation and a few additions under a lock;
+    memory is constant however many values are recorded.
+
+    Attributes:
+        counts (list[int]): Values per bucket
+        count (int): Values recorded
+        total (float): Sum of the values recorded, in seconds
+    """
+    def __init__(self) -> None:
+        """ Initializes an empty histogram """
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """ Records one duration in seconds """
+        index = bucket_index(int(seconds * 1_000_000))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self) -> tuple[list[int], int, float]:
+        """ Returns a consistent copy of (counts, count, total) """
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def quantile(self, q: float) -> float:
+        """Returns the upper bound of the bucket holding quantile ``q``.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+        Returns:
+            float: The value in seconds, 0.0 when nothing was recorded.
+        """
+        counts, count, _ = self.snapshot()
+        return quantile_of(counts, count, q)
+
+
+def quantile_of(counts: list[int], count: int, q: float) -> float:
+    """ Returns quantile ``q`` (in seconds) of a histogram snapshot """
+    if not count:
+        return 0.0
+    rank = max(1, round(q * count))
+    seen = 0
+    for index, bucket in enumerate(counts):
+        seen += bucket
+        if seen >= rank:
+            return bucket_upper_bound(index) / 1_000_000
+    return MAX_MICROS / 1_000_000
+
+
+class Metrics:
+    """ Registry of the phase histograms and counters of one process
+
+    Attributes:
+        histograms (dict[str, Histogram]): Durations by phase
+        counters (dict[str, int]): Counts by name, see COUNTERS
+        tracer (Callable[[str, float], None] | None): Also called with
+                every phase recorded, while a profile traces them
+    """
+    def __init__(self) -> None:
+        """ Initializes every phase and counter at zero """
+        self.histograms = {phase: Histogram() for phase in PHASES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.tracer: Callable[[str, float], None] | None = None
+        self._collectors: list[Callable[[], dict[str, int]]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float) -> None:
+        """ Records a duration of one of PHASES """
+        self.histograms[phase].record(seconds)
+        if self.tracer is not None:
+            self.tracer(phase, seconds)
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        """ Increments one of COUNTERS """
+        with self._lock:
+            self.counters[name] += amount
+
+    def count_results(self, found: Iterable[bool]) -> None:
+        """ Counts answered queries as hits and misses """
+        found = list(found)
+        hits = sum(found)
+        with self._lock:
+            self.counters["queries"] += len(found)
+            self.counters["hits"] += hits
+            self.counters["misses"] += len(found) - hits
+
+    def add_collector(self, collector: Callable[[], dict[str, int]]) -> None:
+        """Adds a callable read at exposition time whose values override
+        counters kept elsewhere (e.g. the query cache's own hit counts), so
+        the hot path does not count them twice, or supply GAUGES."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition, one sample per line.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        counters.update(dict.fromkeys(GAUGES, 0))
+        for collector in self._collectors:
+            counters.update(collector())
+
+        lines: list[str] = []
+        for name, help_text in COUNTERS.items():
+            metric = f"{PREFIX}_{name}_total"
+            lines += [f"# HELP {metric} {help_text}",
+                      f"# TYPE {metric} counter",
+                      f"{metric} {counters[name]}"]
+        for name, help_text in GAUGES.items():
+            metric = f"{PREFIX}_{name}"
+            lines += [f"# HELP {metric} {help_text}",
+                      f"# TYPE {metric} gauge",
+                      f"{metric} {counters[name]}"]
+
+        metric = f"{PREFIX}_phase_seconds"
+        lines += [f"# HELP {metric} Time spent in each connection phase",
+                  f"# TYPE {metric} histogram"]
+        snapshots = {phase: histogram.snapshot()
+                     for phase, histogram in self.histograms.items()}
+        bounds = [bound * 1_000_000 for bound in EXPORTED_BOUNDS]
+
+        for phase, (counts, count, total) in snapshots.items():
+            cumulative = [0] * len(bounds)
+            for index, bucket in enumerate(counts):
+                if bucket:
+                    first = bisect.bisect_left(bounds,
+                                               bucket_upper_bound(index))
+                    for i in range(first, len(bounds)):
+                        cumulative[i] += bucket
+            for bound, value in zip(EXPORTED_BOUNDS, cumulative):
+                lines.append(
+                    f'{metric}_bucket{{phase="{phase}",le="{bound}"}} {value}'
+                )
+            lines += [f'{metric}_bucket{{phase="{phase}",le="+Inf"}} {count}',
+                      f'{metric}_sum{{phase="{phase}"}} {total}',
+                      f'{metric}_count{{phase="{phase}"}} {count}']
+
+        metric = f"{PREFIX}_phase_quantile_seconds"
+        lines += [f"# HELP {metric} Phase latency quantiles since start, "
+                  f"from the full-resolution histograms",
+                  f"# TYPE {metric} gauge"]
+        for phase, (counts, count, _) in snapshots.items():
+            for q in EXPORTED_QUANTILES:
+                seconds = quantile_of(counts, count, q)
+                lines.append(
+                    f'{metric}{{phase="{phase}",quantile="{q}"}} {seconds}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide registry every module records into
+METRICS = Metrics()
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    """ A threading HTTP server that carries the profiler /profile runs """
+    daemon_threads = True
+    profiler: Any = None
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """ Serves METRICS.render() on GET /metrics, and runs a profile on
+    GET /profile?seconds=N when the server has a profiler """
+    def do_GET(self) -> None:
+        """ Answers /metrics with the exposition, /profile with the
+        collapsed stacks, anything else with 404 """
+        url = urllib.parse.urlsplit(self.path)
+        profiler = getattr(self.server, "profiler", None)
+        if url.path == "/profile" and profiler is not None:
+            self.profile(profiler, urllib.parse.parse_qs(url.query))
+            return
+        if url.path not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        self.reply(METRICS.render(), "text/plain; version=0.0.4")
+
+    def profile(self, profiler: Any, query: dict[str, list[str]]) -> None:
+        """ Profiles for the requested seconds (default 10) and answers
+        with the collapsed stacks """
+        try:
+            folded = profiler.run(float(query.get("seconds", ["10"])[0]))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        except RuntimeError as e:
+            self.send_error(409, str(e))
+            return
+        self.reply(folded, "text/plain")
+
+    def reply(self, text: str, content_type: str) -> None:
+        """ Sends a 200 response with ``text`` as its body """
+        body = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """ Keeps scrapes out of the server log """
+
+
+def start_metrics_server(host: str, port: int,
+                         profiler: Any = None) -> MetricsServer:
+    """Serves the metrics on a daemon thread.
+
+    Args:
+        host (str): The address to bind, normally 127.0.0.1.
+        port (int): The port to bind, 0 for any free port.
+        profiler (Any, optional): A profiler.Profiler to run on
+                                  /profile. Defaults to None (no route).
+    Returns:
+        MetricsServer: The running server.
+    """
+    server = MetricsServer((host, port), MetricsHandler)
+    server.profiler = profiler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+""" Pre-fork supervisor running the server in several worker processes """
+
+
+import os
+import signal
+import time
+from typing import Callable
+from logger.logger import (logger, start_logging, stop_logging,
+                           use_log_file, worker_log_file)
+
+# A worker that dies sooner than this after starting is restarted only
+# after this delay, so a crashing worker cannot fork in a tight loop
+RESTART_DELAY = 1.0
+
+
+class Supervisor:
+    """ Forks worker processes, restarts dead ones and fans out signals
+
+    Every worker runs ``worker`` and is expected to listen on the shared
+    port with SO_REUSEPORT, so the kernel spreads connections across them.
+    The supervisor itself never serves requests. Its only thread is the
+    log listener, which is stopped around every fork so no lock can be
+    held by a thread that does not exist in the child. Each worker writes
+    its records to its own file, named after its slot.
+
+    SIGHUP runs ``prepare`` again (e.g. to refresh the on-disk index once
+    rather than once per worker) and is then forwarded to every worker.
+    SIGUSR1 is forwarded to every worker, each writing its own profile.
+    SIGTERM and SIGINT stop the workers and the supervisor.
+
+    Attributes:
+        worker (Callable[[int], None]): Runs a worker until it exits, given
+                                        its slot: 0 to workers - 1, kept
+                                        by a restarted worker
+        workers (int): The number of worker processes to keep running
+        prepare (Callable[[], None] | None): Runs in the supervisor before
+                                             forking and on every SIGHUP
+        pids (dict[int, float]): Live worker pids and their start times
+        slots (dict[int, int]): Live worker pids and their slots
+    """
+    def __init__(self, worker: Callable[[int], None], workers: int,
+                 prepare: Callable[[], None] | None = None) -> None:
+        """ Initializes the supervisor, no process is started yet """
+        self.worker = worker
+        self.workers = workers
+        self.prepare = prepare
+        self.pids: dict[int, float] = {}
+        self.slots: dict[int, int] = {}
+        self._stopping = False
+
+    def spawn(self, slot: int = 0) -> int:
+        """Forks one worker process.
+
+        Args:
+            slot (int, optional): The worker's slot. Defaults to 0.
+
+        Returns:
+            int: The pid of the new worker.
+        """
+        # The child starts its own log listener once forked
+        stop_logging()
+        try:
+            pid = os.fork()
+        except OSError:
+            start_logging()
+            raise
+        if pid:
+            start_logging()
+            self.pids[pid] = time.monotonic()
+            self.slots[pid] = slot
+            return pid
+
+        # In the worker: restore default signal handling and never return
+        # into the supervisor's loop
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            # Ignored until the worker installs its handlers, as by
+            # default either would kill the worker
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            # Only one process may write, and rotate, each log file
+            use_log_file(worker_log_file(slot))
+            self.worker(slot)
+        except BaseException as e:
+            logger.error(f"Worker {os.getpid()} failed: {e}")
+            exit_code = 1
+        finally:
+            # os._exit skips atexit, so write out queued records first
+            stop_logging()
+            os._exit(exit_code)
+
+    def signal_workers(self, signum: int) -> None:
+        """ Sends ``signum`` to every live worker """
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _on_reload(self, signum: int, frame) -> None:
+        """ SIGHUP handler: refresh shared state, then tell the workers """
+        logger.info("Reload requested, signalling workers")
+        if self.prepare is not None:
+            try:
+                self.prepare()
+            except Exception as e:
+                logger.error(f"Reload preparation failed: {e}")
+        self.signal_workers(signal.SIGHUP)
+
+    def _on_stop(self, signum: int, frame) -> None:
+        """ SIGTERM/SIGINT handler: stop restarting and stop the workers """
+        self._stopping = True
+        self.signal_workers(signal.SIGTERM)
+
+    def run(self) -> None:
+        """
+        Starts the workers and supervises them until asked to stop.
+
+        Returns:
+            None
+        """
+        if self.prepare is not None:
+            self.prepare()
+
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGUSR1,
+                      lambda signum, frame: self.signal_workers(signum))
+
+        for slot in range(self.workers):
+            self.spawn(slot)
+        logger.info(f"Started {self.workers} workers: {sorted(self.pids)}")
+
+        while self.pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            started = self.pids.pop(pid, None)
+            slot = self.slots.pop(pid, 0)
+            if started is None or self._stopping:
+                continue
+
+            logger.error(
+                f"Worker {pid} exited with status "
+                f"{os.waitstatus_to_exitcode(status)}, restarting"
+            )
+            if time.monotonic() - started < RESTART_DELAY:
+                time.sleep(RESTART_DELAY)
+            if not self._stopping:
+                self.spawn(slot)
+
+        logger.info("All workers stopped")
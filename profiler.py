@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+""" On-demand profiling of the running server
+
+A profile samples the stack of every thread at a fixed interval for a
+number of seconds, on a background thread, and writes the samples as
+collapsed stacks ("thread;file:function;... count" per line), the input
+of flamegraph.pl and speedscope. Sampling is wall-clock, so threads
+blocked in recv, accept or a lock show up as much as busy ones.
+
+While a profile runs, every phase timed by METRICS (accept, recv, search,
+send, ...) is also recorded as a span and written in the Chrome trace
+event format, for chrome://tracing or Perfetto. Outside a profile no
+thread samples and recording a phase costs one attribute check.
+
+A profile is started with SIGUSR1 or from the metrics port:
+    kill -USR1 <pid>
+    curl 'http://127.0.0.1:9100/profile?seconds=10' > profile.folded
+"""
+
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any
+from logger.logger import logger
+from metrics import METRICS, Metrics
+
+MAX_SECONDS = 300  # Longest profile accepted
+MAX_SPANS = 1_000_000  # Spans kept per profile; the oldest are dropped
+
+
+def collapse(frame: Any, thread_name: str) -> str:
+    """Returns the collapsed form of a stack, outermost frame first.
+
+    Args:
+        frame (Any): The innermost frame of the stack.
+        thread_name (str): The thread's name, used as the root.
+    Returns:
+        str: e.g. "MainThread;server.py:start_server;server.py:accept".
+    """
+    names: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:"
+                     f"{code.co_qualname}")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+def thread_group(name: str) -> str:
+    """ Drops the index from pool thread names ("ThreadPoolExecutor-0_3"),
+    so the stacks of all workers of a pool are merged """
+    group, _, index = name.rpartition("_")
+    return group if group and index.isdigit() else name
+
+
+def sample_stacks(seconds: float,
+                  interval: float = 0.005) -> collections.Counter:
+    """Samples the stack of every other thread until ``seconds`` pass.
+
+    Args:
+        seconds (float): How long to sample.
+        interval (float, optional): Seconds between two samples.
+                                    Defaults to 0.005.
+    Returns:
+        collections.Counter: Samples per collapsed stack.
+    """
+    stacks: collections.Counter = collections.Counter()
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread_group(thread.name)
+                 for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                stacks[collapse(frame, names.get(ident, str(ident)))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+class Tracer:
+    """ Collects a span for every phase recorded while it is attached
+
+    Attributes:
+        spans (collections.deque): (phase, start, seconds, thread) tuples,
+                                   start on the perf_counter clock
+    """
+    def __init__(self, capacity: int = MAX_SPANS) -> None:
+        """ Initializes an empty tracer keeping at most ``capacity`` """
+        self.spans: collections.deque = collections.deque(maxlen=capacity)
+
+    def record(self, phase: str, seconds: float) -> None:
+        """ Records a phase that has just ended, as a Metrics tracer """
+        self.spans.append((phase, time.perf_counter() - seconds, seconds,
+                           threading.get_ident()))
+
+    def chrome_trace(self) -> dict:
+        """Returns the spans in the Chrome trace event format.
+
+        Returns:
+            dict: A {"traceEvents": [...]} document, times in microseconds.
+        """
+        pid = os.getpid()
+        return {"traceEvents": [
+            {"name": phase, "ph": "X", "ts": start * 1e6,
+             "dur": seconds * 1e6, "pid": pid, "tid": thread}
+            for phase, start, seconds, thread in list(self.spans)
+        ]}
+
+
+class Profiler:
+    """ Runs one profile at a time and writes its files
+
+    Attributes:
+        out_dir (str): Where profile files are written
+        interval (float): Seconds between two stack samples
+        trace (bool): Whether phase spans are recorded too
+        metrics (Metrics): The registry whose phases are traced
+    """
+    def __init__(self, out_dir: str, interval: float = 0.005,
+                 trace: bool = True, metrics: Metrics = METRICS) -> None:
+        """ Initializes an idle profiler """
+        self.out_dir = out_dir
+        self.interval = interval
+        self.trace = trace
+        self.metrics = metrics
+        self._running = False
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float) -> str:
+        """Profiles the process for ``seconds``, blocking the caller.
+
+        Args:
+            seconds (float): How long to sample, at most MAX_SECONDS.
+        Returns:
+            str: The collapsed stacks, also written to
+                 ``profile-<pid>-<time>.folded`` in ``out_dir`` (with a
+                 ``.trace.json`` next to it when tracing).
+        Raises:
+            ValueError: If ``seconds`` is out of range.
+            RuntimeError: If a profile is already running.
+        """
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"A profile lasts 0 to {MAX_SECONDS} seconds")
+        with self._lock:
+            if self._running:
+                raise RuntimeError("A profile is already running")
+            self._running = True
+
+        tracer = Tracer() if self.trace else None
+        try:
+            if tracer is not None:
+                self.metrics.tracer = tracer.record
+            stacks = sample_stacks(seconds, self.interval)
+        finally:
+            self.metrics.tracer = None
+            with self._lock:
+                self._running = False
+
+        folded = "".join(f"{stack} {count}\n"
+                         for stack, count in sorted(stacks.items()))
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(
+            self.out_dir,
+            f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}"
+        )
+        with open(f"{path}.folded", "w") as file:
+            file.write(folded)
+        if tracer is not None:
+            with open(f"{path}.trace.json", "w") as file:
+                json.dump(tracer.chrome_trace(), file)
+        logger.info(f"Profile of {seconds}s written to {path}.folded")
+        return folded
+
+    def start(self, seconds: float) -> bool:
+        """Starts a profile on a daemon thread, e.g. from a signal handler.
+
+        Args:
+            seconds (float): How long to sample.
+        Returns:
+            bool: False if a profile is already running, True otherwise.
+        """
+        if self._running:
+            logger.error("Error: a profile is already running")
+            return False
+
+        def run() -> None:
+            try:
+                self.run(seconds)
+            except (RuntimeError, ValueError, OSError) as e:
+                logger.error(f"Error: profile failed: {e}")
+
+        threading.Thread(target=run, name="profiler", daemon=True).start()
+        return True
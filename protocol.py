@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+""" Wire protocol shared by the server engines """
+
+
+import socket
+import threading
+import time
+from typing import Iterable, Iterator
+from index_manager import ManagedIndex
+from logger.logger import logger, sample
+from metrics import METRICS
+
+EXISTS: bytes = b"STRING EXISTS\n"
+NOT_EXISTS: bytes = b"STRING NOT FOUND\n"
+LINE_TOO_LONG: bytes = b"ERROR LINE TOO LONG\n"
+BAD_BATCH: bytes = b"ERROR BAD BATCH\n"
+BAD_PREFIX: bytes = b"ERROR BAD PREFIX\n"
+PREFIX_UNSUPPORTED: bytes = b"ERROR PREFIX UNSUPPORTED\n"
+
+# Line-protocol batch request: "BATCH <n> [BITMAP|HITS]" followed by n
+# query lines, answered by a single "BITMAP" or "HITS" line
+BATCH_COMMAND = b"BATCH"
+BATCH_BITMAP = b"BITMAP"
+BATCH_HITS = b"HITS"
+
+# Line-protocol prefix requests, each answered from the resident index:
+#   "PREFIX_EXISTS <prefix>"         -> STRING EXISTS / STRING NOT FOUND
+#   "PREFIX_COUNT <prefix>"          -> "COUNT <n>"
+#   "PREFIX_LIST <limit> <prefix>"   -> "LIST <n>" then the n lines, in order
+# The prefix is everything after the separating space, spaces included
+PREFIX_EXISTS = b"PREFIX_EXISTS"
+PREFIX_COUNT = b"PREFIX_COUNT"
+PREFIX_LIST = b"PREFIX_LIST"
+
+# Responses are coalesced up to this many bytes before being handed to the
+# transport, so a long listing is sent in pieces instead of built whole
+STREAM_CHUNK = 64 * 1024
+
+# Values of the PROTOCOL configuration key
+SINGLE_QUERY = "single"  # One query per connection, no framing
+LINE_DELIMITED = "line"  # Many newline-terminated queries per connection
+
+
+def process_query(
+    index_manager: ManagedIndex, query: bytes, reread: bool = False
+) -> bytes:
+    """
+    Answers one query from the resident index.
+
+    Args:
+        index_manager (ManagedIndex): Owns the index to search.
+        query (bytes): The line to search for.
+        reread (bool, optional): Whether to check the file for changes
+                                 first (REREAD_ON_QUERY). A changed file is
+                                 re-indexed in the background while this
+                                 query is answered from the current
+                                 generation. Defaults to False.
+
+    Returns:
+        bytes: The response to send back to the client.
+    """
+    if reread:
+        index_manager.check_for_changes()
+
+    start = time.perf_counter()
+    found = index_manager.search(query)
+    METRICS.observe("search", time.perf_counter() - start)
+    METRICS.count_results((found,))
+
+    return EXISTS if found else NOT_EXISTS
+
+
+def encode_batch_result(
+    found: list[bool], reply: bytes = BATCH_BITMAP
+) -> bytes:
+    """
+    Encodes the results of a batch as one response line.
+
+    "BITMAP <n> <hex>": bit i (LSB first within each byte) of the hex
+    encoded bitmap is set when query i exists.
+    "HITS <k> <i>,<j>,...": the indices of the k queries that exist.
+
+    Args:
+        found (list[bool]): Whether each query exists, in request order.
+        reply (bytes, optional): BATCH_BITMAP or BATCH_HITS.
+                                 Defaults to BATCH_BITMAP.
+
+    Returns:
+        bytes: The encoded response line.
+    """
+    if reply == BATCH_HITS:
+        hits = [str(i).encode() for i, hit in enumerate(found) if hit]
+        return b"HITS %d %s\n" % (len(hits), b",".join(hits))
+
+    bitmap = bytearray((len(found) + 7) // 8)
+    for i, hit in enumerate(found):
+        if hit:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return b"BITMAP %d %s\n" % (len(found), bitmap.hex().encode())
+
+
+class QuerySession:
+    """ Per-connection state of the line protocol
+
+    Plain lines are answered one by one. A "BATCH <n> [BITMAP|HITS]" line
+    collects the next n lines, which may span several reads, and answers
+    them with a single line from one pass over the index. PREFIX_EXISTS,
+    PREFIX_COUNT and PREFIX_LIST lines are answered from the index's
+    prefix support.
+
+    Attributes:
+        index_manager (ManagedIndex): Owns the index to search
+        reread (bool): Whether REREAD_ON_QUERY is enabled
+        max_batch (int): The largest batch accepted
+        max_list (int): The most lines one PREFIX_LIST returns
+    """
+    def __init__(self, index_manager: ManagedIndex, reread: bool = False,
+                 max_batch: int = 100_000, max_list: int = 1000) -> None:
+        """ Initializes a session with no batch in progress """
+        self.index_manager = index_manager
+        self.reread = reread
+        self.max_batch = max_batch
+        self.max_list = max_list
+        self._batch: list[bytes] = []
+        self._batch_size = 0
+        self._batch_reply = BATCH_BITMAP
+
+    def _start_batch(self, command: bytes) -> bytes:
+        """ Parses a BATCH command, returning an error response if bad """
+        parts = command.split()
+        reply = parts[2] if len(parts) == 3 else BATCH_BITMAP
+
+        if len(parts) not in (2, 3) or not parts[1].isdigit() \
+                or reply not in (BATCH_BITMAP, BATCH_HITS):
+            return BAD_BATCH
+
+        size = int(parts[1])
+        if size > self.max_batch:
+            return BAD_BATCH
+
+        self._batch_size = size
+        self._batch_reply = reply
+        return b"" if size else encode_batch_result([], reply)
+
+    def _finish_batch(self) -> bytes:
+        """ Answers the collected batch and resets the batch state """
+        if self.reread:
+            self.index_manager.check_for_changes()
+
+        start = time.perf_counter()
+        found = self.index_manager.search_many(self._batch)
+        METRICS.observe("batch_search", time.perf_counter() - start)
+        METRICS.count_results(found)
+
+        self._batch = []
+        self._batch_size = 0
+        return encode_batch_result(found, self._batch_reply)
+
+    def _prefix_query(self, line: bytes) -> bytes:
+        """ Answers a PREFIX_EXISTS or PREFIX_COUNT line """
+        command, _, prefix = line.partition(b" ")
+        if self.reread:
+            self.index_manager.check_for_changes()
+
+        start = time.perf_counter()
+        try:
+            count = self.index_manager.prefix_count(prefix)
+        except NotImplementedError:
+            return PREFIX_UNSUPPORTED
+        METRICS.observe("prefix_search", time.perf_counter() - start)
+        METRICS.count_results((count > 0,))
+
+        if command == PREFIX_COUNT:
+            return b"COUNT %d\n" % count
+        return EXISTS if count else NOT_EXISTS
+
+    def _prefix_list(self, line: bytes) -> Iterator[bytes]:
+        """ Answers a PREFIX_LIST line, yielding the listing in chunks """
+        parts = line.split(b" ", 2)
+        if len(parts) != 3 or not parts[1].isdigit():
+            yield BAD_PREFIX
+            return
+        if self.reread:
+            self.index_manager.check_for_changes()
+
+        start = time.perf_counter()
+        try:
+            count, found = self.index_manager.prefix_lines(
+                parts[2], min(int(parts[1]), self.max_list)
+            )
+        except NotImplementedError:
+            yield PREFIX_UNSUPPORTED
+            return
+        METRICS.observe("prefix_search", time.perf_counter() - start)
+        METRICS.count_results((count > 0,))
+
+        chunk = [b"LIST %d\n" % count]
+        size = 0
+        for match in found:
+            chunk.append(match + b"\n")
+            size += len(match) + 1
+            if size >= STREAM_CHUNK:
+                yield b"".join(chunk)
+                chunk = []
+                size = 0
+        yield b"".join(chunk)
+
+    def _answer(self, line: bytes) -> Iterator[bytes]:
+        """ Yields the response to one line, if it completes a request """
+        if self._batch_size:
+            self._batch.append(line)
+            if len(self._batch) == self._batch_size:
+                yield self._finish_batch()
+            return
+
+        command = line.partition(b" ")[0]
+        if command in (BATCH_COMMAND, PREFIX_EXISTS, PREFIX_COUNT,
+                       PREFIX_LIST) and b" " in line:
+            if sample():
+                logger.info(
+                    f"Command received: {line.decode('utf-8', 'replace')}"
+                )
+            if command == BATCH_COMMAND:
+                yield self._start_batch(line)
+            elif command == PREFIX_LIST:
+                yield from self._prefix_list(line)
+            else:
+                yield self._prefix_query(line)
+            return
+
+        if sample():
+            logger.info(f"Data received: {line.decode('utf-8', 'replace')}")
+        yield process_query(self.index_manager, line, self.reread)
+
+    def handle_stream(self, lines: Iterable[bytes]) -> Iterator[bytes]:
+        """Answers framed lines, keeping their order, as chunks of about
+        STREAM_CHUNK bytes to send as they are produced.
+
+        Short responses are coalesced into one chunk; a long PREFIX_LIST
+        is produced lazily, so the listing is never held whole in memory.
+
+        Args:
+            lines (Iterable[bytes]): Complete lines, without newlines.
+        Yields:
+            bytes: The next non-empty piece of the responses.
+        """
+        pending: list[bytes] = []
+        size = 0
+
+        for line in lines:
+            for response in self._answer(line):
+                pending.append(response)
+                size += len(response)
+                if size >= STREAM_CHUNK:
+                    yield b"".join(pending)
+                    pending = []
+                    size = 0
+
+        if size:
+            yield b"".join(pending)
+
+    def handle(self, lines: list[bytes]) -> bytes:
+        """Answers framed lines, keeping their order.
+
+        Args:
+            lines (list[bytes]): Complete lines, without newlines.
+        Returns:
+            bytes: The responses to send back, possibly empty while a
+                   batch is still being received.
+        """
+        return b"".join(self.handle_stream(lines))
+
+
+class FrameTooLongError(ValueError):
+    """ Raised when a client sends more than the allowed bytes without a
+    newline
+
+    Attributes:
+        queries (list[bytes]): Complete queries received before the
+                               oversized one, still to be answered
+    """
+    def __init__(self, message: str, queries: list[bytes]) -> None:
+        """ Initializes the error with the queries preceding it """
+        super().__init__(message)
+        self.queries = queries
+
+
+class LineFramer:
+    """ Splits a byte stream into newline-delimited queries
+
+    TCP does not preserve message boundaries, so a query may arrive split
+    across several reads and one read may carry several queries. Bytes
+    after the last newline are kept until the rest of the line arrives.
+
+    Reads land in one fixed buffer, either directly with ``recv_into`` or
+    copied in by ``feed``, so receiving allocates nothing; the only
+    allocation per query is the query itself.
+
+    Attributes:
+        max_line (int): The longest query accepted, in bytes
+    """
+    def __init__(self, max_line: int = 1024,
+                 buffer: bytearray | None = None) -> None:
+        """Initializes the framer with an empty buffer.
+
+        Args:
+            max_line (int, optional): The longest query accepted.
+                                      Defaults to 1024.
+            buffer (bytearray | None, optional): The buffer to receive
+                                      into, at least twice ``max_line``
+                                      bytes, e.g. worker_buffer().
+                                      Defaults to a new one.
+        Raises:
+            ValueError: If ``buffer`` is too small.
+        """
+        if buffer is None:
+            buffer = bytearray(2 * max_line)
+        elif len(buffer) < 2 * max_line:
+            raise ValueError(f"The buffer needs {2 * max_line} bytes")
+        self.max_line = max_line
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._fill = 0
+
+    @property
+    def partial(self) -> bool:
+        """ Whether part of a query has arrived without its newline """
+        return self._fill > 0
+
+    def recv_into(self, sock: socket.socket) -> int:
+        """Receives into the free end of the buffer.
+
+        A partial line never exceeds ``max_line`` bytes, so there is
+        always room for at least that much.
+
+        Args:
+            sock (socket.socket): The connection to read from.
+        Returns:
+            int: The bytes received, 0 once the peer has closed.
+        """
+        received = sock.recv_into(self._view[self._fill:])
+        self._fill += received
+        return received
+
+    def frames(self) -> list[bytes]:
+        """Returns the queries completed by the bytes received so far.
+
+        Returns:
+            list[bytes]: Complete queries, in order, without the newline
+                         or a trailing carriage return.
+        Raises:
+            FrameTooLongError: If a query exceeds ``max_line`` bytes.
+        """
+        buffer, view, fill = self._buffer, self._view, self._fill
+        queries: list[bytes] = []
+        start = buffer.rfind(b"\n", 0, fill) + 1
+        if start:
+            # One copy of the complete lines, split in C
+            block = view[:start - 1].tobytes()
+            queries = block.split(b"\n")
+            if max(map(len, queries)) > self.max_line:
+                size = next(i for i, query in enumerate(queries)
+                            if len(query) > self.max_line)
+                raise FrameTooLongError(
+                    f"query exceeds {self.max_line} bytes",
+                    self._strip(queries[:size], block)
+                )
+            queries = self._strip(queries, block)
+
+        # The partial line was only checked for length
+        rest = fill - start
+        if rest > self.max_line:
+            raise FrameTooLongError(
+                f"query exceeds {self.max_line} bytes", queries
+            )
+        if start and rest:
+            # Copied out first: the source and target ranges may overlap
+            buffer[:rest] = view[start:fill].tobytes()
+        self._fill = rest
+        return queries
+
+    @staticmethod
+    def _strip(queries: list[bytes], block: bytes) -> list[bytes]:
+        """ Drops the carriage return ending any of the queries """
+        if b"\r" not in block:
+            return queries
+        return [query[:-1] if query.endswith(b"\r") else query
+                for query in queries]
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Adds bytes received elsewhere and returns the queries they
+        complete.
+
+        Args:
+            data (bytes): The bytes just received.
+        Returns:
+            list[bytes]: Complete queries, in order, without the newline
+                         or a trailing carriage return.
+        Raises:
+            FrameTooLongError: If a query exceeds ``max_line`` bytes.
+        """
+        queries: list[bytes] = []
+        data = memoryview(data)
+        while data:
+            size = min(len(data), len(self._buffer) - self._fill)
+            self._view[self._fill:self._fill + size] = data[:size]
+            self._fill += size
+            data = data[size:]
+            try:
+                queries += self.frames()
+            except FrameTooLongError as e:
+                raise FrameTooLongError(str(e), queries + e.queries) from None
+        return queries
+
+
+_worker = threading.local()
+
+
+def worker_buffer(size: int) -> bytearray:
+    """Returns the calling thread's receive buffer, allocated on first use
+    and reused by every connection the thread serves afterwards.
+
+    Args:
+        size (int): The smallest buffer needed, in bytes.
+    Returns:
+        bytearray: A buffer of at least ``size`` bytes.
+    """
+    buffer = getattr(_worker, "buffer", None)
+    if buffer is None or len(buffer) < size:
+        buffer = _worker.buffer = bytearray(size)
+    return buffer
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+""" Bounded LRU cache of query results """
+
+
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+
+class QueryCache:
+    """ Least-recently-used cache of query -> found results
+
+    Keys include the index generation, so publishing a new generation
+    invalidates every cached result without touching the cache; stale
+    entries simply age out.
+
+    Attributes:
+        max_size (int): The most entries kept
+        hits (int): Lookups answered from the cache
+        misses (int): Lookups that had to go to the index
+    """
+    def __init__(self, max_size: int) -> None:
+        """ Initializes an empty cache holding at most max_size entries """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, bool] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> bool | None:
+        """Returns the cached result for ``key`` and marks it recently
+        used.
+
+        Args:
+            key (Hashable): The (query, generation) key.
+        Returns:
+            bool | None: The cached result, or None on a miss.
+        """
+        with self._lock:
+            found = self._entries.get(key)
+            if found is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return found
+
+    def put(self, key: Hashable, found: bool) -> None:
+        """Caches a result, evicting the least recently used entry when
+        full.
+
+        Args:
+            key (Hashable): The (query, generation) key.
+            found (bool): The result to cache.
+        """
+        with self._lock:
+            self._entries[key] = found
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        """ Returns the size, hit and miss counts of the cache """
+        return {"size": len(self._entries), "hits": self.hits,
+                "misses": self.misses}
+
+    def __len__(self) -> int:
+        """ Returns the number of cached entries """
+        return len(self._entries)
@@ -1,40 +1,186 @@
 #!/usr/bin/env python3
 """ Server """
 
+import os
+import signal
 import socket
-import time
 import ssl
+import threading
+import time
 import concurrent.futures
-from typing import Tuple, Union
-from utils import parse_config_file
-from algorithms.mmap_search import mmap_search
-from algorithms.radix_search import radix_search
-from logger.logger import logger
+from functools import partial
+from typing import Any, Callable, Tuple, Union
+from utils import parse_config_file, is_enabled
+from algorithms.bloom_filter import load_bloom_filter, with_bloom_filter
+from algorithms.engines import DEFAULT_ENGINE, get_engine, load_engine
+from admission import BUSY, AdmissionControl
+from prefork import Supervisor
+from async_server import start_async_server
+from index_manager import MAX_SEGMENTS, IndexManager, ManagedIndex
+from query_cache import QueryCache
+from sharded_index import FAN_OUT, ShardedIndexManager, expand_corpus
+from logger.logger import logger, queue_handler, sample, set_sample_rate
+from metrics import METRICS, start_metrics_server
+from profiler import Profiler
+from protocol import (
+    LINE_DELIMITED,
+    LINE_TOO_LONG,
+    SINGLE_QUERY,
+    FrameTooLongError,
+    LineFramer,
+    QuerySession,
+    process_query,
+    worker_buffer,
+)
+from tls import create_server_ssl_context, server_handshake
+from unix_socket import open_unix_listener
 
 # Type alias for address (host: str, port: int)
 addr_type = Tuple[str, int]
 config_type = dict[str, Union[str, int]] | None
 path_type = str | int | None
 
-EXISTS: bytes = b"STRING EXISTS\n"
-NOT_EXISTS: bytes = b"STRING NOT FOUND\n"
-
 server_configurations: config_type = parse_config_file("./config/config.txt")
 
+if server_configurations:
+    # Log only this fraction of queries; errors are always logged
+    set_sample_rate(float(server_configurations.get("LOG_SAMPLE_RATE", 1)))
+METRICS.add_collector(lambda: {"log_records_dropped": queue_handler.dropped})
+
+
+def serve_line_queries(
+    client_socket: socket.socket,
+    index_manager: ManagedIndex,
+    payload_size: int = 1024,
+    reread: bool = False,
+    max_batch: int = 100_000,
+    max_list: int = 1000,
+    read_timeout: float | None = None,
+    idle_timeout: float | None = None,
+) -> None:
+    """
+    Answers newline-delimited queries on one connection until the client
+    closes it or a timeout expires. Queries may be pipelined or grouped
+    with the BATCH command; the responses to every query completed by one
+    read are sent in order, coalesced into chunks so a long PREFIX_LIST
+    is streamed.
+
+    Args:
+        client_socket (socket.socket): The client connection.
+        index_manager (ManagedIndex): Owns the shared index.
+        payload_size (int, optional): The longest query accepted; reads
+                                      go into this thread's buffer of
+                                      twice that. Defaults to 1024.
+        reread (bool, optional): Whether REREAD_ON_QUERY is enabled.
+                                 Defaults to False.
+        max_batch (int, optional): The largest BATCH accepted.
+                                   Defaults to 100000.
+        max_list (int, optional): The most lines one PREFIX_LIST returns.
+                                  Defaults to 1000.
+        read_timeout (float | None, optional): Seconds allowed for the
+                                  rest of a started query, and for each
+                                  send. Defaults to None (no limit).
+        idle_timeout (float | None, optional): Seconds allowed between
+                                  queries. Defaults to None (no limit).
+
+    Returns:
+        None
+    """
+    framer = LineFramer(payload_size, worker_buffer(2 * payload_size))
+    session = QuerySession(index_manager, reread, max_batch, max_list)
+
+    # settimeout costs a syscall, so it is only called on a change
+    timeout = client_socket.gettimeout()
+
+    while True:
+        pending = framer.partial
+        if timeout != (read_timeout if pending else idle_timeout):
+            timeout = read_timeout if pending else idle_timeout
+            client_socket.settimeout(timeout)
+        start = time.perf_counter()
+        try:
+            received = framer.recv_into(client_socket)
+        except TimeoutError:
+            METRICS.inc("read_timeouts" if pending else "idle_timeouts")
+            logger.debug(f"Closing connection, {'read' if pending else 'idle'}"
+                         f" timeout expired")
+            return
+        METRICS.observe("recv", time.perf_counter() - start)
+        if timeout != read_timeout:  # Sends are bounded by read_timeout
+            timeout = read_timeout
+            client_socket.settimeout(timeout)
+        if not received:
+            return
+
+        try:
+            queries = framer.frames()
+        except FrameTooLongError as e:
+            logger.error(f"Error: {e}")
+            responses = session.handle(e.queries)
+            client_socket.sendall(responses + LINE_TOO_LONG)
+            return
+
+        for chunk in session.handle_stream(queries):
+            start = time.perf_counter()
+            client_socket.sendall(chunk)
+            METRICS.observe("send", time.perf_counter() - start)
+
+
+def reject_busy(client_socket: socket.socket, tls: bool) -> None:
+    """
+    Refuses a connection from the accept loop without blocking it. A plain
+    client is sent BUSY; a TLS client is only closed, since replying would
+    need a handshake on the accept loop.
+
+    Args:
+        client_socket (socket.socket): The accepted connection.
+        tls (bool): Whether the listener expects TLS.
+
+    Returns:
+        None
+    """
+    try:
+        if not tls:
+            client_socket.setblocking(False)
+            client_socket.send(BUSY)
+    except OSError:
+        pass  # The refusal is best effort
+    finally:
+        client_socket.close()
+
 
 def handle_client(
-    client_socket: socket.socket, address: addr_type, payload_size: int = 1024
+    client_socket: socket.socket,
+    address: addr_type | str,
+    payload_size: int = 1024,
+    index_manager: ManagedIndex | None = None,
+    ssl_context: ssl.SSLContext | None = None,
+    accepted_at: float | None = None,
 ) -> None:
     """
     Handles the client connection, receives data, processes it, and sends a
-    response.
+    response. With "PROTOCOL=line" the connection stays open for many
+    newline-delimited queries instead of exactly one.
 
     Args:
         client_socket (socket.socket): The socket object for the client
                                        connection.
-        address (addr_type): The address of the connected client.
+        address (addr_type | str): The address of the connected client,
+                                       or the socket path for a Unix
+                                       domain socket client.
         payload_size (int, optional): The size of the payload to receive.
                                        Defaults to 1024.
+        index_manager (ManagedIndex | None, optional): Owns the index
+                                       built at startup and shared by all
+                                       threads. Defaults to None.
+        ssl_context (ssl.SSLContext | None, optional): When set, the TLS
+                                       handshake is done here, bounded by
+                                       "HANDSHAKE_TIMEOUT" seconds.
+                                       Defaults to None.
+        accepted_at (float | None, optional): time.perf_counter() when
+                                       the connection was accepted, to
+                                       time its wait for a worker thread.
+                                       Defaults to None.
 
     Returns:
         None
@@ -43,9 +189,14 @@ def handle_client(
         BrokenPipeError: If there is an error sending data to the client.
         Exception: For any other exceptions that occur during processing.
     """
-    logger.info(f"Connection established with: {address}")
+    sampled = sample()
+    if sampled:
+        logger.info(f"Connection established with: {address}")
     start_time = time.time()
-    
+    METRICS.inc("connections")
+    if accepted_at is not None:
+        METRICS.observe("accept", time.perf_counter() - accepted_at)
+
     try:
         
         # Check if server configurations are missing
@@ -53,52 +204,286 @@ def handle_client(
             logger.debug("Server configurations missing")
             return None
 
-        # Receive the data from the client
-        data: bytes = client_socket.recv(payload_size)
-
-        # If no data is received, print a message and return
-        if not data:
-            logger.debug("No data received!")
+        if index_manager is None:
+            logger.error("Search index has not been built.")
             return
 
-        logger.info(f"Data received: {data.decode('utf-8')}")
+        # Handshake on this worker thread so a slow client cannot stall the
+        # accept loop
+        if ssl_context is not None:
+            start = time.perf_counter()
+            client_socket = server_handshake(
+                client_socket,
+                ssl_context,
+                float(server_configurations.get("HANDSHAKE_TIMEOUT", 5)),
+            )
+            METRICS.observe("handshake", time.perf_counter() - start)
+
+        reread = is_enabled(server_configurations.get("REREAD_ON_QUERY"))
+        read_timeout = float(
+            server_configurations.get("READ_TIMEOUT", 0)
+        ) or None
+
+        # Keep the connection open for many newline-delimited queries
+        protocol_mode = server_configurations.get("PROTOCOL", SINGLE_QUERY)
+        if protocol_mode == LINE_DELIMITED:
+            max_batch = int(server_configurations.get("MAX_BATCH", 100_000))
+            max_list = int(server_configurations.get("MAX_PREFIX_LIST", 1000))
+            idle_timeout = float(
+                server_configurations.get("IDLE_TIMEOUT", 0)
+            ) or None
+            serve_line_queries(
+                client_socket, index_manager, payload_size, reread, max_batch,
+                max_list, read_timeout, idle_timeout,
+            )
+            return
 
-        # Get the file path from server configurations
-        file_path: path_type = server_configurations.get("linuxpath")
+        # Receive the data from the client, which must come promptly, into
+        # this thread's buffer; one byte more than allowed tells an
+        # oversized query from one that fills the payload exactly
+        client_socket.settimeout(read_timeout)
+        buffer = worker_buffer(payload_size + 1)
+        start = time.perf_counter()
+        try:
+            received = client_socket.recv_into(buffer, payload_size + 1)
+        except TimeoutError:
+            METRICS.inc("read_timeouts")
+            logger.debug(f"No query from {address} in {read_timeout}s")
+            return
+        METRICS.observe("recv", time.perf_counter() - start)
 
-        if not file_path:
-            logger.error("linuxpath' not found in server configurations.")
+        # If no data is received, print a message and return
+        if not received:
+            logger.debug("No data received!")
             return
 
-        # Check if the file path is a string
-        if not isinstance(file_path, str):
-            logger.critical("Error: 'linuxpath' must be a string.")
+        if received > payload_size:
+            logger.error(f"Error: query from {address} exceeds "
+                         f"{payload_size} bytes")
+            client_socket.sendall(LINE_TOO_LONG)
             return
-        
-        # Perform the search
-        isLineFound: bool = False
-        
-        if server_configurations.get('REAREAD_ON_QUERY'):
-            isLineFound = mmap_search(file_path, data)
-        else:
-            isLineFound = radix_search(file_path, data)
 
-        # Prepare the response based on the search result
-        response: bytes = EXISTS if isLineFound else NOT_EXISTS
+        data = memoryview(buffer)[:received].tobytes()
+        if sampled:
+            logger.info(f"Data received: {data.decode('utf-8', 'replace')}")
+
+        # Perform the search and prepare the response
+        response: bytes = process_query(index_manager, data, reread)
 
         # Send the response to the client
+        start = time.perf_counter()
         client_socket.sendall(response)
+        METRICS.observe("send", time.perf_counter() - start)
     except BrokenPipeError:
+        METRICS.inc("errors")
         logger.error(f"Error: Broken pipe when sending data to {address}")
+    except TimeoutError:
+        METRICS.inc("errors")
+        logger.error(f"Error: connection with {address} timed out")
     except Exception as e:
+        METRICS.inc("errors")
         logger.error(f"Error at handle client: {e}")
     finally:
         execution_time = time.time() - start_time
         client_socket.close()
-        logger.info(f"Connection with {address} closed, Execution Time: {execution_time:.4f} seconds")
+        if sampled:
+            logger.info(f"Connection with {address} closed, "
+                        f"Execution Time: {execution_time:.4f} seconds")
 
 
-def start_server_with_threading() -> None:
+def make_index_builder(configurations: dict) -> Callable[[str], Any]:
+    """
+    Returns the function building the search index over a file: the
+    engine named by "ALGORITHM" (default "line_index"), fronted by a Bloom
+    filter when "BLOOM_FP_RATE" is set to a false-positive rate above 0.
+
+    Args:
+        configurations (dict): The parsed server configurations.
+
+    Returns:
+        Callable[[str], Any]: Builds an index from a file path.
+
+    Raises:
+        KeyError: If "ALGORITHM" names no known engine.
+    """
+    name = str(configurations.get("ALGORITHM", DEFAULT_ENGINE))
+    engine = get_engine(name)  # Fail at startup on an unknown engine
+
+    builder: Callable[[str], Any] = partial(load_engine, name)
+
+    fp_rate = float(configurations.get("BLOOM_FP_RATE", 0))
+    if fp_rate > 0:
+        # The filter must hold the lines exactly as the engine matches them
+        builder = with_bloom_filter(builder, fp_rate, engine.strip_lines)
+
+    return builder
+
+
+def append_options(configurations: dict) -> dict:
+    """
+    Returns the IndexManager options for files that only grow: with
+    "APPEND_ONLY" enabled, appended lines are indexed on their own, up to
+    "MAX_SEGMENTS" times between full rebuilds.
+
+    Args:
+        configurations (dict): The parsed server configurations.
+
+    Returns:
+        dict: The append_only and max_segments keyword arguments.
+    """
+    return {
+        "append_only": is_enabled(configurations.get("APPEND_ONLY")),
+        "max_segments": int(configurations.get("MAX_SEGMENTS", MAX_SEGMENTS)),
+    }
+
+
+def build_sharded_index_manager(
+    configurations: dict, cache: QueryCache | None
+) -> ShardedIndexManager | None:
+    """
+    Creates the manager of the files listed by "CORPUS" (comma-separated
+    files and globs), one shard per file, searched on "SHARD_WORKERS"
+    threads (default: one per shard, at most one per CPU). "SHARDING" is
+    "fanout" (default) or "hash" for files written by the partition tool.
+
+    Args:
+        configurations (dict): The parsed server configurations.
+        cache (QueryCache | None): The query result cache, if any.
+
+    Returns:
+        ShardedIndexManager | None: The manager, or None if the corpus is
+                                    unusable.
+    """
+    try:
+        file_paths = expand_corpus(str(configurations.get("CORPUS")))
+        workers = int(configurations.get(
+            "SHARD_WORKERS", min(len(file_paths), os.cpu_count() or 1)
+        ))
+        return ShardedIndexManager(
+            file_paths,
+            make_index_builder(configurations),
+            cache,
+            str(configurations.get("SHARDING", FAN_OUT)).lower(),
+            workers,
+            **append_options(configurations),
+        )
+    except (OSError, ValueError) as e:
+        logger.critical(f"Error: unusable CORPUS: {e}")
+        return None
+
+
+def build_index_manager(
+    configurations: config_type,
+) -> ManagedIndex | None:
+    """
+    Builds the search index over "linuxpath" and, with "REREAD_ON_QUERY"
+    enabled, starts watching the file for changes. A positive
+    "CACHE_SIZE" adds an LRU cache of that many query results. When
+    "CORPUS" is set it replaces "linuxpath" with several files, each
+    indexed here and reloaded on its own.
+
+    Args:
+        configurations (config_type): The parsed server configurations.
+
+    Returns:
+        ManagedIndex | None: The IndexManager or ShardedIndexManager
+                             owning the built index, or None if the
+                             configurations are unusable.
+    """
+    if not configurations:
+        logger.debug("Server configurations missing")
+        return None
+
+    file_path: path_type = configurations.get("linuxpath")
+
+    if not file_path and not configurations.get("CORPUS"):
+        logger.error("linuxpath' not found in server configurations.")
+        return None
+
+    # Check if the file path is a string
+    if file_path and not isinstance(file_path, str):
+        logger.critical("Error: 'linuxpath' must be a string.")
+        return None
+
+    # Results of repeated queries are cached per index generation
+    cache_size = int(configurations.get("CACHE_SIZE", 0))
+    cache = QueryCache(cache_size) if cache_size > 0 else None
+    if cache is not None:
+        METRICS.add_collector(lambda: {"cache_hits": cache.hits,
+                                       "cache_misses": cache.misses})
+
+    index_manager: IndexManager | ShardedIndexManager | None
+    if configurations.get("CORPUS"):
+        index_manager = build_sharded_index_manager(configurations, cache)
+        if index_manager is None:
+            return None
+    else:
+        # Build the search index once; every worker shares it read-only
+        index_manager = IndexManager(
+            str(file_path), make_index_builder(configurations), cache,
+            **append_options(configurations),
+        )
+    index_manager.build()
+
+    if is_enabled(configurations.get("REREAD_ON_QUERY")):
+        reload_interval = float(configurations.get("RELOAD_INTERVAL", 1))
+        if reload_interval > 0:
+            index_manager.start_watcher(reload_interval)
+
+    return index_manager
+
+
+def accept_connections(
+    server_socket: socket.socket,
+    executor: concurrent.futures.Executor,
+    admission: AdmissionControl,
+    payload_size: int,
+    index_manager: ManagedIndex,
+    ssl_context: ssl.SSLContext | None = None,
+) -> None:
+    """
+    Accepts connections on one listener and hands each admitted one to
+    the thread pool, until accepting fails.
+
+    Args:
+        server_socket (socket.socket): The listening socket, TCP or Unix.
+        executor (concurrent.futures.Executor): Runs handle_client.
+        admission (AdmissionControl): Shared by every listener.
+        payload_size (int): The longest query accepted.
+        index_manager (ManagedIndex): Owns the shared index.
+        ssl_context (ssl.SSLContext | None, optional): TLS context for
+                                       this listener's connections.
+                                       Defaults to None (plaintext).
+
+    Returns:
+        None
+    """
+    while True:
+        client_socket: socket.socket
+        client_address: addr_type | str
+
+        # Accept a new client connection; Unix clients have no address,
+        # so they are logged by the socket path
+        client_socket, client_address = server_socket.accept()
+        if not admission.try_admit():
+            reject_busy(client_socket, ssl_context is not None)
+            continue
+        executor.submit(
+            admission.serve,
+            handle_client,
+            client_socket,
+            client_address or server_socket.getsockname(),
+            payload_size,
+            index_manager,
+            ssl_context,
+            time.perf_counter(),
+        )
+
+
+def start_server_with_threading(
+    index_manager: ManagedIndex | None = None, reuse_port: bool = False,
+    unix_listener: socket.socket | None = None,
+) -> None:
     """
     Starts a TCP server using threading to handle multiple client connections
     concurrently.
@@ -107,12 +492,29 @@ def start_server_with_threading() -> None:
     The server listens for incoming connections and uses a thread pool to
     handle each client connection.
 
+    Args:
+        index_manager (ManagedIndex | None, optional): An already built
+            index to serve. Built from the configurations when None.
+            Defaults to None.
+        reuse_port (bool, optional): Listen with SO_REUSEPORT so several
+            worker processes can share the port. Defaults to False.
+        unix_listener (socket.socket | None, optional): A listening Unix
+            domain socket served alongside the TCP one, in plaintext,
+            by the same thread pool. Defaults to None.
+
     Raises:
         Exception: If there is an error starting the server.
 
     Notes:
         - The server configurations should include "HOST", "PORT",
-        and "PAYLOAD_SIZE".
+        "PAYLOAD_SIZE" and "linuxpath".
+        - The search index over "linuxpath" is built once here, before
+        accepting connections, and shared read-only by every thread. It is
+        loaded from the "linuxpath.idx" sidecar file when that is still
+        valid, so restarts do not re-parse the file.
+        - With "REREAD_ON_QUERY" enabled the index is rebuilt in the
+        background whenever the file changes, checked on every query and
+        every "RELOAD_INTERVAL" seconds.
         - The function will print messages to the console to indicate
         the server status and any errors.
 
@@ -124,7 +526,12 @@ def start_server_with_threading() -> None:
             logger.debug("Server configurations missing")
             return
 
-        PAYLOAD_SIZE = server_configurations.get("PAYLOAD_SIZE")
+        PAYLOAD_SIZE = int(server_configurations.get("PAYLOAD_SIZE", 1024))
+
+        if index_manager is None:
+            index_manager = build_index_manager(server_configurations)
+        if index_manager is None:
+            return
 
         # Extract server address and payload size from configurations
         server_address = (
@@ -137,31 +544,273 @@ def start_server_with_threading() -> None:
             socket.AF_INET, socket.SOCK_STREAM
         )
 
+        if reuse_port:
+            server_socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_REUSEPORT, 1
+            )
+
         # Bind the socket to the server address
         server_socket.bind(server_address)
         server_socket.listen()
 
         logger.info("Listening for connections...")
-        
-        # Wrap the socket with SSL
-        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-        context.load_cert_chain(certfile='./server.crt', keyfile='./server.key')
-        server_socket = context.wrap_socket(server_socket, server_side=True)
+
+        # TLS handshakes happen per connection in handle_client
+        context = create_server_ssl_context(server_configurations)
+
+        # At most MAX_CONNECTIONS served and MAX_QUEUE waiting; beyond
+        # that connections are refused rather than queued without bound
+        max_connections = int(server_configurations.get(
+            "MAX_CONNECTIONS", min(32, (os.cpu_count() or 1) + 4)
+        ))
+        admission = AdmissionControl(
+            max_connections, int(server_configurations.get("MAX_QUEUE", 128))
+        )
+        METRICS.add_collector(admission.gauges)
 
         # Use a thread pool to handle client connections
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            while True:
-                logger.info("Waiting for a client to connect...")
-                client_socket: socket.socket
-                client_address: addr_type
+        with concurrent.futures.ThreadPoolExecutor(max_connections) \
+                as executor:
+            if unix_listener is not None:
+                threading.Thread(
+                    target=accept_connections,
+                    args=(unix_listener, executor, admission, PAYLOAD_SIZE,
+                          index_manager),
+                    name="unix-accept",
+                    daemon=True,
+                ).start()
+            accept_connections(server_socket, executor, admission,
+                               PAYLOAD_SIZE, index_manager, context)
+
+    except Exception as e:
+        logger.error(f"Could not start server: {e}")
+
+
+def setup_profiler(configurations: dict) -> Profiler:
+    """
+    Creates this process's profiler and makes SIGUSR1 start a profile of
+    "PROFILE_SECONDS" seconds (default 10). Profiles sample every
+    "PROFILE_INTERVAL" seconds (default 0.005), are written to
+    "PROFILE_DIR" (default ./profiles) and trace the connection phases
+    unless "PROFILE_TRACE" is False. Must run on the main thread.
+
+    Args:
+        configurations (dict): The parsed server configurations.
+
+    Returns:
+        Profiler: The profiler, also served by the metrics port.
+    """
+    profiler = Profiler(
+        str(configurations.get("PROFILE_DIR", "./profiles")),
+        float(configurations.get("PROFILE_INTERVAL", 0.005)),
+        is_enabled(configurations.get("PROFILE_TRACE", "True")),
+    )
+    seconds = float(configurations.get("PROFILE_SECONDS", 10))
+    signal.signal(signal.SIGUSR1,
+                  lambda signum, frame: profiler.start(seconds))
+    return profiler
+
+
+def serve_metrics(configurations: dict, offset: int = 0,
+                  profiler: Profiler | None = None) -> None:
+    """
+    Serves the Prometheus metrics of this process on "METRICS_HOST"
+    (default 127.0.0.1) and port "METRICS_PORT" + offset, when
+    "METRICS_PORT" is set above 0, with /profile running ``profiler``.
+
+    Args:
+        configurations (dict): The parsed server configurations.
+        offset (int, optional): Added to the port, so each pre-fork worker
+                                gets its own. Defaults to 0.
+        profiler (Profiler | None, optional): Run on GET /profile.
+                                Defaults to None.
+
+    Returns:
+        None
+    """
+    port = int(configurations.get("METRICS_PORT", 0))
+    if port <= 0:
+        return
+
+    host = str(configurations.get("METRICS_HOST", "127.0.0.1"))
+    try:
+        start_metrics_server(host, port + offset, profiler)
+        logger.info(
+            f"Serving metrics on http://{host}:{port + offset}/metrics"
+        )
+    except OSError as e:
+        logger.error(f"Could not serve metrics on port {port + offset}: {e}")
+
+
+def reload_on_request(index_manager: ManagedIndex,
+                      requested: threading.Event) -> None:
+    """
+    Checks the file for changes each time ``requested`` is set, forever.
+    Runs on its own thread so that the SIGHUP handler only sets the event:
+    checking takes the index manager's lock, which the interrupted thread
+    may already hold.
+
+    Args:
+        index_manager (ManagedIndex): The index to check and rebuild.
+        requested (threading.Event): Set when a reload is requested.
+
+    Returns:
+        None
+    """
+    while True:
+        requested.wait()
+        requested.clear()
+        index_manager.check_for_changes()
+
+
+def run_worker(slot: int = 0,
+               unix_listener: socket.socket | None = None) -> None:
+    """
+    Runs one pre-fork worker: maps the on-disk index prepared by the
+    supervisor and serves the shared port with SO_REUSEPORT, using the
+    engine selected by "WORKER_MODE" ("threading" or "asyncio").
+    SIGHUP makes the worker check the file and reload its index, and
+    SIGUSR1 profiles it.
+
+    Args:
+        slot (int, optional): The worker's slot, its metrics are served on
+                              "METRICS_PORT" + slot. Defaults to 0.
+        unix_listener (socket.socket | None, optional): The Unix domain
+                              socket opened by the supervisor, which every
+                              worker accepts on too. Defaults to None.
+
+    Returns:
+        None
+    """
+    if not server_configurations:
+        logger.debug("Server configurations missing")
+        return
+
+    serve_metrics(server_configurations, slot,
+                  setup_profiler(server_configurations))
+
+    # A SIGHUP during the build is kept and handled once it is done
+    reload_requested = threading.Event()
+    signal.signal(signal.SIGHUP,
+                  lambda signum, frame: reload_requested.set())
+
+    index_manager = build_index_manager(server_configurations)
+    if index_manager is None:
+        return
+
+    threading.Thread(target=reload_on_request,
+                     args=(index_manager, reload_requested),
+                     name="reload", daemon=True).start()
+
+    mode = str(server_configurations.get("WORKER_MODE", "threading")).lower()
+
+    if mode == "asyncio":
+        start_async_server(
+            server_configurations,
+            index_manager,
+            create_server_ssl_context(server_configurations),
+            reuse_port=True,
+            unix_listener=unix_listener,
+        )
+    else:
+        start_server_with_threading(index_manager, reuse_port=True,
+                                    unix_listener=unix_listener)
+
+
+def refresh_index_file() -> None:
+    """
+    Validates the on-disk index (for engines that persist one) and Bloom
+    filter of "linuxpath", or of every "CORPUS" file, rebuilding them if
+    stale, so pre-fork workers all map the same up-to-date files.
+
+    Returns:
+        None
+    """
+    if not server_configurations:
+        return
+
+    if server_configurations.get("CORPUS"):
+        try:
+            file_paths = expand_corpus(str(server_configurations["CORPUS"]))
+        except OSError:
+            return  # Reported by the workers
+    else:
+        file_path: path_type = server_configurations.get("linuxpath")
+        if not isinstance(file_path, str):
+            return
+        file_paths = [file_path]
+
+    name = str(server_configurations.get("ALGORITHM", DEFAULT_ENGINE))
+    fp_rate = float(server_configurations.get("BLOOM_FP_RATE", 0))
+
+    engine = get_engine(name)
+
+    for file_path in file_paths:
+        if engine.persisted:
+            load_engine(name, file_path).close()
+        if fp_rate > 0:
+            load_bloom_filter(file_path, fp_rate, engine.strip_lines)
+
+
+def start_server() -> None:
+    """
+    Starts the server engine selected by "SERVER_MODE" in the
+    configurations: "threading" (default), "asyncio", or "prefork" to run
+    "WORKERS" processes (default: one per CPU) under a supervisor. With
+    "UNIX_SOCKET_PATH" set, every engine also serves a Unix domain socket.
+
+    Returns:
+        None
+    """
+    if not server_configurations:
+        logger.debug("Server configurations missing")
+        return
 
-                # Accept a new client connection
-                client_socket, client_address = server_socket.accept()
-                executor.submit(handle_client, client_socket, client_address, PAYLOAD_SIZE)
+    mode = str(server_configurations.get("SERVER_MODE", "threading")).lower()
 
+    if mode not in ("threading", "asyncio", "prefork"):
+        logger.critical(f"Error: unknown SERVER_MODE '{mode}'.")
+        return
+
+    if mode != "prefork":
+        serve_metrics(server_configurations,
+                      profiler=setup_profiler(server_configurations))
+
+    # Opened once here, so prefork workers all inherit the same socket
+    try:
+        unix_listener = open_unix_listener(server_configurations)
+    except OSError as e:
+        logger.critical(f"Error: could not listen on the unix socket: {e}")
+        return
+    if unix_listener is not None:
+        logger.info(f"Listening on unix socket {unix_listener.getsockname()}")
+
+    if mode == "threading":
+        start_server_with_threading(unix_listener=unix_listener)
+        return
+
+    try:
+        if mode == "prefork":
+            workers = int(
+                server_configurations.get("WORKERS", os.cpu_count() or 1)
+            )
+            Supervisor(partial(run_worker, unix_listener=unix_listener),
+                       workers, refresh_index_file).run()
+            return
+
+        index_manager = build_index_manager(server_configurations)
+        if index_manager is None:
+            return
+
+        start_async_server(
+            server_configurations,
+            index_manager,
+            create_server_ssl_context(server_configurations),
+            unix_listener=unix_listener,
+        )
     except Exception as e:
         logger.error(f"Could not start server: {e}")
 
 
 if __name__ == "__main__":
-    start_server_with_threading()
+    start_server()
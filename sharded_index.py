@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+""" Serves one logical corpus split across many files, one index per file
+
+Each file is a shard with its own IndexManager, so it is built, watched and
+rebuilt independently: a change to one file re-indexes only that file.
+Every shard is built by ``build`` at startup, never by a lookup, so a
+query never waits on a build (nor runs one on the asyncio event loop).
+
+By default every lookup fans out to all shards. With hash partitioning
+each line lives in shard ``crc32(line) % shards``, so a lookup touches only
+that shard; the files must then be produced by the partition tool:
+    python sharded_index.py --shards 8 --out ./data/shards big1.txt big2.txt
+"""
+
+
+import argparse
+import concurrent.futures
+import glob
+import heapq
+import itertools
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Iterator, Sequence, cast
+from index_manager import MAX_SEGMENTS, IndexManager
+from logger.logger import logger
+from query_cache import QueryCache
+
+# Values of the SHARDING configuration key
+FAN_OUT = "fanout"  # Lines may be anywhere: every shard is searched
+HASH = "hash"  # Lines were partitioned by shard_for: one shard is searched
+
+SHARD_NAME = "shard-{:03d}.txt"
+
+
+def expand_corpus(spec: str) -> list[str]:
+    """Expands a comma-separated list of files and globs.
+
+    Args:
+        spec (str): e.g. "./data/part-*.txt,./extra.txt".
+    Returns:
+        list[str]: The matching files, each glob sorted, without
+                   duplicates, in the order given.
+    Raises:
+        FileNotFoundError: If an entry matches no file.
+    """
+    files: list[str] = []
+    for pattern in filter(None, (part.strip() for part in spec.split(","))):
+        matches = sorted(path for path in glob.glob(pattern)
+                         if os.path.isfile(path))
+        if not matches:
+            raise FileNotFoundError(f"No corpus file matches '{pattern}'")
+        files += [path for path in matches if path not in files]
+    return files
+
+
+def shard_for(line: bytes, shards: int) -> int:
+    """Returns the shard a line belongs to under hash partitioning.
+
+    crc32 is stable across processes and runs, unlike ``hash()``.
+
+    Args:
+        line (bytes): The line, without its terminator.
+        shards (int): The number of shards.
+    Returns:
+        int: The shard number, from 0 to shards - 1.
+    """
+    return zlib.crc32(line) % shards
+
+
+def partition_corpus(sources: Sequence[str], out_dir: str,
+                     shards: int) -> list[str]:
+    """Rewrites files as ``shards`` files where each line is in the shard
+    shard_for picks, for SHARDING=hash.
+
+    Args:
+        sources (Sequence[str]): The files to partition.
+        out_dir (str): Where to write shard-000.txt, shard-001.txt, ...
+        shards (int): The number of shards.
+    Returns:
+        list[str]: The shard files, in shard order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.join(out_dir, SHARD_NAME.format(i))
+             for i in range(shards)]
+    outputs = [open(path, "wb") for path in paths]
+    try:
+        for source in sources:
+            with open(source, "rb") as file:
+                for line in file:
+                    line = line.rstrip(b"\n")
+                    if line.endswith(b"\r"):
+                        line = line[:-1]
+                    outputs[shard_for(line, shards)].write(line + b"\n")
+    finally:
+        for output in outputs:
+            output.close()
+    return paths
+
+
+class ShardedIndexManager:
+    """ Searches a corpus of several files, each indexed by its own
+    IndexManager, through the same interface as IndexManager
+
+    Attributes:
+        shards (list[IndexManager]): One manager per file, in corpus order
+        sharding (str): FAN_OUT or HASH
+        cache (QueryCache | None): Results keyed by query and shard
+                                   generations
+    """
+    def __init__(self, file_paths: Sequence[str],
+                 builder: Callable[[str], Any],
+                 cache: QueryCache | None = None, sharding: str = FAN_OUT,
+                 workers: int = 1, append_only: bool = False,
+                 max_segments: int = MAX_SEGMENTS) -> None:
+        """Initializes the shards; none is built until ``build``.
+
+        Args:
+            file_paths (Sequence[str]): The corpus files, one per shard.
+            builder (Callable[[str], Any]): Builds an index from a path.
+            cache (QueryCache | None, optional): Query result cache.
+                                                 Defaults to None.
+            sharding (str, optional): FAN_OUT or HASH. Defaults to FAN_OUT.
+            workers (int, optional): Threads searching shards in parallel,
+                                     1 to search them in turn.
+                                     Defaults to 1.
+            append_only (bool, optional): Index growth of each file
+                                     incrementally. Defaults to False.
+            max_segments (int, optional): Segments per shard before a full
+                                     rebuild. Defaults to MAX_SEGMENTS.
+        Raises:
+            ValueError: If there are no files or ``sharding`` is unknown.
+        """
+        if not file_paths:
+            raise ValueError("The corpus has no files")
+        if sharding not in (FAN_OUT, HASH):
+            raise ValueError(f"Unknown sharding '{sharding}'")
+
+        self.shards = [
+            IndexManager(path, builder, append_only=append_only,
+                         max_segments=max_segments)
+            for path in file_paths
+        ]
+        self.sharding = sharding
+        self.cache = cache
+        self._pool = concurrent.futures.ThreadPoolExecutor(workers) \
+            if workers > 1 and len(self.shards) > 1 else None
+
+    def _map(self, task: Callable[[IndexManager], Any]) -> list[Any]:
+        """ Runs ``task`` on every shard, in parallel when configured """
+        if self._pool is None:
+            return [task(manager) for manager in self.shards]
+        return list(self._pool.map(task, self.shards))
+
+    def _any(self, task: Callable[[IndexManager], bool]) -> bool:
+        """ Returns whether ``task`` is true on some shard, stopping at the
+        first one that is """
+        if self._pool is None:
+            return any(task(manager) for manager in self.shards)
+
+        futures = [self._pool.submit(task, manager)
+                   for manager in self.shards]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                if future.result():
+                    return True
+            return False
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _generation(self, query: bytes) -> tuple[int, ...]:
+        """Returns the generations of the shards answering ``query``, 0
+        for a shard not built, to key the cache with."""
+        shards = self.shards
+        if self.sharding == HASH:
+            shards = [shards[shard_for(query, len(shards))]]
+        return tuple(manager.current.generation if manager.current else 0
+                     for manager in shards)
+
+    def build(self) -> None:
+        """ Builds every shard, in parallel when configured """
+        start = time.time()
+        self._map(lambda manager: manager.build())
+        logger.info(f"Corpus of {len(self.shards)} shards "
+                    f"({self.sharding}) built in "
+                    f"{time.time() - start:.4f} seconds")
+
+    def check_for_changes(self) -> bool:
+        """Starts a background rebuild of every shard whose file changed.
+        Never blocks on the rebuilds.
+
+        Returns:
+            bool: True if any rebuild was started, False otherwise.
+        """
+        started = False
+        for manager in self.shards:
+            started = manager.check_for_changes() or started
+        return started
+
+    def start_watcher(self, interval: float) -> threading.Thread:
+        """Starts a daemon thread checking every shard for changes
+        every ``interval`` seconds.
+
+        Args:
+            interval (float): Seconds between two checks.
+        Returns:
+            threading.Thread: The started watcher thread.
+        """
+        def watch() -> None:
+            while True:
+                time.sleep(interval)
+                self.check_for_changes()
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        return watcher
+
+    def _search(self, query: bytes) -> bool:
+        """ Looks up a query in the shards that may hold it """
+        if self.sharding == HASH:
+            return self.shards[shard_for(query, len(self.shards))] \
+                .search(query)
+        return self._any(lambda manager: manager.search(query))
+
+    def search(self, query: bytes) -> bool:
+        """Looks up a query in the corpus.
+
+        Args:
+            query (bytes): The line to search for.
+        Returns:
+            bool: True if the line exists in some shard, False otherwise.
+        """
+        if self.cache is None:
+            return self._search(query)
+
+        key = (query, self._generation(query))
+        found = self.cache.get(key)
+        if found is None:
+            found = self._search(query)
+            self.cache.put(key, found)
+        return found
+
+    def _search_many(self, queries: list[bytes]) -> list[bool]:
+        """ Looks up a batch, one pass per shard it touches """
+        if self.sharding == FAN_OUT:
+            per_shard = self._map(lambda manager: manager.search_many(queries))
+            return [any(hits) for hits in zip(*per_shard)]
+
+        routed: dict[int, list[int]] = {}
+        for i, query in enumerate(queries):
+            routed.setdefault(shard_for(query, len(self.shards)), []).append(i)
+        found = [False] * len(queries)
+        for shard, positions in routed.items():
+            hits = self.shards[shard].search_many(
+                [queries[i] for i in positions]
+            )
+            for i, hit in zip(positions, hits):
+                found[i] = hit
+        return found
+
+    def search_many(self, queries: list[bytes]) -> list[bool]:
+        """Looks up a batch of queries in the corpus.
+
+        Args:
+            queries (list[bytes]): The lines to search for.
+        Returns:
+            list[bool]: Whether each line exists, in the input order.
+        """
+        cache = self.cache
+        if cache is None:
+            return self._search_many(queries)
+
+        keys = [(query, self._generation(query)) for query in queries]
+        results: list[bool | None] = [cache.get(key) for key in keys]
+        missing = [i for i, found in enumerate(results) if found is None]
+        found_misses = self._search_many([queries[i] for i in missing])
+        for i, found in zip(missing, found_misses):
+            results[i] = found
+            cache.put(keys[i], found)
+        # Every None was a miss and has been filled in
+        return cast(list[bool], results)
+
+    def prefix_count(self, prefix: bytes) -> int:
+        """Counts the lines starting with ``prefix`` across every shard;
+        lines sharing a prefix are spread over shards whatever the
+        partitioning.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+        Returns:
+            int: The number of lines, duplicates included.
+        Raises:
+            NotImplementedError: If the index cannot answer prefix queries.
+        """
+        return sum(self._map(lambda manager: manager.prefix_count(prefix)))
+
+    def prefix_lines(self, prefix: bytes,
+                     limit: int) -> tuple[int, Iterator[bytes]]:
+        """Lists up to ``limit`` lines starting with ``prefix``, merging
+        the sorted listings of every shard.
+
+        Args:
+            prefix (bytes): The prefix to look for.
+            limit (int): The most lines to list.
+        Returns:
+            tuple[int, Iterator[bytes]]: How many lines will be listed, and
+                                         a lazy iterator over them in order.
+        Raises:
+            NotImplementedError: If the index cannot answer prefix queries.
+        """
+        listings = self._map(
+            lambda manager: manager.prefix_lines(prefix, limit)
+        )
+        count = min(sum(count for count, _ in listings), limit)
+        merged = heapq.merge(*(lines for _, lines in listings))
+        return count, itertools.islice(merged, count)
+
+
+def main() -> None:
+    """ Partitions files into hash shards from the command line """
+    parser = argparse.ArgumentParser(
+        description="Hash-partition lines into shard files for "
+                    "SHARDING=hash"
+    )
+    parser.add_argument("sources", nargs="+", help="files to partition")
+    parser.add_argument("--shards", type=int, required=True)
+    parser.add_argument("--out", required=True, help="output directory")
+    args = parser.parse_args()
+
+    for path in partition_corpus(args.sources, args.out, args.shards):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
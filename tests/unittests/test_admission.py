@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+""" Test cases for the admission module """
+
+
+import pytest
+from admission import AdmissionControl
+from metrics import METRICS
+
+
+def test_capacity_counts_served_and_queued() -> None:
+    """Test admission stops at max_connections + max_queue"""
+    admission = AdmissionControl(max_connections=2, max_queue=1)
+    rejected = METRICS.counters["busy_rejections"]
+
+    assert all(admission.try_admit() for _ in range(3))
+    assert not admission.try_admit()
+    assert METRICS.counters["busy_rejections"] == rejected + 1
+
+    admission.started()
+    assert admission.gauges() == {"connections_active": 1,
+                                  "connections_queued": 2}
+    admission.finished()
+    assert admission.try_admit()
+
+
+def test_serve_releases_on_error() -> None:
+    """Test a failing handler still gives its room back"""
+    admission = AdmissionControl(max_connections=1)
+
+    def fail() -> None:
+        raise ValueError("boom")
+
+    assert admission.try_admit()
+    with pytest.raises(ValueError):
+        admission.serve(fail)
+    assert admission.admitted == 0
+    assert admission.try_admit()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+""" Test cases for the async_server module """
+
+
+import asyncio
+import threading
+from functools import partial
+from typing import Any
+import pytest
+from admission import BUSY, AdmissionControl
+from algorithms.engines import SearchEngine, load_engine
+from algorithms.line_index import LineIndex
+from async_server import handle_connection, serve
+from index_manager import IndexManager
+from protocol import EXISTS, NOT_EXISTS
+from unix_socket import create_unix_listener
+
+
+async def query_server(index_manager: IndexManager, queries: list) -> list:
+    """Starts a plain-TCP server on an ephemeral port and queries it"""
+    server = await asyncio.start_server(
+        partial(handle_connection, index_manager=index_manager),
+        "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    responses = []
+
+    async with server:
+        for query in queries:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(query)
+            await writer.drain()
+            responses.append(await reader.read())
+            writer.close()
+            await writer.wait_closed()
+
+    return responses
+
+
+class ThreadRecordingEngine:
+    """Delegates to an engine, recording the thread each search runs on"""
+    def __init__(self, engine: SearchEngine) -> None:
+        self.engine = engine
+        self.threads: list[int] = []
+
+    def search(self, query: bytes) -> bool:
+        self.threads.append(threading.get_ident())
+        return self.engine.search(query)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.engine, name)
+
+
+def test_handle_connection(tmp_path) -> None:
+    """Test that each connection gets one answer from the index"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+
+    responses = asyncio.run(
+        query_server(index_manager, [b"beta", b"gamma"])
+    )
+
+    assert responses == [EXISTS, NOT_EXISTS]
+
+
+def test_handle_connection_line_protocol(tmp_path) -> None:
+    """Test pipelined queries answered in order on one connection"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+
+    async def pipeline() -> bytes:
+        server = await asyncio.start_server(
+            partial(handle_connection, index_manager=index_manager,
+                    protocol_mode="line"),
+            "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"gamma\nbe")
+            await writer.drain()
+            writer.write(b"ta\n")
+            writer.write_eof()
+            response = await reader.read()
+            writer.close()
+            await writer.wait_closed()
+        return response
+
+    assert asyncio.run(pipeline()) == NOT_EXISTS + EXISTS
+
+
+def test_handle_connection_busy_and_idle(tmp_path) -> None:
+    """Test a connection beyond the cap gets BUSY while an idle one holds
+    the only slot, until its idle timeout closes it"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+
+    async def saturate() -> tuple:
+        server = await asyncio.start_server(
+            partial(handle_connection, index_manager=index_manager,
+                    protocol_mode="line", idle_timeout=0.2,
+                    admission=AdmissionControl(1)),
+            "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            idle_reader, _ = await asyncio.open_connection("127.0.0.1", port)
+            await asyncio.sleep(0.05)
+            reader, _ = await asyncio.open_connection("127.0.0.1", port)
+            refused = await reader.read()
+            # The idle connection is closed without a response
+            closed = await idle_reader.read()
+        return refused, closed
+
+    assert asyncio.run(saturate()) == (BUSY, b"")
+
+
+def test_handle_connection_offload(tmp_path) -> None:
+    """Test scan lookups run off the event loop's thread in both
+    protocols"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+    engine = ThreadRecordingEngine(load_engine("scan", str(test_file)))
+    index_manager = IndexManager(str(test_file), lambda path: engine)
+    index_manager.build()
+
+    async def query(protocol_mode: str, data: bytes) -> bytes:
+        server = await asyncio.start_server(
+            partial(handle_connection, index_manager=index_manager,
+                    protocol_mode=protocol_mode, offload=True),
+            "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(data)
+            writer.write_eof()
+            response = await reader.read()
+            writer.close()
+            await writer.wait_closed()
+        return response
+
+    assert asyncio.run(query("single", b"beta")) == EXISTS
+    assert asyncio.run(query("line", b"gamma\nalpha\n")) == \
+        NOT_EXISTS + EXISTS
+    assert len(engine.threads) == 3
+    assert threading.get_ident() not in engine.threads
+
+
+def test_handle_connection_unix(tmp_path) -> None:
+    """Test a query answered over a Unix domain socket"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+    path = str(tmp_path / "search.sock")
+
+    async def query() -> bytes:
+        server = await asyncio.start_unix_server(
+            partial(handle_connection, index_manager=index_manager), path
+        )
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b"alpha")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            await writer.wait_closed()
+        return response
+
+    assert asyncio.run(query()) == EXISTS
+
+
+def test_serve_closes_unix_server(tmp_path) -> None:
+    """Test the Unix socket is served with the TCP one and closed when
+    serving stops"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+    path = str(tmp_path / "search.sock")
+    configurations: dict[str, str | int] = {"HOST": "127.0.0.1", "PORT": 0}
+
+    async def run() -> bytes:
+        task = asyncio.create_task(serve(
+            configurations, index_manager,
+            unix_listener=create_unix_listener(path),
+        ))
+        # The listener is already listening, so the connection waits in
+        # its backlog until serve() accepts it; bound the wait instead of
+        # sleeping for the server to start
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(path), timeout=5
+        )
+        writer.write(b"alpha")
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        await writer.wait_closed()
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        with pytest.raises(ConnectionRefusedError):
+            await asyncio.open_unix_connection(path)
+        return response
+
+    assert asyncio.run(run()) == EXISTS
+
+
+if __name__ == "__main__":
+    pytest.main()
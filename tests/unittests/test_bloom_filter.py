@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+""" Test cases for the bloom_filter module """
+
+
+import os
+import pytest
+from algorithms.bloom_filter import (
+    BloomFilter, bloom_path_for, load_bloom_filter, open_bloom_filter,
+    with_bloom_filter
+)
+from algorithms.engines import ENGINES
+from algorithms.line_index import LineIndex
+from server import make_index_builder
+
+
+def test_no_false_negatives_and_low_fp_rate() -> None:
+    """Test added items are always found and misses are mostly rejected"""
+    bloom = BloomFilter.for_capacity(2000, 0.01)
+    items = [f"line {i}".encode() for i in range(2000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"miss {i}".encode() in bloom for i in range(5000))
+    assert false_positives < 5000 * 0.03
+
+
+def test_sidecar_is_mapped_and_invalidated(tmp_path) -> None:
+    """Test the persisted filter is reused until the file changes"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"alpha\r\nbeta\n")
+
+    bloom = load_bloom_filter(str(test_file), 0.01)
+    assert os.path.exists(bloom_path_for(str(test_file)))
+    assert b"alpha" in bloom and b"beta" in bloom
+
+    mapped = open_bloom_filter(str(test_file), 0.01)
+    assert mapped is not None
+    assert isinstance(mapped.bits, memoryview)
+    assert b"alpha" in mapped
+
+    test_file.write_bytes(b"gamma\n")
+    assert open_bloom_filter(str(test_file), 0.01) is None
+
+
+def test_filtered_index_rejects_misses(tmp_path) -> None:
+    """Test the wrapper never asks the index about definite misses"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"alpha\nbeta\n")
+    index = with_bloom_filter(LineIndex.from_file, 0.001)(str(test_file))
+    asked = []
+    unfiltered = index.index.search
+
+    def search(query: bytes) -> bool:
+        asked.append(query)
+        return unfiltered(query)
+
+    index.index.search = search
+
+    assert index.search(b"alpha")
+    assert not index.search(b"x" * 40)
+    assert index.search_many([b"beta", b"zzz", b"alpha"]) == [
+        True, False, True
+    ]
+    assert b"x" * 40 not in asked
+    assert len(index) == 2
+
+
+def test_sidecar_records_line_normalization(tmp_path) -> None:
+    """Test a filter of stripped lines is not reused for raw lines"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b" alpha \n")
+
+    assert b"alpha" in load_bloom_filter(str(test_file), 0.01, strip=True)
+    assert open_bloom_filter(str(test_file), 0.01) is None
+    assert b" alpha " in load_bloom_filter(str(test_file), 0.01)
+    assert open_bloom_filter(str(test_file), 0.01, strip=True) is None
+
+
+def test_sidecar_records_fp_rate(tmp_path) -> None:
+    """Test a filter sized for one rate is rebuilt for another"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"".join(b"%d\n" % i for i in range(1000)))
+
+    loose = load_bloom_filter(str(test_file), 0.1)
+    assert open_bloom_filter(str(test_file), 0.001) is None
+
+    tight = load_bloom_filter(str(test_file), 0.001)
+    assert isinstance(tight.bits, memoryview)
+    assert tight.fp_rate == 0.001
+    assert tight.num_bits > loose.num_bits
+    assert open_bloom_filter(str(test_file), 0.1) is None
+
+
+@pytest.mark.parametrize("name", sorted(set(ENGINES) - {"mmap"}))
+def test_filter_matches_engine_normalization(tmp_path, name) -> None:
+    """Test the filter never rejects a line the engine would find"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"alpha \n\tbeta\r\n gamma\n")
+    build = make_index_builder({"ALGORITHM": name, "BLOOM_FP_RATE": 0.01})
+    index = build(str(test_file))
+    try:
+        for query in (b"alpha", b"alpha ", b"\tbeta", b"beta", b"gamma",
+                      b" gamma"):
+            assert index.search(query) == index.index.search(query), query
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
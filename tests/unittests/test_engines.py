@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+""" Test cases for the engines module """
+
+
+import pytest
+from algorithms.engines import (
+    ENGINES, LineIndexEngine, get_engine, load_engine
+)
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    """ A small file with shared prefixes and a duplicate line """
+    path = tmp_path / "test_file.txt"
+    path.write_bytes(b"abc\nabd\nab\nxyz\nabc\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("name", sorted(ENGINES))
+def test_engines_agree_on_lines(test_file, name) -> None:
+    """Test every registered engine finds the same whole lines"""
+    engine = load_engine(name, test_file)
+    try:
+        for line in (b"abc", b"abd", b"ab", b"xyz"):
+            assert engine.search(line), line
+        assert engine.search_many([b"xyz", b"nope", b"ab"]) == \
+            [True, False, True]
+        assert not engine.search(b"abcd")
+        if name != "mmap":  # mmap matches substrings
+            assert not engine.search(b"a")
+            assert not engine.search(b"yz")
+    finally:
+        engine.close()
+
+
+@pytest.mark.parametrize("name", sorted(ENGINES))
+def test_engines_match_raw_bytes(tmp_path, name) -> None:
+    """Test lines that are not valid UTF-8 are matched as bytes"""
+    path = tmp_path / "test_file.txt"
+    path.write_bytes(b"caf\xe9\n\xff\xfe\nplain\n")
+    engine = load_engine(name, str(path))
+    try:
+        assert engine.search(b"caf\xe9")
+        assert engine.search(b"\xff\xfe")
+        assert engine.search(b"plain")
+        if name != "mmap":  # mmap matches substrings
+            assert not engine.search(b"caf")
+    finally:
+        engine.close()
+
+
+@pytest.mark.parametrize("name", sorted(set(ENGINES) - {"mmap"}))
+def test_engines_line_normalization(tmp_path, name) -> None:
+    """Test surrounding whitespace is stripped from the file's lines by
+    the engines that say so, and kept by the others"""
+    path = tmp_path / "test_file.txt"
+    path.write_bytes(b"  alpha \nbeta\t\n")
+    engine = load_engine(name, str(path))
+    try:
+        strip = engine.strip_lines
+        assert engine.search(b"alpha") == strip
+        assert engine.search(b"beta") == strip
+        assert engine.search(b"  alpha ") != strip
+        assert engine.search(b"beta\t") != strip
+    finally:
+        engine.close()
+
+    assert strip == (name in ("radix", "trie", "hash", "naive"))
+
+
+@pytest.mark.parametrize("name", ["line_index", "radix", "trie"])
+def test_prefix_queries(test_file, name) -> None:
+    """Test the ordered engines count and list lines by prefix"""
+    engine = load_engine(name, test_file)
+    try:
+        assert engine.prefix_count(b"ab") == 4
+        assert engine.prefix_count(b"abc") == 2
+        assert engine.prefix_count(b"") == 5
+        assert engine.prefix_count(b"q") == 0
+        assert list(engine.prefix_lines(b"ab")) == \
+            [b"ab", b"abc", b"abc", b"abd"]
+        assert list(engine.prefix_lines(b"a", 2)) == [b"ab", b"abc"]
+        assert list(engine.prefix_lines(b"abe")) == []
+    finally:
+        engine.close()
+
+
+def test_prefix_unsupported(test_file) -> None:
+    """Test engines without ordered lines refuse prefix queries"""
+    engine = load_engine("hash", test_file)
+    with pytest.raises(NotImplementedError):
+        engine.prefix_count(b"ab")
+
+
+def test_get_engine_by_reference() -> None:
+    """Test an engine can be named by its module and class"""
+    engine = get_engine("algorithms.engines:LineIndexEngine")
+    assert engine is LineIndexEngine
+
+
+def test_get_engine_unknown() -> None:
+    """Test unknown names and non-engine references are rejected"""
+    with pytest.raises(KeyError):
+        get_engine("nope")
+    with pytest.raises(KeyError):
+        get_engine("algorithms.engines:load_engine")
+    with pytest.raises(KeyError):
+        get_engine("no.such.module:Engine")
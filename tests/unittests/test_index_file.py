@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+""" Test cases for the index_file module """
+
+
+import os
+import pytest
+from algorithms.index_file import (
+    index_path_for, load_line_index, open_line_index, write_index_file
+)
+from algorithms.line_index import LineIndex
+
+
+def test_sidecar_round_trip(tmp_path) -> None:
+    """Test that a written sidecar is mapped and answers lookups"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"gamma\nalpha\nbeta\n")
+
+    write_index_file(str(test_file))
+    index = open_line_index(str(test_file))
+
+    assert index is not None
+    assert isinstance(index.entries, memoryview)
+    assert index.search(b"alpha")
+    assert index.search(b"gamma")
+    assert not index.search(b"delta")
+    index.close()
+
+
+def test_stale_sidecar_is_rejected(tmp_path) -> None:
+    """Test that a size change invalidates the sidecar"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"alpha\n")
+    write_index_file(str(test_file))
+
+    test_file.write_bytes(b"alpha\nbeta\n")
+
+    assert open_line_index(str(test_file)) is None
+
+
+def test_touched_file_is_checked_by_hash(tmp_path) -> None:
+    """Test that an mtime-only change falls back to the content hash"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"alpha\n")
+    write_index_file(str(test_file))
+
+    os.utime(test_file, ns=(0, 12345))
+    index = open_line_index(str(test_file))
+    assert index is not None
+    index.close()
+
+    test_file.write_bytes(b"omega\n")
+    os.utime(test_file, ns=(0, 12345))
+    assert open_line_index(str(test_file)) is None
+
+
+def test_load_line_index_rebuilds_sidecar(tmp_path) -> None:
+    """Test that a missing or corrupt sidecar is (re)written"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"alpha\nbeta\n")
+    index_path = index_path_for(str(test_file))
+
+    index = load_line_index(str(test_file))
+    assert os.path.exists(index_path)
+    assert index.search(b"beta")
+    index.close()
+
+    with open(index_path, "wb") as corrupt:
+        corrupt.write(b"garbage")
+
+    index = load_line_index(str(test_file))
+    assert index.search(b"alpha")
+    index.close()
+
+
+@pytest.mark.parametrize("persisted", [True, False])
+def test_source_truncated_in_place(tmp_path, persisted) -> None:
+    """Test an index keeps answering from its own copy of the lines
+    after the source file is truncated in place"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"gamma\nalpha\n" * 5000)
+    if persisted:
+        index = load_line_index(str(test_file))
+        assert isinstance(index.entries, memoryview)
+    else:
+        index = LineIndex.from_file(str(test_file))
+
+    with open(test_file, "r+b") as file:
+        file.truncate(0)
+
+    assert index.search(b"alpha")
+    assert not index.search(b"beta")
+    assert index.prefix_count(b"gam") == 5000
+    index.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
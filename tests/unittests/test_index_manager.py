@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+""" Test cases for the index_manager module """
+
+
+import os
+import threading
+import time
+from functools import partial
+import pytest
+from algorithms.engines import load_engine
+from algorithms.line_index import LineIndex
+from algorithms.segmented_index import SegmentedIndex
+from index_manager import IndexManager
+
+
+def wait_for_generation(manager: IndexManager, generation: int) -> None:
+    """Waits until the manager publishes the given generation"""
+    deadline = time.time() + 5
+    assert manager.current is not None
+    while manager.current.generation < generation:
+        assert time.time() < deadline, "rebuild did not finish"
+        time.sleep(0.01)
+
+
+def test_build_and_search(tmp_path) -> None:
+    """Test that the first build publishes generation 1"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+
+    manager = IndexManager(str(test_file), LineIndex.from_file)
+    manager.build()
+
+    assert manager.current is not None
+    assert manager.current.generation == 1
+    assert manager.search(b"alpha")
+    assert not manager.search(b"gamma")
+
+
+def test_unchanged_file_does_not_rebuild(tmp_path) -> None:
+    """Test that no rebuild starts while the file is unchanged"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\n")
+
+    manager = IndexManager(str(test_file), LineIndex.from_file)
+    manager.build()
+
+    assert not manager.check_for_changes()
+
+
+def test_change_triggers_background_swap(tmp_path) -> None:
+    """Test that a change is picked up and old results are served until
+    the new generation is published"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\n")
+    release = threading.Event()
+
+    def slow_builder(path: str):
+        if manager.current is not None:
+            release.wait(5)
+        return LineIndex.from_file(path)
+
+    manager = IndexManager(str(test_file), slow_builder)
+    manager.build()
+
+    # Replace the file atomically, as mapped indexes require
+    new_file = tmp_path / "new_file.txt"
+    new_file.write_text("gamma\ndelta\n")
+    os.replace(new_file, test_file)
+
+    assert manager.check_for_changes()
+    # Served from the previous generation while the rebuild is blocked
+    assert manager.search(b"alpha")
+    assert not manager.check_for_changes()
+
+    release.set()
+    wait_for_generation(manager, 2)
+
+    assert manager.search(b"gamma")
+    assert not manager.search(b"alpha")
+
+
+def test_append_indexes_only_the_tail(tmp_path) -> None:
+    """Test growth adds a segment, a partial line waits for its newline"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+    builds = []
+
+    def counting_builder(path: str):
+        builds.append(path)
+        return LineIndex.from_file(path)
+
+    manager = IndexManager(str(test_file), counting_builder,
+                           append_only=True)
+    manager.build()
+
+    with open(test_file, "a") as file:
+        file.write("gamma\nepsilon\ndel")
+    generation = manager.append()
+
+    assert generation is not None
+    assert generation.generation == 2
+    assert isinstance(generation.index, SegmentedIndex)
+    assert len(generation.index.segments[-1]) == 2
+    assert manager.search(b"gamma") and manager.search(b"epsilon")
+    assert manager.search(b"alpha")
+    assert not manager.search(b"del")
+
+    with open(test_file, "a") as file:
+        file.write("ta\n")
+    manager.append()
+
+    assert manager.search(b"delta")
+    assert manager.search_many([b"beta", b"delta", b"del"]) == \
+        [True, True, False]
+    assert manager.prefix_count(b"") == 5
+    assert builds == [str(test_file)]
+
+
+@pytest.mark.parametrize("name", ["radix", "line_index_memory"])
+def test_append_keeps_engine_normalization(tmp_path, name) -> None:
+    """Test appended lines are matched the way the engine matches the
+    lines it was built with"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b" alpha \n")
+    manager = IndexManager(str(test_file), partial(load_engine, name),
+                           append_only=True)
+    manager.build()
+
+    with open(test_file, "ab") as file:
+        file.write(b" gamma \n")
+    assert manager.append() is not None
+
+    strip = name == "radix"
+    for line in (b"alpha", b"gamma"):
+        assert manager.search(line) == strip
+        assert manager.search(b" " + line + b" ") != strip
+    assert manager.prefix_count(b"g") == int(strip)
+    assert manager.prefix_count(b" ") == 2 * (not strip)
+    assert list(manager.prefix_lines(b"", 10)[1]) == (
+        [b"alpha", b"gamma"] if strip else [b" alpha ", b" gamma "]
+    )
+
+
+def test_append_falls_back_to_rebuild(tmp_path) -> None:
+    """Test truncation, replacement and the segment limit rebuild in full"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+    manager = IndexManager(str(test_file), LineIndex.from_file,
+                           append_only=True, max_segments=2)
+    manager.build()
+
+    with open(test_file, "a") as file:
+        file.write("gamma\n")
+    assert manager.append() is not None
+    with open(test_file, "a") as file:
+        file.write("delta\n")
+    assert manager.append() is None  # Two segments already
+
+    test_file.write_text("alpha\n")
+    manager.build()
+    test_file.write_text("alp\n")
+    assert manager.append() is None  # Truncated
+
+    new_file = tmp_path / "new_file.txt"
+    new_file.write_text("alpha\nbeta\ngamma\n")
+    os.replace(new_file, test_file)
+    assert manager.append() is None  # Replaced
+
+    manager.check_for_changes()
+    wait_for_generation(manager, 4)
+    assert manager.search(b"gamma")
+    assert manager.current is not None
+    assert not isinstance(manager.current.index, SegmentedIndex)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+""" Test cases for the line_index module """
+
+
+import pytest
+from algorithms.line_index import (
+    LENGTH_BITS, LineIndex, line_index_search, sorted_line_entries
+)
+
+
+def test_sorted_line_entries() -> None:
+    """Test entries are sorted by content and skip newlines"""
+    def unpack(buffer: bytes) -> list:
+        return [(e >> LENGTH_BITS, e & ((1 << LENGTH_BITS) - 1))
+                for e in sorted_line_entries(buffer)]
+
+    assert unpack(b"cd\nab\n") == [(3, 2), (0, 2)]
+    assert unpack(b"cd\nab") == [(3, 2), (0, 2)]
+    assert unpack(b"x\r\n\n") == [(3, 0), (0, 1)]
+
+
+def test_exact_line_lookup(tmp_path) -> None:
+    """Test that only whole lines match"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"6;0;1;16;0;7;3;0;\nbeta\r\nalpha\nxabcx\nlast")
+
+    index = LineIndex.from_file(str(test_file))
+
+    assert len(index) == 5
+    for line in (b"6;0;1;16;0;7;3;0;", b"beta", b"alpha", b"xabcx", b"last"):
+        assert index.search(line)
+    for line in (b"abc", b"alph", b"alphaa", b"beta\r", b"", b"zzz"):
+        assert not index.search(line)
+
+    index.close()
+
+
+def test_empty_file(tmp_path) -> None:
+    """Test that an empty file yields an empty index"""
+    test_file = tmp_path / "empty.txt"
+    test_file.write_bytes(b"")
+
+    assert not line_index_search(str(test_file), b"anything")
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+""" Test cases for the logger module """
+
+
+import io
+import queue
+import logging
+from logger import logger as logger_module
+from logger.logger import (DroppingQueueHandler, create_queue_logger,
+                           use_log_file, worker_log_file)
+
+
+def test_records_written_once(tmp_path) -> None:
+    """Test every record reaches the file once, via the listener"""
+    log_file = tmp_path / "test.log"
+    stream = io.StringIO()
+    log, _, listener = create_queue_logger("test_once", str(log_file), stream)
+
+    log.info("hello")
+    log.debug("details")
+    listener.stop()
+
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 2
+    assert lines[0].endswith("INFO - hello")
+    assert stream.getvalue().count("hello") == 1
+    assert "details" not in stream.getvalue()  # Console is INFO and up
+
+
+def test_use_log_file(tmp_path) -> None:
+    """Test records move to the new file while the console is kept"""
+    log_file = tmp_path / "test.log"
+    worker_file = tmp_path / "worker.log"
+    stream = io.StringIO()
+    log, _, listener = create_queue_logger("test_move", str(log_file), stream)
+
+    log.info("before")
+    use_log_file(str(worker_file), listener)
+    log.info("after")
+    listener.stop()
+
+    assert "before" in log_file.read_text()
+    assert "after" not in log_file.read_text()
+    assert worker_file.read_text().count("after") == 1
+    assert stream.getvalue().count("after") == 1
+
+
+def test_worker_log_file() -> None:
+    """Test each worker slot gets its own file next to the shared one"""
+    assert worker_log_file(0) == "./log_files/details.worker-0.log"
+    assert worker_log_file(0) != worker_log_file(1)
+
+
+def test_full_queue_drops_records() -> None:
+    """Test a full queue drops and counts records instead of blocking"""
+    handler = DroppingQueueHandler(queue.Queue(1))
+    record = logging.makeLogRecord({"msg": "x"})
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+
+
+def test_sample_rate() -> None:
+    """Test sampling at rates 0 and 1"""
+    try:
+        logger_module.set_sample_rate(0)
+        assert not any(logger_module.sample() for _ in range(100))
+        logger_module.set_sample_rate(1)
+        assert all(logger_module.sample() for _ in range(100))
+    finally:
+        logger_module.set_sample_rate(1)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+""" Test cases for the metrics module """
+
+
+import urllib.request
+from metrics import (
+    MAX_MICROS, NUM_BUCKETS, Histogram, Metrics, bucket_index,
+    bucket_upper_bound, start_metrics_server
+)
+
+
+def test_buckets_bound_their_values() -> None:
+    """Test every value lands in a bucket whose bound is within ~3%"""
+    previous = -1
+    for micros in list(range(0, 5000)) + [10**6, 10**9, MAX_MICROS]:
+        index = bucket_index(micros)
+        assert index < NUM_BUCKETS
+        assert index >= previous
+        upper = bucket_upper_bound(index)
+        assert micros <= upper <= micros * 1.04 + 1
+        if index:
+            assert bucket_upper_bound(index - 1) < micros
+        previous = index
+
+
+def test_histogram_quantiles() -> None:
+    """Test quantiles come back within the bucket precision"""
+    histogram = Histogram()
+    for micros in range(1, 1001):
+        histogram.record(micros / 1e6)
+
+    assert histogram.count == 1000
+    assert abs(histogram.quantile(0.5) - 500e-6) <= 500e-6 * 0.04
+    assert abs(histogram.quantile(0.99) - 990e-6) <= 990e-6 * 0.04
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_render_prometheus_text() -> None:
+    """Test counters, collectors and cumulative buckets are exposed"""
+    metrics = Metrics()
+    metrics.count_results([True, False, True])
+    metrics.observe("search", 0.00003)
+    metrics.observe("search", 0.002)
+    metrics.add_collector(lambda: {"cache_hits": 7})
+
+    text = metrics.render()
+    assert "filesearch_queries_total 3" in text
+    assert "filesearch_hits_total 2" in text
+    assert "filesearch_misses_total 1" in text
+    assert "filesearch_cache_hits_total 7" in text
+    assert 'filesearch_phase_seconds_bucket{phase="search",le="5e-05"} 1' \
+        in text
+    assert 'filesearch_phase_seconds_bucket{phase="search",le="0.0025"} 2' \
+        in text
+    assert 'filesearch_phase_seconds_count{phase="search"} 2' in text
+    assert 'filesearch_phase_seconds_count{phase="send"} 0' in text
+
+
+def test_metrics_endpoint() -> None:
+    """Test the exposition is served over HTTP"""
+    server = start_metrics_server("127.0.0.1", 0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as r:
+            assert r.status == 200
+            assert b"filesearch_connections_total" in r.read()
+    finally:
+        server.shutdown()
+        server.server_close()
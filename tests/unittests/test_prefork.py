@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+""" Test cases for the prefork module """
+
+
+import os
+import signal
+import time
+import pytest
+import prefork
+from prefork import Supervisor
+
+
+def read_pids(directory) -> dict:
+    """Returns the pid last written by the worker of each slot"""
+    return {path.name: int(path.read_text())
+            for path in directory.glob("worker-*")}
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    """Polls ``condition`` until it holds or ``timeout`` seconds pass"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_dead_worker_is_replaced(tmp_path, monkeypatch) -> None:
+    """Test a killed worker is restarted in its slot, and SIGTERM stops
+    the workers and the supervisor"""
+    monkeypatch.setattr(prefork, "RESTART_DELAY", 0.05)
+
+    def worker(slot: int) -> None:
+        tmp_file = tmp_path / f"{slot}.tmp"
+        tmp_file.write_text(str(os.getpid()))
+        os.replace(tmp_file, tmp_path / f"worker-{slot}")
+        while True:
+            signal.pause()
+
+    supervisor = os.fork()
+    if supervisor == 0:
+        exit_code = 1
+        try:
+            Supervisor(worker, 2).run()
+            exit_code = 0
+        finally:
+            os._exit(exit_code)
+
+    try:
+        wait_for(lambda: len(read_pids(tmp_path)) == 2)
+        first = read_pids(tmp_path)
+        os.kill(first["worker-0"], signal.SIGKILL)
+
+        wait_for(lambda: read_pids(tmp_path)["worker-0"] !=
+                 first["worker-0"])
+        second = read_pids(tmp_path)
+        assert second["worker-1"] == first["worker-1"]
+        os.kill(second["worker-0"], 0)  # Alive
+    finally:
+        os.kill(supervisor, signal.SIGTERM)
+        _, status = os.waitpid(supervisor, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    for pid in second.values():
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+def test_worker_ignores_signals_until_handled(tmp_path) -> None:
+    """Test a worker starts with SIGHUP and SIGUSR1 ignored, so neither
+    kills it before it installs its own handlers"""
+    def worker(slot: int) -> None:
+        ignored = [signal.getsignal(signum) == signal.SIG_IGN
+                   for signum in (signal.SIGHUP, signal.SIGUSR1)]
+        (tmp_path / "ignored").write_text(str(all(ignored)))
+
+    pid = Supervisor(worker, 1).spawn()
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert (tmp_path / "ignored").read_text() == "True"
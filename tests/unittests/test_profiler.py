@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+""" Test cases for the profiler module """
+
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from metrics import Metrics, start_metrics_server
+from profiler import Profiler, Tracer, sample_stacks, thread_group
+
+
+def spin(stop: threading.Event) -> None:
+    """ Keeps a thread busy in a recognisable function """
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_sample_stacks_collapses_other_threads() -> None:
+    """Test a running thread's stack is sampled, outermost frame first"""
+    stop = threading.Event()
+    thread = threading.Thread(target=spin, args=(stop,), name="spinner")
+    thread.start()
+    try:
+        stacks = sample_stacks(0.05, interval=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    spinning = [stack for stack in stacks if stack.startswith("spinner;")]
+    assert spinning
+    assert all(stack.endswith("test_profiler.py:spin")
+               for stack in spinning)
+    assert not any("sample_stacks" in stack for stack in stacks)
+
+
+def test_thread_group() -> None:
+    """Test pool thread names lose their index"""
+    assert thread_group("ThreadPoolExecutor-0_3") == "ThreadPoolExecutor-0"
+    assert thread_group("MainThread") == "MainThread"
+    assert thread_group("Thread-1 (serve)") == "Thread-1 (serve)"
+
+
+def test_profiler_traces_phases_only_while_running(tmp_path) -> None:
+    """Test phases become spans during a profile and the files are
+    written"""
+    metrics = Metrics()
+    profiler = Profiler(str(tmp_path), interval=0.001, metrics=metrics)
+    worker = threading.Thread(target=profiler.run, args=(0.1,))
+    worker.start()
+    time.sleep(0.02)
+    metrics.observe("search", 0.001)
+    with pytest.raises(RuntimeError):
+        profiler.run(0.1)
+    worker.join()
+
+    assert metrics.tracer is None
+    metrics.observe("search", 0.001)
+
+    folded, = tmp_path.glob("*.folded")
+    trace, = tmp_path.glob("*.trace.json")
+    assert folded.read_text()
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["search"]
+    assert events[0]["dur"] == pytest.approx(1000)
+
+
+def test_tracer_chrome_trace() -> None:
+    """Test spans are exported as complete events in microseconds"""
+    tracer = Tracer(capacity=2)
+    for phase in ("recv", "search", "send"):
+        tracer.record(phase, 0.5)
+
+    events = tracer.chrome_trace()["traceEvents"]
+    assert [event["name"] for event in events] == ["search", "send"]
+    assert {event["ph"] for event in events} == {"X"}
+    assert events[0]["dur"] == 500_000
+    assert events[0]["ts"] <= events[1]["ts"]
+
+
+def test_profile_route(tmp_path) -> None:
+    """Test /profile answers with collapsed stacks"""
+    profiler = Profiler(str(tmp_path), interval=0.001, trace=False)
+    server = start_metrics_server("127.0.0.1", 0, profiler)
+    url = f"http://127.0.0.1:{server.server_address[1]}/profile"
+    try:
+        with urllib.request.urlopen(f"{url}?seconds=0.05") as response:
+            body = response.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}?seconds=0")
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+
+    assert "MainThread;" in body
+    assert not list(tmp_path.glob("*.trace.json"))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+""" Test cases for the protocol module """
+
+
+import socket
+import threading
+import pytest
+from algorithms.line_index import LineIndex
+from index_manager import IndexManager
+from protocol import (
+    BAD_BATCH, BAD_PREFIX, EXISTS, NOT_EXISTS, PREFIX_UNSUPPORTED,
+    STREAM_CHUNK, FrameTooLongError, LineFramer, QuerySession,
+    encode_batch_result, worker_buffer
+)
+
+
+def test_framer_joins_split_queries() -> None:
+    """Test a query split across several reads"""
+    framer = LineFramer()
+
+    assert framer.feed(b"alp") == []
+    assert framer.feed(b"ha\r") == []
+    assert framer.feed(b"\nbe") == [b"alpha"]
+    assert framer.feed(b"ta\n") == [b"beta"]
+
+
+def test_framer_splits_packed_queries() -> None:
+    """Test several queries arriving in one read"""
+    framer = LineFramer()
+
+    assert framer.feed(b"a\nb\n\nc") == [b"a", b"b", b""]
+    assert framer.feed(b"\n") == [b"c"]
+
+
+def test_framer_rejects_long_lines() -> None:
+    """Test that oversized queries are rejected, complete or not"""
+    framer = LineFramer(max_line=4)
+    with pytest.raises(FrameTooLongError) as error:
+        framer.feed(b"ok\ntoolong\n")
+    assert error.value.queries == [b"ok"]
+
+    framer = LineFramer(max_line=4)
+    assert framer.feed(b"abcd") == []
+    with pytest.raises(FrameTooLongError):
+        framer.feed(b"e")
+
+
+def test_framer_feed_larger_than_buffer() -> None:
+    """Test one read holding many more bytes than the buffer"""
+    framer = LineFramer(max_line=4)
+    queries = [b"q%d" % i for i in range(100)]
+
+    assert framer.feed(b"\n".join(queries) + b"\nrest") == queries
+    assert framer.feed(b"\n") == [b"rest"]
+
+
+def test_framer_recv_into_partial_reads() -> None:
+    """Test queries received in pieces straight into the buffer"""
+    framer = LineFramer(max_line=8, buffer=worker_buffer(16))
+    server_side, client_side = socket.socketpair()
+    try:
+        received: list[bytes] = []
+        for piece in (b"alp", b"ha\r\nbe", b"ta\ngamma\n"):
+            client_side.sendall(piece)
+            assert framer.recv_into(server_side) == len(piece)
+            received += framer.frames()
+        assert received == [b"alpha", b"beta", b"gamma"]
+        assert not framer.partial
+    finally:
+        server_side.close()
+        client_side.close()
+
+
+def test_worker_buffer_per_thread() -> None:
+    """Test each thread reuses its own buffer"""
+    buffer = worker_buffer(64)
+    assert worker_buffer(32) is buffer
+    assert len(worker_buffer(128)) == 128
+
+    other: list[bytearray] = []
+    thread = threading.Thread(target=lambda: other.append(worker_buffer(64)))
+    thread.start()
+    thread.join()
+    assert other[0] is not worker_buffer(64)
+
+    with pytest.raises(ValueError):
+        LineFramer(max_line=64, buffer=bytearray(64))
+
+
+def test_encode_batch_result() -> None:
+    """Test both batch reply encodings"""
+    found = [True, False, False, True, False, False, False, False, True]
+
+    assert encode_batch_result(found) == b"BITMAP 9 0901\n"
+    assert encode_batch_result(found, b"HITS") == b"HITS 3 0,3,8\n"
+    assert encode_batch_result([], b"HITS") == b"HITS 0 \n"
+
+
+def test_session_batch_spans_reads(tmp_path) -> None:
+    """Test a batch split across reads and followed by a plain query"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\ndelta\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+    session = QuerySession(index_manager, max_batch=10)
+
+    assert session.handle([b"BATCH 4 HITS", b"delta", b"zeta"]) == b""
+    assert session.handle([b"alpha", b"alpha", b"beta"]) == (
+        b"HITS 3 0,2,3\n" + EXISTS
+    )
+    assert session.handle([b"BATCH 11"]) == BAD_BATCH
+    assert session.handle([b"BATCH x"]) == BAD_BATCH
+    assert session.handle([b"BATCH 0"]) == b"BITMAP 0 \n"
+
+
+def test_line_index_search_many(tmp_path) -> None:
+    """Test the merge-walk batch lookup against single lookups"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("".join(f"{i * 7 % 100}\n" for i in range(100)))
+    index = LineIndex.from_file(str(test_file))
+    queries = [str(i).encode() for i in range(-5, 120, 3)] + [b"", b"50"]
+
+    assert index.search_many(queries) == [index.search(q) for q in queries]
+    index.close()
+
+
+def test_session_prefix_commands(tmp_path) -> None:
+    """Test prefix existence, count and a listing clamped to max_list"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("beta\nalpha\nalps\nal pine\nalpha\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+    session = QuerySession(index_manager, max_list=3)
+
+    assert session.handle([b"PREFIX_EXISTS alp", b"PREFIX_EXISTS x"]) == \
+        EXISTS + NOT_EXISTS
+    assert session.handle([b"PREFIX_COUNT al", b"PREFIX_COUNT al "]) == \
+        b"COUNT 4\nCOUNT 1\n"
+    assert session.handle([b"PREFIX_LIST 10 al", b"beta"]) == \
+        b"LIST 3\nal pine\nalpha\nalpha\n" + EXISTS
+    assert session.handle([b"PREFIX_LIST 0 a"]) == b"LIST 0\n"
+    assert session.handle([b"PREFIX_LIST x al"]) == BAD_PREFIX
+
+
+def test_session_streams_long_listing(tmp_path) -> None:
+    """Test a long listing is produced in bounded chunks"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"".join(b"line%06d\n" % i for i in range(20_000)))
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+    session = QuerySession(index_manager, max_list=20_000)
+
+    chunks = list(session.handle_stream([b"PREFIX_LIST 20000 line"]))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) < 2 * STREAM_CHUNK for chunk in chunks)
+    listing = b"".join(chunks).split(b"\n")
+    assert listing[0] == b"LIST 20000"
+    assert listing[1] == b"line000000" and listing[-2] == b"line019999"
+
+
+def test_session_prefix_unsupported(tmp_path) -> None:
+    """Test indexes without prefix support answer with an error"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\n")
+    index_manager = IndexManager(str(test_file),
+                                 lambda path: set([b"alpha"]))
+    index_manager.build()
+    session = QuerySession(index_manager)
+
+    assert session.handle([b"PREFIX_COUNT a", b"PREFIX_LIST 5 a"]) == \
+        PREFIX_UNSUPPORTED * 2
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+""" Test cases for the query_cache module """
+
+
+import os
+import pytest
+from algorithms.line_index import LineIndex
+from index_manager import IndexManager
+from query_cache import QueryCache
+
+
+def test_lru_eviction() -> None:
+    """Test that the least recently used entry is evicted"""
+    cache = QueryCache(2)
+    cache.put((b"a", 1), True)
+    cache.put((b"b", 1), False)
+
+    assert cache.get((b"a", 1)) is True
+    cache.put((b"c", 1), True)
+
+    assert cache.get((b"b", 1)) is None
+    assert cache.get((b"a", 1)) is True
+    assert cache.get((b"c", 1)) is True
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1}
+
+
+def test_new_generation_bypasses_cache(tmp_path) -> None:
+    """Test that cached results do not survive a file change"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\n")
+    cache = QueryCache(10)
+    manager = IndexManager(str(test_file), LineIndex.from_file, cache)
+    manager.build()
+
+    assert manager.search(b"alpha")
+    assert manager.search(b"alpha")
+    assert manager.search_many([b"alpha", b"beta"]) == [True, False]
+    assert cache.hits == 2
+
+    new_file = tmp_path / "new_file.txt"
+    new_file.write_text("beta\n")
+    os.replace(new_file, test_file)
+    manager.build()
+
+    assert not manager.search(b"alpha")
+    assert manager.search_many([b"alpha", b"beta"]) == [False, True]
+
+
+if __name__ == "__main__":
+    pytest.main()
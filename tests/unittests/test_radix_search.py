@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+""" Test cases for the radix_search module """
+
+
+import random
+import pytest
+from algorithms.radix_search import (
+    RadixTree, build_radix_tree, line_spans, radix_search
+)
+
+
+def count_nodes(tree: RadixTree) -> int:
+    """Counts the nodes below the root"""
+    stack, count = [tree.root], 0
+    while stack:
+        node = stack.pop()
+        for child in (node.children or {}).values():
+            count += 1
+            stack.append(child)
+    return count
+
+
+def test_build_radix_tree_is_reusable(tmp_path) -> None:
+    """Test that a tree built once answers several queries"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("6;0;1;16;0;7;3;0;\n  line 2  \nline\n")
+
+    tree = build_radix_tree(str(test_file))
+
+    assert tree.search(b"6;0;1;16;0;7;3;0;")
+    assert tree.search(b"line 2")
+    assert tree.search(b"line")
+    assert not tree.search(b"lin")
+    assert not tree.search(b"line 3")
+
+
+def test_radix_search(tmp_path) -> None:
+    """Test the one-shot radix_search helper"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+
+    assert radix_search(str(test_file), b"beta")
+    assert not radix_search(str(test_file), b"gamma")
+
+
+def test_edges_are_path_compressed() -> None:
+    """Test that shared prefixes are split and chains are merged"""
+    buffer = b"romane\nromanus\nromulus\n"
+    tree = RadixTree(buffer)
+    for start, end in line_spans(buffer):
+        tree.insert(start, end)
+
+    # rom-{an-{e,us},ulus}
+    assert count_nodes(tree) == 5
+    assert not tree.search(b"rom")
+    assert tree.search(b"romanus")
+
+
+def test_insert_stops_at_line_end() -> None:
+    """Test a line matching past its end into the next one is not
+    treated as longer than it is"""
+    tree = RadixTree(b"ab\nab\n")
+    tree.insert(0, 2)
+    tree.insert(3, 4)  # "a", followed by "b" in the buffer
+
+    assert tree.search(b"a")
+    assert tree.search(b"ab")
+    assert tree.prefix_count(b"ab") == 1
+    assert tree.prefix_count(b"a") == 2
+
+
+def test_bulk_build_matches_insert() -> None:
+    """Test both build paths against a set on random lines"""
+    rng = random.Random(7)
+    lines = [
+        "".join(rng.choice("ab;") for _ in range(rng.randint(0, 6)))
+        for _ in range(300)
+    ]
+    buffer = "\n".join(lines).encode() + b"\n"
+    spans = line_spans(buffer)
+
+    inserted = RadixTree(buffer)
+    for start, end in spans:
+        inserted.insert(start, end)
+    bulk = RadixTree.from_sorted_lines(
+        buffer, sorted(spans, key=lambda s: buffer[s[0]:s[1]])
+    )
+
+    expected = set(line.encode() for line in lines)
+    for length in range(8):
+        for i in range(3 ** length if length < 6 else 0):
+            query, n = b"", i
+            for _ in range(length):
+                query += b"ab;"[n % 3:n % 3 + 1]
+                n //= 3
+            assert inserted.search(query) == (query in expected)
+            assert bulk.search(query) == (query in expected)
+    assert count_nodes(inserted) == count_nodes(bulk)
+
+
+def test_prefix_counts_match_both_builds() -> None:
+    """Test subtree counts and listings against the sorted lines"""
+    rng = random.Random(11)
+    lines = sorted(
+        "".join(rng.choice("ab;") for _ in range(rng.randint(0, 5))).encode()
+        for _ in range(200)
+    )
+    buffer = b"\n".join(lines) + b"\n"
+    spans = line_spans(buffer)
+
+    inserted = RadixTree(buffer)
+    for start, end in spans:
+        inserted.insert(start, end)
+    bulk = RadixTree.from_sorted_lines(
+        buffer, sorted(spans, key=lambda s: buffer[s[0]:s[1]])
+    )
+
+    for prefix in (b"", b"a", b"ab", b"b;", b";;a", b"abab;", b"c"):
+        expected = [line for line in lines if line.startswith(prefix)]
+        for tree in (inserted, bulk):
+            assert tree.prefix_count(prefix) == len(expected)
+            assert list(tree.prefix_lines(prefix)) == expected
+            assert list(tree.prefix_lines(prefix, 3)) == expected[:3]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+""" Test cases for the scan_search module """
+
+
+import pytest
+from algorithms.scan_search import chunk_bounds, find_line, scan_search
+
+
+@pytest.mark.parametrize("content", [
+    b"abc\nxabcx\nlast",
+    b"abc\nxabcx\nlast\n",
+    b"abc\r\nxabcx\r\nlast\r\n",
+])
+def test_whole_lines_only(tmp_path, content) -> None:
+    """Test first, middle and last lines match, substrings do not"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(content)
+
+    for line in (b"abc", b"xabcx", b"last"):
+        assert scan_search(str(test_file), line), line
+    for query in (b"ab", b"bc", b"xabc", b"las", b"abc\nxabcx", b""):
+        assert not scan_search(str(test_file), query), query
+
+
+def test_single_line_and_empty_file(tmp_path) -> None:
+    """Test a file without newlines and an empty file"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"only")
+    assert scan_search(str(test_file), b"only")
+    assert not scan_search(str(test_file), b"onl")
+
+    test_file.write_bytes(b"")
+    assert not scan_search(str(test_file), b"")
+
+
+def test_chunks_are_line_aligned() -> None:
+    """Test chunks cover the buffer and every line is searched once"""
+    lines = [b"%d" % i for i in range(1000)]
+    buffer = b"\n".join(lines) + b"\n"
+
+    bounds = chunk_bounds(buffer, 7)
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(buffer)
+    for (_, end), (start, _) in zip(bounds, bounds[1:]):
+        assert end == start and buffer[start - 1:start] == b"\n"
+
+    for line in lines:
+        assert sum(find_line(buffer, line, start, end)
+                   for start, end in bounds) == 1
+
+
+def test_parallel_scan(tmp_path) -> None:
+    """Test the process-pool path finds first, middle and last lines"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_bytes(b"".join(b"line %d\n" % i for i in range(5000)))
+
+    for line in (b"line 0", b"line 2500", b"line 4999"):
+        assert scan_search(str(test_file), line, parallel_threshold=1,
+                           workers=2)
+    assert not scan_search(str(test_file), b"line 5000",
+                           parallel_threshold=1, workers=2)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+""" Test cases for the server module """
+
+
+import concurrent.futures
+import socket
+import threading
+import time
+import pytest
+from algorithms.line_index import LineIndex
+from admission import BUSY, AdmissionControl
+from index_manager import IndexManager
+from metrics import METRICS
+from server import (
+    accept_connections, handle_client, reject_busy, reload_on_request,
+    serve_line_queries,
+)
+from unix_socket import create_unix_listener
+
+
+def make_manager(tmp_path) -> IndexManager:
+    """Builds an index manager over a small file"""
+    test_file = tmp_path / "test_file.txt"
+    test_file.write_text("alpha\nbeta\n")
+    index_manager = IndexManager(str(test_file), LineIndex.from_file)
+    index_manager.build()
+    return index_manager
+
+
+def test_serve_line_queries_pipelined(tmp_path) -> None:
+    """Test pipelined queries answered in order on one connection"""
+    index_manager = make_manager(tmp_path)
+    server_side, client_side = socket.socketpair()
+    worker = threading.Thread(
+        target=serve_line_queries, args=(server_side, index_manager)
+    )
+    worker.start()
+
+    client_side.sendall(b"beta\ngam")
+    client_side.sendall(b"ma\nalpha\n")
+    client_side.shutdown(socket.SHUT_WR)
+    worker.join(5)
+    server_side.close()
+
+    received = b""
+    while chunk := client_side.recv(1024):
+        received += chunk
+    client_side.close()
+
+    assert received == (
+        b"STRING EXISTS\nSTRING NOT FOUND\nSTRING EXISTS\n"
+    )
+
+
+def test_serve_line_queries_rejects_long_line(tmp_path) -> None:
+    """Test that an oversized query ends the connection with an error"""
+    index_manager = make_manager(tmp_path)
+    server_side, client_side = socket.socketpair()
+
+    client_side.sendall(b"alpha\n" + b"x" * 64)
+    serve_line_queries(server_side, index_manager, payload_size=16)
+    server_side.close()
+
+    assert client_side.recv(1024) == b"STRING EXISTS\nERROR LINE TOO LONG\n"
+    client_side.close()
+
+
+@pytest.mark.parametrize("query, response", [
+    (b"x" * 15 + b"a", b"STRING NOT FOUND\n"),
+    (b"x" * 17, b"ERROR LINE TOO LONG\n"),
+])
+def test_handle_client_payload_limit(tmp_path, query, response) -> None:
+    """Test a single query filling the payload is answered and a longer
+    one is refused rather than truncated"""
+    index_manager = make_manager(tmp_path)
+    server_side, client_side = socket.socketpair()
+
+    client_side.sendall(query)
+    handle_client(server_side, ("test", 0), 16, index_manager)
+
+    assert client_side.recv(1024) == response
+    client_side.close()
+
+
+def test_serve_line_queries_timeouts(tmp_path) -> None:
+    """Test idle and half-sent connections are closed and counted"""
+    index_manager = make_manager(tmp_path)
+    idle = METRICS.counters["idle_timeouts"]
+    read = METRICS.counters["read_timeouts"]
+
+    server_side, client_side = socket.socketpair()
+    client_side.sendall(b"alpha\n")
+    serve_line_queries(server_side, index_manager, idle_timeout=0.05)
+    assert client_side.recv(1024) == b"STRING EXISTS\n"
+    assert METRICS.counters["idle_timeouts"] == idle + 1
+    server_side.close()
+    client_side.close()
+
+    server_side, client_side = socket.socketpair()
+    client_side.sendall(b"alp")
+    serve_line_queries(server_side, index_manager, read_timeout=0.05)
+    assert METRICS.counters["read_timeouts"] == read + 1
+    server_side.close()
+    client_side.close()
+
+
+def test_reject_busy() -> None:
+    """Test a refused plain connection is told BUSY and closed"""
+    server_side, client_side = socket.socketpair()
+
+    reject_busy(server_side, tls=False)
+
+    assert client_side.recv(1024) == BUSY
+    assert client_side.recv(1024) == b""
+    client_side.close()
+
+
+def test_reload_on_request(tmp_path) -> None:
+    """Test setting the event makes the reload thread rebuild a changed
+    file"""
+    index_manager = make_manager(tmp_path)
+    requested = threading.Event()
+    threading.Thread(target=reload_on_request,
+                     args=(index_manager, requested), daemon=True).start()
+
+    (tmp_path / "test_file.txt").write_text("gamma\n")
+    requested.set()
+
+    deadline = time.monotonic() + 5
+    while not index_manager.search(b"gamma"):
+        assert time.monotonic() < deadline, "reload did not happen"
+        time.sleep(0.01)
+    assert not requested.is_set()
+
+
+def test_accept_connections_unix(tmp_path) -> None:
+    """Test queries served in plaintext over a Unix domain socket"""
+    index_manager = make_manager(tmp_path)
+    path = str(tmp_path / "search.sock")
+    listener = create_unix_listener(path)
+    executor = concurrent.futures.ThreadPoolExecutor(2)
+    threading.Thread(
+        target=accept_connections, daemon=True,
+        args=(listener, executor, AdmissionControl(2), 1024, index_manager),
+    ).start()
+
+    responses = []
+    for query in (b"alpha", b"gamma"):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            client.sendall(query)
+            responses.append(client.recv(1024))
+    listener.close()
+    executor.shutdown()
+
+    assert responses == [b"STRING EXISTS\n", b"STRING NOT FOUND\n"]
+
+
+if __name__ == "__main__":
+    pytest.main()
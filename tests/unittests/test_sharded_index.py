@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+""" Test cases for the sharded_index module """
+
+
+import os
+import time
+import pytest
+from algorithms.line_index import LineIndex
+from query_cache import QueryCache
+from sharded_index import (
+    HASH, ShardedIndexManager, expand_corpus, partition_corpus, shard_for
+)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """ Three files, two of them matched by a glob """
+    (tmp_path / "part-1.txt").write_text("alpha\nbeta\n")
+    (tmp_path / "part-2.txt").write_text("gamma\nalps\n")
+    (tmp_path / "extra.txt").write_text("delta\n")
+    return tmp_path
+
+
+def test_expand_corpus(corpus) -> None:
+    """Test globs are sorted and duplicates dropped"""
+    files = expand_corpus(f"{corpus}/part-*.txt, {corpus}/extra.txt,"
+                          f"{corpus}/part-1.txt")
+
+    assert [os.path.basename(path) for path in files] == \
+        ["part-1.txt", "part-2.txt", "extra.txt"]
+    with pytest.raises(FileNotFoundError):
+        expand_corpus(f"{corpus}/none-*.txt")
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_fan_out(corpus, workers) -> None:
+    """Test every shard is built up front and searched"""
+    manager = ShardedIndexManager(
+        expand_corpus(f"{corpus}/*.txt"), LineIndex.from_file,
+        QueryCache(10), workers=workers,
+    )
+    manager.build()
+    assert all(shard.current is not None for shard in manager.shards)
+
+    assert manager.search(b"gamma")
+    assert manager.search(b"delta")
+    assert not manager.search(b"omega")
+    assert manager.search_many([b"beta", b"nope", b"alps"]) == \
+        [True, False, True]
+    assert manager.prefix_count(b"al") == 2
+    assert manager.prefix_lines(b"", 4)[0] == 4
+    assert list(manager.prefix_lines(b"", 4)[1]) == \
+        [b"alpha", b"alps", b"beta", b"delta"]
+
+
+def test_hash_partitioning(tmp_path) -> None:
+    """Test partitioned shards are each searched for their own lines"""
+    lines = [b"line %d" % i for i in range(200)]
+    (tmp_path / "source.txt").write_bytes(b"\r\n".join(lines) + b"\r\n")
+    paths = partition_corpus([str(tmp_path / "source.txt")],
+                             str(tmp_path / "shards"), 4)
+
+    for i, path in enumerate(paths):
+        with open(path, "rb") as file:
+            assert all(shard_for(line.rstrip(b"\n"), 4) == i
+                       for line in file)
+
+    manager = ShardedIndexManager(paths, LineIndex.from_file,
+                                  sharding=HASH)
+    manager.build()
+    assert manager.search(b"line 7")
+    assert manager._generation(b"line 7") == (1,)
+    assert manager.search_many(lines[:50] + [b"line 200"]) == \
+        [True] * 50 + [False]
+
+
+def test_shards_reload_independently(corpus) -> None:
+    """Test a changed file rebuilds its shard only"""
+    manager = ShardedIndexManager(expand_corpus(f"{corpus}/*.txt"),
+                                  LineIndex.from_file, QueryCache(10))
+    manager.build()
+    assert not manager.search(b"epsilon")
+
+    changed = corpus / "part-2.txt"
+    changed.write_text("gamma\nepsilon\n")
+    os.utime(changed, ns=(0, 1))
+    assert manager.check_for_changes()
+
+    deadline = time.time() + 5
+    while not manager.search(b"epsilon"):
+        assert time.time() < deadline, "rebuild did not finish"
+        time.sleep(0.01)
+    assert [shard.current.generation for shard in manager.shards] == \
+        [1, 1, 2]
+
+
+def test_cache_keys_follow_shard_generations(corpus) -> None:
+    """Test cached results are keyed by every shard's generation, so a
+    rebuilt shard is not answered from the cache"""
+    manager = ShardedIndexManager(expand_corpus(f"{corpus}/*.txt"),
+                                  LineIndex.from_file, QueryCache(10))
+    manager.build()
+    assert not manager.search(b"epsilon")
+    assert manager._generation(b"epsilon") == (1, 1, 1)
+
+    changed = corpus / "part-2.txt"
+    changed.write_text("gamma\nepsilon\n")
+    os.utime(changed, ns=(0, 1))
+    manager.shards[2].build()
+    assert manager._generation(b"epsilon") == (1, 1, 2)
+    assert manager.search(b"epsilon")
+    assert manager.search_many([b"epsilon", b"omega"]) == [True, False]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+""" Test cases for the tls module """
+
+
+import shutil
+import socket
+import ssl
+import threading
+import pytest
+from benchmarks.tls_cert import make_self_signed_cert
+from tls import create_server_ssl_context, server_handshake
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("openssl") is None, reason="needs the openssl tool"
+)
+
+
+@pytest.fixture
+def server_context(tmp_path) -> ssl.SSLContext:
+    """A server context with a throwaway certificate"""
+    certfile, keyfile = make_self_signed_cert(str(tmp_path))
+    return create_server_ssl_context(
+        {"CERTFILE": certfile, "KEYFILE": keyfile, "TLS_NUM_TICKETS": 1}
+    )
+
+
+def test_disabled_tls_returns_no_context() -> None:
+    """Test that SSL_ENABLED=False disables TLS"""
+    assert create_server_ssl_context({"SSL_ENABLED": "False"}) is None
+
+
+def test_handshake_times_out(server_context) -> None:
+    """Test that a client that never says hello is dropped"""
+    server_side, client_side = socket.socketpair()
+
+    with pytest.raises(TimeoutError):
+        server_handshake(server_side, server_context, 0.2)
+
+    client_side.close()
+
+
+def test_handshake_completes(server_context) -> None:
+    """Test a full handshake followed by encrypted I/O"""
+    server_side, client_side = socket.socketpair()
+    client_context = ssl.create_default_context()
+    client_context.check_hostname = False
+    client_context.verify_mode = ssl.CERT_NONE
+
+    def client() -> None:
+        with client_context.wrap_socket(client_side) as tls_client:
+            tls_client.sendall(b"ping")
+
+    worker = threading.Thread(target=client)
+    worker.start()
+    tls_server = server_handshake(server_side, server_context, 5)
+    assert tls_server.recv(4) == b"ping"
+    worker.join(5)
+    tls_server.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
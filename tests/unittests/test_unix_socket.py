@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+""" Test cases for the unix_socket module """
+
+
+import os
+import socket
+import stat
+import pytest
+from unix_socket import create_unix_listener, open_unix_listener
+
+
+def test_create_unix_listener_mode(tmp_path) -> None:
+    """Test the socket file gets exactly the requested permissions"""
+    path = str(tmp_path / "search.sock")
+    listener = create_unix_listener(path, 0o600)
+    try:
+        mode = os.stat(path).st_mode
+        assert stat.S_ISSOCK(mode)
+        assert stat.S_IMODE(mode) == 0o600
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            connection, _ = listener.accept()
+            connection.close()
+    finally:
+        listener.close()
+
+
+def test_create_unix_listener_replaces_stale_socket(tmp_path) -> None:
+    """Test a socket file left by a stopped server is replaced, and one
+    still served is not"""
+    path = str(tmp_path / "search.sock")
+    create_unix_listener(path).close()  # Leaves the file behind
+
+    listener = create_unix_listener(path)
+    try:
+        with pytest.raises(OSError):
+            create_unix_listener(path)
+    finally:
+        listener.close()
+
+
+def test_create_unix_listener_keeps_other_files(tmp_path) -> None:
+    """Test a regular file at the path is never removed"""
+    path = tmp_path / "search.sock"
+    path.write_text("data")
+
+    with pytest.raises(FileExistsError):
+        create_unix_listener(str(path))
+    assert path.read_text() == "data"
+
+
+def test_open_unix_listener(tmp_path) -> None:
+    """Test the listener is only opened when configured"""
+    assert open_unix_listener({}) is None
+
+    path = str(tmp_path / "search.sock")
+    listener = open_unix_listener(
+        {"UNIX_SOCKET_PATH": path, "UNIX_SOCKET_MODE": "640"}
+    )
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    finally:
+        listener.close()
@@ -3,7 +3,7 @@
 
 
 import pytest
-from utils import parse_config_file
+from utils import parse_config_file, is_enabled
 
 
 def test_parse_valid_config_file(tmp_path) -> None:
@@ -30,5 +30,15 @@ def test_parse_config_with_none_existing_file() -> None:
     assert parse_config_file('some_none_existent_file.txt') is None
 
 
+def test_is_enabled() -> None:
+    """Test that string flags from the config file are read correctly"""
+    assert is_enabled("True")
+    assert is_enabled("true")
+    assert is_enabled("1")
+    assert not is_enabled("False")
+    assert not is_enabled("")
+    assert not is_enabled(None)
+
+
 if __name__ == "__main__":
     pytest.main()
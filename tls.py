@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+""" TLS configuration for the server """
+
+
+import socket
+import ssl
+from typing import Union
+from utils import is_enabled
+
+config_type = dict[str, Union[str, int]]
+
+
+def create_server_ssl_context(
+    configurations: config_type,
+) -> ssl.SSLContext | None:
+    """
+    Creates the server-side SSL context described by the configurations.
+
+    Args:
+        configurations (config_type): The parsed server configurations.
+            "SSL_ENABLED" turns TLS on or off (default on), "CERTFILE" and
+            "KEYFILE" locate the certificate chain (default ./server.crt
+            and ./server.key). "TLS_CIPHERS" (OpenSSL cipher string for
+            TLS 1.2), "TLS_ECDH_CURVE" and "TLS_NUM_TICKETS" (TLS 1.3
+            session tickets issued per handshake) tune the handshake.
+
+    Returns:
+        ssl.SSLContext | None: The context, or None when TLS is disabled.
+
+    Raises:
+        OSError: If the certificate or key cannot be loaded.
+        ssl.SSLError: If the cipher string or curve is not supported.
+    """
+    if not is_enabled(configurations.get("SSL_ENABLED", "True")):
+        return None
+
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(
+        certfile=str(configurations.get("CERTFILE", "./server.crt")),
+        keyfile=str(configurations.get("KEYFILE", "./server.key")),
+    )
+
+    # Session tickets let returning clients resume without a full handshake
+    context.options &= ~ssl.OP_NO_TICKET
+    context.num_tickets = int(configurations.get("TLS_NUM_TICKETS", 2))
+
+    ciphers = configurations.get("TLS_CIPHERS")
+    if ciphers:
+        context.set_ciphers(str(ciphers))
+
+    curve = configurations.get("TLS_ECDH_CURVE")
+    if curve:
+        context.set_ecdh_curve(str(curve))
+
+    return context
+
+
+def server_handshake(
+    client_socket: socket.socket, context: ssl.SSLContext, timeout: float
+) -> ssl.SSLSocket:
+    """
+    Wraps an accepted connection and completes the server-side TLS
+    handshake, giving up after ``timeout`` seconds. Meant to run on the
+    worker handling the connection, never on the accept loop.
+
+    Args:
+        client_socket (socket.socket): The accepted plain connection.
+        context (ssl.SSLContext): The server SSL context.
+        timeout (float): Seconds allowed for the whole handshake.
+
+    Returns:
+        ssl.SSLSocket: The connection, ready for encrypted I/O in blocking
+                       mode.
+
+    Raises:
+        TimeoutError: If the client does not finish the handshake in time.
+        ssl.SSLError: If the handshake fails.
+    """
+    tls_socket = context.wrap_socket(
+        client_socket, server_side=True, do_handshake_on_connect=False
+    )
+
+    try:
+        tls_socket.settimeout(timeout)
+        tls_socket.do_handshake()
+        tls_socket.settimeout(None)
+    except BaseException:
+        tls_socket.close()
+        raise
+
+    return tls_socket
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+""" Unix domain socket listener for clients on the same host
+
+Local clients connect through a socket file instead of HOST/PORT and skip
+TCP and TLS. Access is controlled by the file's permissions instead: only
+users allowed to write to the file can connect.
+"""
+
+
+import errno
+import os
+import socket
+import stat
+from typing import Union
+
+config_type = dict[str, Union[str, int]]
+
+
+def create_unix_listener(path: str, mode: int = 0o660,
+                         backlog: int = 1024) -> socket.socket:
+    """
+    Binds and listens on a Unix domain socket, with the socket file
+    created with ``mode`` permissions.
+
+    A socket file left behind by a server that is no longer running is
+    replaced. Anything else at ``path`` is never removed.
+
+    Args:
+        path (str): Where to create the socket file.
+        mode (int, optional): Its permission bits. Defaults to 0o660
+                              (owner and group).
+        backlog (int, optional): The listen backlog. Defaults to 1024.
+
+    Returns:
+        socket.socket: The listening socket.
+
+    Raises:
+        FileExistsError: If ``path`` exists and is not a socket.
+        OSError: If a running server already listens on ``path``.
+    """
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise FileExistsError(f"{path} exists and is not a socket")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex(path) == 0:
+                raise OSError(errno.EADDRINUSE,
+                              f"A server is already listening on {path}")
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # The file is created with the umask applied, so it is never more
+    # open than ``mode``, even before the chmod
+    umask = os.umask(0o777 & ~mode)
+    try:
+        listener.bind(path)
+    except OSError:
+        listener.close()
+        raise
+    finally:
+        os.umask(umask)
+    os.chmod(path, mode)
+    listener.listen(backlog)
+    return listener
+
+
+def open_unix_listener(
+    configurations: config_type,
+) -> socket.socket | None:
+    """
+    Opens the listener described by the configurations, if any.
+
+    Args:
+        configurations (config_type): The parsed server configurations.
+            "UNIX_SOCKET_PATH" enables the listener, "UNIX_SOCKET_MODE"
+            sets the socket file's octal permissions (default 660) and
+            "BACKLOG" its listen backlog.
+
+    Returns:
+        socket.socket | None: The listening socket, or None when
+                              "UNIX_SOCKET_PATH" is not set.
+    """
+    path = configurations.get("UNIX_SOCKET_PATH")
+    if not path:
+        return None
+    return create_unix_listener(
+        str(path),
+        int(str(configurations.get("UNIX_SOCKET_MODE", "660")), 8),
+        int(configurations.get("BACKLOG", 1024)),
+    )
@@ -68,4 +68,20 @@ def parse_config_file(file_path: str) -> dict[str, Union[str, int]] | None:
     return None
 
 
+def is_enabled(value: str | int | None) -> bool:
+    """
+    Interprets a configuration value as a boolean flag. Values are kept as
+    strings by parse_config_file, so "False" would otherwise be truthy.
+
+    Args:
+        value (str | int | None): The raw configuration value.
+    Returns:
+        bool: True for "true", "yes", "on" and "1" (case-insensitive),
+              False for anything else, including a missing value.
+    """
+    if value is None:
+        return False
+    return str(value).strip().lower() in ("true", "yes", "on", "1")
+
+
 server_configurations = parse_config_file("./config/config.txt")